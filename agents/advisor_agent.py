@@ -1,6 +1,9 @@
 import json
 from typing import Dict, Any
 
+from agents.llm.openai_client import agenerate
+from app.tracing import traced
+
 
 class AdvisorAgent:
     """
@@ -15,6 +18,7 @@ class AdvisorAgent:
             encoding="utf-8"
         ).read()
 
+    @traced("advisor.advise")
     def advise(
         self,
         critic_output: Dict[str, Any],
@@ -34,6 +38,29 @@ class AdvisorAgent:
 
         return self._validate(raw)
 
+    @traced("advisor.advise")
+    async def aadvise(
+        self,
+        critic_output: Dict[str, Any],
+        context: str = ""
+    ) -> Dict[str, Any]:
+        """
+        Versione async di `advise`.
+        """
+        payload = {
+            "critic_output": critic_output,
+            "context": context
+        }
+
+        raw = await agenerate(
+            self.llm,
+            system_prompt=self.system_prompt,
+            user_prompt=json.dumps(payload, indent=2),
+            expect_json=True
+        )
+
+        return self._validate(raw)
+
     # -------------------------
 
     def _validate(self, raw: str) -> Dict:
@@ -1,6 +1,12 @@
-from typing import List, Dict
+import asyncio
+from datetime import datetime
+from typing import AsyncIterator, List, Dict, Optional
+
+from agents.llm.openai_client import agenerate, agenerate_stream
 from tools.state_tools import get_active_tasks, update_task_status
 from tools.feedback_tools import save_user_feedback
+from storage.crud import get_daily_message, get_daily_message_version, save_daily_message
+from app.tracing import traced
 
 
 class CoachAgent:
@@ -8,9 +14,12 @@ class CoachAgent:
     Agent che aiuta l'utente con task giornalieri, motivazione e feedback.
     """
 
-    def __init__(self, llm_client, memory_agent):
+    def __init__(self, llm_client, memory_agent, cache_daily: bool = True):
         self.llm = llm_client
         self.memory_agent = memory_agent
+        # messaggio del giorno in cache per (goal, giorno); invalidato
+        # da cambi di stato dei task e dai feedback
+        self.cache_daily = cache_daily
         self.system_prompt = open(
             "agents/prompts/coach.txt", encoding="utf-8"
         ).read()
@@ -19,7 +28,22 @@ class CoachAgent:
     # DAILY FLOW
     # -------------------------
 
-    def daily_message(self, goal_id: int) -> Dict:
+    @traced("coach.daily_message")
+    def daily_message(self, goal_id: int, refresh: bool = False) -> Dict:
+        """
+        Messaggio e task del giorno, letti dalla cache se già generati oggi.
+        Con refresh=True il messaggio viene sempre rigenerato.
+        """
+        cached = None if refresh else self._cached_daily(goal_id)
+        if cached is not None:
+            return cached
+
+        version = self._daily_version(goal_id)
+        result = self._build_daily_message(goal_id)
+        self._store_daily(goal_id, result, version)
+        return result
+
+    def _build_daily_message(self, goal_id: int) -> Dict:
         tasks = get_active_tasks(goal_id)
 
         if not tasks:
@@ -40,12 +64,123 @@ class CoachAgent:
         }
 
 
-    def _generate_message(self, tasks: List[Dict], memory_context: str) -> str:
+    @traced("coach.daily_message")
+    async def adaily_message(self, goal_id: int, refresh: bool = False) -> Dict:
+        """
+        Versione async di `daily_message`: I/O su SQLite/Qdrant in un thread,
+        chiamata LLM tramite il client async.
+        """
+        if not refresh:
+            cached = await asyncio.to_thread(self._cached_daily, goal_id)
+            if cached is not None:
+                return cached
+
+        version = await asyncio.to_thread(self._daily_version, goal_id)
+        tasks = await asyncio.to_thread(get_active_tasks, goal_id)
+
+        if not tasks:
+            result = {
+                "goal_id": goal_id,
+                "message": "🎉 Tutti i task sono completati! Ottimo lavoro.",
+                "tasks": []
+            }
+        else:
+            today_tasks = tasks[:2]
+            context = await asyncio.to_thread(
+                self.memory_agent.get_context_for_coach, goal_id
+            )
+
+            message = await self._agenerate_message(today_tasks, context)
+            result = {
+                "goal_id": goal_id,
+                "message": message,
+                "tasks": today_tasks
+            }
+
+        await asyncio.to_thread(self._store_daily, goal_id, result, version)
+        return result
+
+    async def astream_daily_message(self, goal_id: int) -> AsyncIterator[Dict]:
+        """
+        Versione streaming di `daily_message`.
+
+        Yields:
+            Dict: eventi {"type": "tasks"}, poi {"type": "token"} per ogni
+            frammento del messaggio e infine {"type": "done"} con il messaggio completo.
+        """
+        cached = await asyncio.to_thread(self._cached_daily, goal_id)
+        if cached is not None:
+            yield {"type": "tasks", "goal_id": goal_id, "tasks": cached["tasks"]}
+            yield {"type": "done", "message": cached["message"]}
+            return
+
+        version = await asyncio.to_thread(self._daily_version, goal_id)
+        tasks = await asyncio.to_thread(get_active_tasks, goal_id)
+        today_tasks = tasks[:2]
+
+        yield {"type": "tasks", "goal_id": goal_id, "tasks": today_tasks}
+
+        if not today_tasks:
+            message = "🎉 Tutti i task sono completati! Ottimo lavoro."
+            await asyncio.to_thread(self._store_daily, goal_id, {
+                "goal_id": goal_id, "message": message, "tasks": []
+            }, version)
+            yield {"type": "done", "message": message}
+            return
+
+        context = await asyncio.to_thread(
+            self.memory_agent.get_context_for_coach, goal_id
+        )
+
+        parts = []
+        async for token in self._astream_message(today_tasks, context):
+            parts.append(token)
+            yield {"type": "token", "text": token}
+
+        message = "".join(parts).strip()
+        await asyncio.to_thread(self._store_daily, goal_id, {
+            "goal_id": goal_id, "message": message, "tasks": today_tasks
+        }, version)
+        yield {"type": "done", "message": message}
+
+    # -------------------------
+    # DAILY CACHE
+    # -------------------------
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.utcnow().date().isoformat()
+
+    def _cached_daily(self, goal_id: Optional[int]) -> Optional[Dict]:
+        if not self.cache_daily or goal_id is None:
+            return None
+        return get_daily_message(goal_id, self._today())
+
+    def _daily_version(self, goal_id: Optional[int]) -> Optional[int]:
+        """
+        Versione della cache letta prima di generare il messaggio: se un
+        feedback la invalida durante la generazione, il messaggio (ormai
+        obsoleto) non viene salvato.
+        """
+        if not self.cache_daily or goal_id is None:
+            return None
+        return get_daily_message_version(goal_id)
+
+    def _store_daily(
+        self,
+        goal_id: Optional[int],
+        result: Dict,
+        version: Optional[int] = None
+    ) -> None:
+        if self.cache_daily and goal_id is not None:
+            save_daily_message(goal_id, self._today(), result, version=version)
+
+    def _build_user_prompt(self, tasks: List[Dict], memory_context: str) -> str:
         task_lines = "\n".join(
             f"- {t['description']}" for t in tasks
         )
 
-        user_prompt = f"""
+        return f"""
         Context:
         {memory_context}
 
@@ -59,23 +194,48 @@ class CoachAgent:
         - optional note
         """
 
+    def _generate_message(self, tasks: List[Dict], memory_context: str) -> str:
         return self.llm.generate(
             system_prompt=self.system_prompt,
-            user_prompt=user_prompt,
+            user_prompt=self._build_user_prompt(tasks, memory_context),
             expect_json=False
         ).strip()
 
+    async def _agenerate_message(self, tasks: List[Dict], memory_context: str) -> str:
+        message = await agenerate(
+            self.llm,
+            system_prompt=self.system_prompt,
+            user_prompt=self._build_user_prompt(tasks, memory_context),
+            expect_json=False
+        )
+        return message.strip()
+
+    async def _astream_message(self, tasks: List[Dict], memory_context: str) -> AsyncIterator[str]:
+        async for token in agenerate_stream(
+            self.llm,
+            system_prompt=self.system_prompt,
+            user_prompt=self._build_user_prompt(tasks, memory_context),
+            expect_json=False
+        ):
+            yield token
+
     # -------------------------
     # FEEDBACK
     # -------------------------
 
+    @traced("coach.handle_feedback")
     def handle_feedback(
         self,
         goal_id: int,
         task_id: int,
         feedback: Dict
     ) -> None:
-        save_user_feedback(goal_id, task_id, feedback)
+        save_user_feedback(
+            task_id=task_id,
+            feedback=feedback,
+            goal_id=goal_id,
+            vector_store=self.memory_agent.vector_store
+        )
 
         update_task_status(
             task_id,
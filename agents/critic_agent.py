@@ -1,7 +1,11 @@
+import asyncio
 import json
 from typing import Dict, Any, List
 
+from agents.llm.openai_client import agenerate
+from agents.llm.tokens import fit_to_budget
 from storage.qdrant import VectorStorage
+from app.tracing import traced
 
 
 class CriticAgent:
@@ -9,9 +13,11 @@ class CriticAgent:
     Agent che analizza i progressi e produce raccomandazioni di adattamento.
     """
 
-    def __init__(self, llm_client, vector_store: VectorStorage):
+    def __init__(self, llm_client, vector_store: VectorStorage, prompt_budget: int = 2000):
         self.llm = llm_client
         self.vector_store = vector_store
+        # token massimi dei progress log nel prompt
+        self.prompt_budget = prompt_budget
         self.system_prompt = open(
             "agents/prompts/critic.txt", encoding="utf-8"
         ).read()
@@ -20,6 +26,7 @@ class CriticAgent:
     # WEEKLY ANALYSIS
     # -------------------------
 
+    @traced("critic.analyze_week")
     def analyze_week(self, goal_id: int) -> Dict[str, Any]:
         """
         Analizza i progressi settimanali e restituisce raccomandazioni strutturate.
@@ -48,18 +55,65 @@ class CriticAgent:
 
         return self._validate_and_parse(raw_output)
 
+    @traced("critic.analyze_week")
+    async def aanalyze_week(self, goal_id: int) -> Dict[str, Any]:
+        """
+        Versione async di `analyze_week`.
+        """
+        progress = await asyncio.to_thread(
+            self.vector_store.retrieve_recent_progress,
+            goal_id=goal_id,
+            days=7,
+            limit=50
+        )
+
+        if not progress:
+            return {
+                "issues": [],
+                "recommendations": [],
+                "replan_needed": False
+            }
+
+        raw_output = await agenerate(
+            self.llm,
+            system_prompt=self.system_prompt,
+            user_prompt=self._format_progress(progress),
+            expect_json=True
+        )
+
+        return self._validate_and_parse(raw_output)
+
     # -------------------------
     # INTERNALS
     # -------------------------
 
     def _format_progress(self, progress: List[Dict]) -> str:
-        lines = []
-        for p in progress:
-            lines.append(
-                f"- done={p['done']}, difficulty={p['difficulty']}, "
-                f"energy={p['energy']}, note={p.get('note')}"
-            )
-        return "\n".join(lines)
+        """
+        Righe dei progress log entro `prompt_budget` token: restano i log
+        più recenti, quelli più vecchi vengono riassunti in una riga.
+        """
+        newest_first = sorted(
+            progress, key=lambda p: p.get("timestamp_ts") or 0, reverse=True
+        )
+        lines = [
+            f"- done={p['done']}, difficulty={p['difficulty']}, "
+            f"energy={p['energy']}, note={p.get('note')}"
+            for p in newest_first
+        ]
+
+        kept, dropped = fit_to_budget(lines, self.prompt_budget)
+        kept.reverse()
+
+        if dropped:
+            older = newest_first[len(kept):]
+            kept.insert(0, (
+                f"- ({dropped} older logs summarized: "
+                f"done={sum(1 for p in older if p['done'])}/{dropped}, "
+                f"avg difficulty={sum(p['difficulty'] for p in older) / dropped:.1f}, "
+                f"avg energy={sum(p['energy'] for p in older) / dropped:.1f})"
+            ))
+
+        return "\n".join(kept)
 
     def _validate_and_parse(self, raw_output: str) -> Dict[str, Any]:
         try:
@@ -0,0 +1,259 @@
+"""
+Cache delle risposte LLM per chiamate deterministiche.
+
+La chiave è l'hash di modello, system prompt, user prompt e parametri:
+input identici (es. run settimanali ripetuti dopo un crash) non costano
+una nuova completion. Il backend è intercambiabile (LRU in memoria o
+SQLite su disco con TTL); l'opt-in avviene per singolo agente nel bootstrap.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, Iterator, Optional
+
+from agents.llm.openai_client import agenerate, agenerate_stream
+
+
+def make_cache_key(
+    model: str,
+    system_prompt: str,
+    user_prompt: str,
+    params: Dict
+) -> str:
+    raw = json.dumps(
+        {
+            "model": model,
+            "system": system_prompt,
+            "user": user_prompt,
+            "params": params,
+        },
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# -------------------------
+# BACKENDS
+# -------------------------
+
+class InMemoryLRUBackend:
+    """
+    Backend LRU in memoria, limitato a `max_size` risposte.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._items: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+
+class SQLiteCacheBackend:
+    """
+    Backend persistente su SQLite con scadenza (TTL in secondi).
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 7 * 24 * 3600):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        # file condiviso anche tra più worker: letture non bloccate dalle scritture
+        self._conn.execute("PRAGMA journal_mode = WAL;")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?",
+                (key,)
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            if time.time() - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at) VALUES (?, ?, ?)",
+                (key, value, time.time())
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# -------------------------
+# CLIENT WRAPPER
+# -------------------------
+
+class CachedLLMClient:
+    """
+    Wrapper con la stessa interfaccia del client LLM (generate, agenerate,
+    generate_stream, agenerate_stream) che serve dalla cache le risposte
+    già viste. Le risposte JSON non valide non vengono memorizzate.
+    """
+
+    def __init__(self, inner, backend):
+        self.inner = inner
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    def __getattr__(self, name):
+        # model, temperature, ... del client sottostante
+        return getattr(self.inner, name)
+
+    # -------------------------
+    # INTERNALS
+    # -------------------------
+
+    def _key(self, system_prompt: str, user_prompt: str, expect_json: bool) -> str:
+        return make_cache_key(
+            model=self.inner.model,
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            params={
+                "temperature": getattr(self.inner, "temperature", None),
+                "expect_json": expect_json,
+            }
+        )
+
+    def _lookup(self, key: str) -> Optional[str]:
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def _store(self, key: str, value: str, expect_json: bool) -> None:
+        if expect_json:
+            try:
+                json.loads(value)
+            except (TypeError, ValueError):
+                return
+        self.backend.set(key, value)
+
+    # -------------------------
+    # GENERATE
+    # -------------------------
+
+    def generate(self, system_prompt: str, user_prompt: str, expect_json: bool = False) -> str:
+        key = self._key(system_prompt, user_prompt, expect_json)
+
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        value = self.inner.generate(
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            expect_json=expect_json
+        )
+        self._store(key, value, expect_json)
+        return value
+
+    async def agenerate(self, system_prompt: str, user_prompt: str, expect_json: bool = False) -> str:
+        key = self._key(system_prompt, user_prompt, expect_json)
+
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        value = await agenerate(
+            self.inner,
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            expect_json=expect_json
+        )
+        self._store(key, value, expect_json)
+        return value
+
+    def generate_stream(self, system_prompt: str, user_prompt: str, expect_json: bool = False) -> Iterator[str]:
+        key = self._key(system_prompt, user_prompt, expect_json)
+
+        cached = self._lookup(key)
+        if cached is not None:
+            yield cached
+            return
+
+        parts = []
+        for token in self.inner.generate_stream(
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            expect_json=expect_json
+        ):
+            parts.append(token)
+            yield token
+
+        self._store(key, "".join(parts), expect_json)
+
+    async def agenerate_stream(self, system_prompt: str, user_prompt: str, expect_json: bool = False) -> AsyncIterator[str]:
+        key = self._key(system_prompt, user_prompt, expect_json)
+
+        cached = self._lookup(key)
+        if cached is not None:
+            yield cached
+            return
+
+        parts = []
+        async for token in agenerate_stream(
+            self.inner,
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            expect_json=expect_json
+        ):
+            parts.append(token)
+            yield token
+
+        self._store(key, "".join(parts), expect_json)
+
+    def stats(self) -> Dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def build_llm_cache_backend(kind: str, path: Optional[str], ttl_seconds: float, max_size: int):
+    """
+    Crea il backend di cache indicato in configurazione ("memory" o "sqlite").
+    """
+    if kind == "sqlite":
+        return SQLiteCacheBackend(path or "llm_cache.db", ttl_seconds=ttl_seconds)
+
+    if kind == "memory":
+        return InMemoryLRUBackend(max_size=max_size)
+
+    raise ValueError(f"Unknown LLM cache backend: {kind}")
@@ -0,0 +1,259 @@
+"""
+Client LLM locale e deterministico per test, benchmark e load test offline.
+
+Stessa interfaccia di OpenAIClient (generate, agenerate, generate_stream,
+agenerate_stream). Il tipo di prompt (planner, critic, advisor, memory,
+coach) viene riconosciuto dal system prompt e la risposta rispetta lo
+schema JSON atteso dall'agente. A parità di input e seed la risposta è
+sempre la stessa; latenza ed errori sono configurabili.
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from typing import AsyncIterator, Callable, Dict, Iterator, Optional
+
+from agents.llm.tokens import estimate_tokens
+from agents.llm.usage import UsageTracker
+from app.tracing import span
+
+# frammento del system prompt → tipo di agente
+PROMPT_MARKERS = (
+    ("planning agent", "planner"),
+    ("critic agent", "critic"),
+    ("advisory system", "advisor"),
+    ("memory curation", "memory"),
+    ("coaching assistant", "coach"),
+)
+
+
+class FakeLLMError(RuntimeError):
+    """
+    Errore iniettato da FakeLLMClient.
+    """
+
+
+def detect_prompt_kind(system_prompt: str) -> str:
+    lowered = system_prompt.lower()
+    for marker, kind in PROMPT_MARKERS:
+        if marker in lowered:
+            return kind
+    return "text"
+
+
+class FakeLLMClient:
+    """
+    LLM finto con latenza e iniezione di errori.
+
+    Args:
+        latency (float): Latenza base per chiamata in secondi.
+        jitter (float): Latenza aggiuntiva casuale massima in secondi.
+        error_rate (float): Probabilità (0-1) che una chiamata fallisca.
+        error_factory (callable, optional): Crea l'eccezione da sollevare
+            (default FakeLLMError), es. un errore OpenAI transitorio.
+        seed (int): Seed per latenza, errori e contenuti.
+        chunk_size (int): Caratteri per frammento negli stream.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_factory: Optional[Callable[[], BaseException]] = None,
+        seed: int = 0,
+        chunk_size: int = 16
+    ):
+        self.model = "fake-llm"
+        self.temperature = 0.0
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_factory = error_factory or (lambda: FakeLLMError("injected LLM error"))
+        self.seed = seed
+        self.chunk_size = chunk_size
+
+        self.calls = 0
+        self.errors = 0
+        self.usage = UsageTracker()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    # -------------------------
+    # INTERNALS
+    # -------------------------
+
+    def _next_call(self) -> float:
+        """
+        Conta la chiamata, decide l'errore e restituisce la latenza.
+        """
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+            failed = self._rng.random() < self.error_rate
+            if failed:
+                self.errors += 1
+
+        if failed:
+            raise self.error_factory()
+        return delay
+
+    def _content_rng(self, system_prompt: str, user_prompt: str) -> random.Random:
+        digest = hashlib.sha256(
+            f"{self.seed}\x00{system_prompt}\x00{user_prompt}".encode("utf-8")
+        ).hexdigest()
+        return random.Random(int(digest[:16], 16))
+
+    def respond(self, system_prompt: str, user_prompt: str) -> str:
+        """
+        Risposta deterministica per il prompt (senza latenza né errori).
+        """
+        kind = detect_prompt_kind(system_prompt)
+        rng = self._content_rng(system_prompt, user_prompt)
+        topic = " ".join(user_prompt.split()[:8]) or "goal"
+
+        if kind == "planner":
+            n_tasks = rng.randint(3, 6)
+            data = {
+                "roadmap": {
+                    "goal_summary": f"Plan for: {topic}",
+                    "estimated_duration_days": rng.randint(7, 90),
+                },
+                "tasks": [
+                    {
+                        "title": f"Step {i}",
+                        "description": f"Work on part {i} of: {topic}",
+                        "order": i,
+                    }
+                    for i in range(1, n_tasks + 1)
+                ],
+            }
+
+        elif kind == "critic":
+            replan = rng.random() < 0.3
+            data = {
+                "issues": [
+                    {
+                        "pattern": "inconsistent completion",
+                        "evidence": f"{rng.randint(1, 5)} skipped tasks this week",
+                        "severity": rng.choice(["low", "medium", "high"]),
+                    }
+                ],
+                "recommendations": [
+                    {
+                        "type": rng.choice(["adjustment", "reduction", "pacing", "schedule"]),
+                        "description": "Reduce the daily load",
+                    }
+                ],
+                "replan_needed": replan,
+            }
+
+        elif kind == "advisor":
+            data = {
+                "suggest_replan": rng.random() < 0.3,
+                "confidence": round(rng.uniform(0.3, 0.95), 2),
+                "rationale": "Synthetic advice from the fake LLM",
+            }
+
+        elif kind == "memory":
+            data = {
+                "store": True,
+                "memory_type": "reflection",
+                "content": f"Summary of recent activity: {topic}",
+            }
+
+        elif kind == "coach":
+            return f"Today focus on your tasks, one at a time. ({topic})"
+
+        else:
+            return f"Fake response: {topic}"
+
+        return json.dumps(data, ensure_ascii=False)
+
+    def _usage(self, system_prompt: str, user_prompt: str, output: str) -> Dict[str, int]:
+        """
+        Token stimati (stesse chiavi di response.usage), registrati nel tracker.
+        """
+        usage = {
+            "prompt_tokens": estimate_tokens(system_prompt) + estimate_tokens(user_prompt),
+            "completion_tokens": estimate_tokens(output),
+        }
+        self.usage.record(**usage)
+        return usage
+
+    def _chunks(self, text: str) -> Iterator[str]:
+        for i in range(0, len(text), self.chunk_size):
+            yield text[i:i + self.chunk_size]
+
+    # -------------------------
+    # GENERATE
+    # -------------------------
+
+    def generate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        expect_json: bool = False,
+        timeout: Optional[float] = None
+    ) -> str:
+        with span("llm.generate", "llm", model=self.model) as sp:
+            delay = self._next_call()
+            if delay:
+                time.sleep(delay)
+            output = self.respond(system_prompt, user_prompt)
+            sp.set(**self._usage(system_prompt, user_prompt, output))
+        return output
+
+    async def agenerate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        expect_json: bool = False,
+        timeout: Optional[float] = None
+    ) -> str:
+        with span("llm.agenerate", "llm", model=self.model) as sp:
+            delay = self._next_call()
+            if delay:
+                await asyncio.sleep(delay)
+            output = self.respond(system_prompt, user_prompt)
+            sp.set(**self._usage(system_prompt, user_prompt, output))
+        return output
+
+    def generate_stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        expect_json: bool = False,
+        timeout: Optional[float] = None
+    ) -> Iterator[str]:
+        # la latenza simula il time-to-first-token
+        with span("llm.generate_stream", "llm", attach=False, model=self.model) as sp:
+            delay = self._next_call()
+            if delay:
+                time.sleep(delay)
+            output = self.respond(system_prompt, user_prompt)
+            sp.set(**self._usage(system_prompt, user_prompt, output))
+            yield from self._chunks(output)
+
+    async def agenerate_stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        expect_json: bool = False,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        with span("llm.agenerate_stream", "llm", attach=False, model=self.model) as sp:
+            delay = self._next_call()
+            if delay:
+                await asyncio.sleep(delay)
+            output = self.respond(system_prompt, user_prompt)
+            sp.set(**self._usage(system_prompt, user_prompt, output))
+            for chunk in self._chunks(output):
+                yield chunk
+                await asyncio.sleep(0)
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "errors": self.errors}
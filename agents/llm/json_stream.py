@@ -0,0 +1,112 @@
+"""
+Parser incrementale per output JSON in streaming.
+
+Permette di emettere gli oggetti di un array (es. "tasks" del planner)
+appena il loro JSON è completo, senza attendere la fine della completion.
+"""
+
+import json
+from typing import Dict, List, Optional
+
+
+class JsonArrayStreamParser:
+    """
+    Riceve frammenti di testo JSON e restituisce gli oggetti completi
+    contenuti nell'array `key` dell'oggetto radice.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self._buffer = ""
+        self._pos = 0
+
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._pending_key: Optional[str] = None
+
+        self._array_depth: Optional[int] = None
+        self._array_closed = False
+        self._object_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Dict]:
+        """
+        Aggiunge un frammento e restituisce gli oggetti completati.
+        """
+        self._buffer += chunk
+        completed = []
+
+        while self._pos < len(self._buffer):
+            i = self._pos
+            c = self._buffer[i]
+            self._pos += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    self._last_string = self._buffer[self._string_start + 1:i]
+                continue
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+
+            elif c == ":":
+                self._pending_key = self._last_string
+
+            elif c == ",":
+                self._pending_key = None
+
+            elif c in "{[":
+                entering_array = (
+                    c == "["
+                    and self._array_depth is None
+                    and not self._array_closed
+                    and len(self._stack) == 1
+                    and self._pending_key == self.key
+                )
+
+                self._stack.append(c)
+
+                if entering_array:
+                    self._array_depth = len(self._stack)
+                elif (
+                    c == "{"
+                    and self._array_depth is not None
+                    and len(self._stack) == self._array_depth + 1
+                ):
+                    self._object_start = i
+
+            elif c in "}]":
+                if (
+                    c == "}"
+                    and self._object_start is not None
+                    and len(self._stack) == self._array_depth + 1
+                ):
+                    completed.append(
+                        json.loads(self._buffer[self._object_start:i + 1])
+                    )
+                    self._object_start = None
+
+                if c == "]" and len(self._stack) == self._array_depth:
+                    # array chiuso: le chiavi successive non contengono task
+                    self._array_depth = None
+                    self._array_closed = True
+
+                if self._stack:
+                    self._stack.pop()
+
+        return completed
+
+    @property
+    def text(self) -> str:
+        """
+        Testo completo ricevuto finora.
+        """
+        return self._buffer
@@ -3,49 +3,243 @@ Client per l'interazione con modelli OpenAI (chat completions).
 Permette di generare risposte LLM a partire da prompt di sistema e utente.
 """
 
-from openai import OpenAI
+import asyncio
+from typing import AsyncIterator, Iterator, Optional
+
+from openai import OpenAI, AsyncOpenAI
 from dotenv import load_dotenv
-import os   
+import os
+
+from agents.llm.usage import UsageTracker
+from app.tracing import span
 
 load_dotenv()
 
+
+def _usage_attributes(usage) -> dict:
+    """
+    Token della risposta (response.usage) come attributi dello span.
+    """
+    if usage is None:
+        return {}
+    return {
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+    }
+
+
 class OpenAIClient:
     """
     Wrapper semplice per la generazione di completions tramite OpenAI API.
     """
-    def __init__(self, model: str = "gpt-4.1-mini"):
+    def __init__(self, model: str = "gpt-4.1-mini", max_retries: Optional[int] = None):
         """
         Inizializza il client OpenAI con il modello specificato.
 
         Args:
             model (str, optional): Nome del modello OpenAI da usare. Default "gpt-4.1-mini".
+            max_retries (int, optional): Retry interni dell'SDK OpenAI
+                (0 quando i retry sono gestiti da ResilientLLMClient).
         """
-        self.client = OpenAI()
+        sdk_kwargs = {} if max_retries is None else {"max_retries": max_retries}
+        self.client = OpenAI(**sdk_kwargs)
         self.model = model
+        self.temperature = 0.2
+        self._sdk_kwargs = sdk_kwargs
+        # token per chiamata e per goal (vedi agents.llm.usage)
+        self.usage = UsageTracker()
 
-    def generate(self, system_prompt: str, user_prompt: str, expect_json: bool = False) -> str:
+    def _track_usage(self, sp, usage) -> None:
         """
-        Genera una risposta dal modello OpenAI dato un prompt di sistema e uno utente.
-
-        Args:
-            system_prompt (str): Prompt di contesto per il sistema.
-            user_prompt (str): Prompt dell'utente.
+        Registra `response.usage` sullo span e nel tracker.
+        """
+        attributes = _usage_attributes(usage)
+        if attributes:
+            sp.set(**attributes)
+            self.usage.record(**attributes)
 
-        Returns:
-            str: Risposta generata dal modello.
+    def _request(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        expect_json: bool,
+        timeout: Optional[float] = None
+    ) -> dict:
+        """
+        Costruisce i parametri della chat completion (comuni a sync e async).
         """
         kwargs = {}
 
         if expect_json:
             kwargs["response_format"] = {"type": "json_object"}
 
-        response = self.client.chat.completions.create(
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+
+        return dict(
             model=self.model,
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
-            temperature=0.2,
+            temperature=self.temperature,
             **kwargs
         )
+
+    def generate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        expect_json: bool = False,
+        timeout: Optional[float] = None
+    ) -> str:
+        """
+        Genera una risposta dal modello OpenAI dato un prompt di sistema e uno utente.
+
+        Args:
+            system_prompt (str): Prompt di contesto per il sistema.
+            user_prompt (str): Prompt dell'utente.
+            timeout (float, optional): Timeout della singola richiesta in secondi.
+
+        Returns:
+            str: Risposta generata dal modello.
+        """
+        with span("llm.generate", "llm", model=self.model) as sp:
+            response = self.client.chat.completions.create(
+                **self._request(system_prompt, user_prompt, expect_json, timeout)
+            )
+            self._track_usage(sp, response.usage)
         return response.choices[0].message.content
+
+    def generate_stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        expect_json: bool = False,
+        timeout: Optional[float] = None
+    ) -> Iterator[str]:
+        """
+        Come `generate`, ma restituisce i token man mano che arrivano.
+
+        Yields:
+            str: Frammenti di testo della risposta.
+        """
+        with span("llm.generate_stream", "llm", attach=False, model=self.model) as sp:
+            stream = self.client.chat.completions.create(
+                stream=True,
+                stream_options={"include_usage": True},
+                **self._request(system_prompt, user_prompt, expect_json, timeout)
+            )
+            for chunk in stream:
+                if chunk.usage is not None:
+                    self._track_usage(sp, chunk.usage)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+
+class AsyncOpenAIClient(OpenAIClient):
+    """
+    Variante async del client: `agenerate` non occupa un worker del threadpool
+    per tutta la latenza della completion. Il numero di chiamate in volo è
+    limitato da un semaforo. `generate` resta disponibile per i percorsi sync.
+    """
+    def __init__(
+        self,
+        model: str = "gpt-4.1-mini",
+        max_concurrency: int = 16,
+        max_retries: Optional[int] = None
+    ):
+        """
+        Args:
+            model (str, optional): Nome del modello OpenAI da usare.
+            max_concurrency (int, optional): Chiamate LLM concorrenti massime.
+            max_retries (int, optional): Retry interni dell'SDK OpenAI.
+        """
+        super().__init__(model=model, max_retries=max_retries)
+        self.aclient = AsyncOpenAI(**self._sdk_kwargs)
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def agenerate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        expect_json: bool = False,
+        timeout: Optional[float] = None
+    ) -> str:
+        """
+        Versione async di `generate`.
+        """
+        async with self._semaphore:
+            with span("llm.agenerate", "llm", model=self.model) as sp:
+                response = await self.aclient.chat.completions.create(
+                    **self._request(system_prompt, user_prompt, expect_json, timeout)
+                )
+                self._track_usage(sp, response.usage)
+        return response.choices[0].message.content
+
+    async def agenerate_stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        expect_json: bool = False,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """
+        Versione async di `generate_stream`. Lo slot del semaforo resta
+        occupato per tutta la durata dello stream.
+        """
+        async with self._semaphore:
+            with span("llm.agenerate_stream", "llm", attach=False, model=self.model) as sp:
+                stream = await self.aclient.chat.completions.create(
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    **self._request(system_prompt, user_prompt, expect_json, timeout)
+                )
+                async for chunk in stream:
+                    if chunk.usage is not None:
+                        self._track_usage(sp, chunk.usage)
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+
+
+async def agenerate(llm, system_prompt: str, user_prompt: str, expect_json: bool = False) -> str:
+    """
+    Chiama `llm.agenerate` se il client è async, altrimenti esegue
+    `llm.generate` in un thread (per client sync, fake o wrapper).
+    """
+    if hasattr(llm, "agenerate"):
+        return await llm.agenerate(
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            expect_json=expect_json
+        )
+
+    return await asyncio.to_thread(
+        llm.generate,
+        system_prompt=system_prompt,
+        user_prompt=user_prompt,
+        expect_json=expect_json
+    )
+
+
+async def agenerate_stream(llm, system_prompt: str, user_prompt: str, expect_json: bool = False) -> AsyncIterator[str]:
+    """
+    Stream async dei token se il client lo supporta, altrimenti
+    un unico frammento con la risposta completa.
+    """
+    if hasattr(llm, "agenerate_stream"):
+        async for token in llm.agenerate_stream(
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            expect_json=expect_json
+        ):
+            yield token
+        return
+
+    yield await agenerate(
+        llm,
+        system_prompt=system_prompt,
+        user_prompt=user_prompt,
+        expect_json=expect_json
+    )
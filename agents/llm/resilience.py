@@ -0,0 +1,439 @@
+"""
+Livello di resilienza per le chiamate LLM.
+
+Avvolge il client (stessa interfaccia: generate, agenerate, generate_stream,
+agenerate_stream) e aggiunge:
+- token bucket su richieste/minuto (RPM) e token/minuto (TPM), per restare
+  sotto i limiti del provider invece di scoprirli a colpi di 429;
+- retry con backoff esponenziale e jitter sugli errori transitori
+  (429, timeout, connessione, 5xx), rispettando l'header Retry-After;
+- deadline complessiva per chiamata: il timeout di ogni tentativo è il
+  tempo rimasto, e non si ritenta se l'attesa sforerebbe la deadline;
+- circuit breaker: dopo N fallimenti consecutivi le chiamate falliscono
+  subito per `reset_timeout` secondi, poi passa una chiamata di prova.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import AsyncIterator, Iterator, Optional, Tuple, Type
+
+import openai
+
+from agents.llm.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_ERRORS: Tuple[Type[BaseException], ...] = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+# errori che indicano un servizio degradato e contano per il circuit breaker;
+# i 429 no: li gestiscono token bucket e backoff con Retry-After
+BREAKER_ERRORS: Tuple[Type[BaseException], ...] = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    Il circuit breaker è aperto: la chiamata non viene nemmeno tentata.
+    """
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    """
+    La chiamata non può completarsi entro la deadline configurata.
+    """
+
+
+# -------------------------
+# TOKEN BUCKET
+# -------------------------
+
+class TokenBucket:
+    """
+    Token bucket thread-safe con ricarica continua di `rate_per_minute`.
+
+    `reserve` prenota subito i token (il saldo può andare in negativo) e
+    restituisce l'attesa necessaria: le richieste concorrenti si mettono
+    in coda in ordine invece di svegliarsi tutte insieme.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float, max_wait: Optional[float] = None) -> float:
+        """
+        Prenota `amount` token e restituisce i secondi da attendere.
+
+        Raises:
+            LLMDeadlineExceeded: se l'attesa supererebbe `max_wait`
+                (in tal caso non viene prenotato nulla).
+        """
+        # una richiesta più grande della capacità non sarebbe mai servita
+        amount = min(amount, self.capacity)
+
+        with self._lock:
+            self._refill(time.monotonic())
+            deficit = amount - self._tokens
+            wait = deficit / self.rate if deficit > 0 else 0.0
+
+            if max_wait is not None and wait > max_wait:
+                raise LLMDeadlineExceeded(
+                    f"rate limit wait {wait:.1f}s exceeds deadline"
+                )
+
+            self._tokens -= amount
+            return wait
+
+    def refund(self, amount: float) -> None:
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+    def acquire(self, amount: float = 1, max_wait: Optional[float] = None) -> float:
+        wait = self.reserve(amount, max_wait)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def aacquire(self, amount: float = 1, max_wait: Optional[float] = None) -> float:
+        wait = self.reserve(amount, max_wait)
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+
+# -------------------------
+# CIRCUIT BREAKER
+# -------------------------
+
+class CircuitBreaker:
+    """
+    Stati: closed → open (dopo `failure_threshold` errori consecutivi)
+    → half_open (dopo `reset_timeout` secondi, una sola chiamata di prova)
+    → closed se la prova riesce, altrimenti di nuovo open.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self.state == "closed":
+                return
+
+            if self.state == "open":
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    raise CircuitOpenError("LLM circuit breaker is open")
+                self.state = "half_open"
+                self._probe_in_flight = False
+
+            if self._probe_in_flight:
+                raise CircuitOpenError("LLM circuit breaker is half-open")
+            self._probe_in_flight = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != "closed":
+                logger.info("LLM circuit breaker closed")
+            self.state = "closed"
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def release(self) -> None:
+        """
+        Libera lo slot di prova senza esito (errore non transitorio,
+        deadline, stream interrotto dal chiamante).
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning(
+                        "LLM circuit breaker opened after %s failures", self._failures
+                    )
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+# -------------------------
+# CLIENT WRAPPER
+# -------------------------
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """
+    Secondi indicati dal provider nell'header Retry-After, se presente.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    value = headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class ResilientLLMClient:
+    """
+    Wrapper con la stessa interfaccia del client LLM che applica rate
+    limiting, retry con backoff, deadline e circuit breaker.
+
+    Gli stream vengono ritentati solo se falliscono prima del primo token:
+    dopo, il chiamante ha già ricevuto testo parziale e l'errore risale.
+    """
+
+    def __init__(
+        self,
+        inner,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        max_retries: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+        deadline: float = 60.0,
+        expected_output_tokens: int = 800,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        self.inner = inner
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.expected_output_tokens = expected_output_tokens
+        self.breaker = breaker or CircuitBreaker()
+        self.retries = 0
+
+    def __getattr__(self, name):
+        # model, temperature, ... del client sottostante
+        return getattr(self.inner, name)
+
+    # -------------------------
+    # INTERNALS
+    # -------------------------
+
+    def _cost(self, system_prompt: str, user_prompt: str) -> int:
+        return (
+            estimate_tokens(system_prompt)
+            + estimate_tokens(user_prompt)
+            + self.expected_output_tokens
+        )
+
+    def _remaining(self, deadline_at: float) -> float:
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            raise LLMDeadlineExceeded(f"LLM call exceeded {self.deadline}s deadline")
+        return remaining
+
+    def _reserve(self, cost: int, deadline_at: float) -> float:
+        """
+        Prenota una richiesta e `cost` token; restituisce l'attesa totale.
+        """
+        max_wait = self._remaining(deadline_at)
+        wait = 0.0
+
+        if self.requests:
+            wait = self.requests.reserve(1, max_wait)
+
+        if self.tokens:
+            try:
+                wait = max(wait, self.tokens.reserve(cost, max_wait))
+            except LLMDeadlineExceeded:
+                if self.requests:
+                    self.requests.refund(1)
+                raise
+
+        return wait
+
+    def _record_failure(self, error: BaseException) -> None:
+        """
+        Solo 5xx, timeout ed errori di connessione aprono il breaker: una
+        raffica di 429 durante il fan-out non deve far fallire ogni goal.
+        """
+        if isinstance(error, BREAKER_ERRORS):
+            self.breaker.record_failure()
+        else:
+            self.breaker.release()
+
+    def _backoff(self, attempt: int, error: BaseException, deadline_at: float) -> float:
+        """
+        Attesa prima del prossimo tentativo, oppure rilancia l'errore se
+        i tentativi sono finiti o l'attesa sforerebbe la deadline.
+        """
+        self._record_failure(error)
+
+        if attempt >= self.max_retries:
+            raise error
+
+        delay = _retry_after(error)
+        if delay is None:
+            # full jitter: evita che i client ritentino tutti insieme
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+        if time.monotonic() + delay >= deadline_at:
+            raise LLMDeadlineExceeded(
+                f"LLM call exceeded {self.deadline}s deadline"
+            ) from error
+
+        self.retries += 1
+        logger.warning(
+            "LLM call failed (%s), retry %s/%s in %.2fs",
+            type(error).__name__, attempt + 1, self.max_retries, delay
+        )
+        return delay
+
+    # -------------------------
+    # GENERATE
+    # -------------------------
+
+    def generate(self, system_prompt: str, user_prompt: str, expect_json: bool = False) -> str:
+        deadline_at = time.monotonic() + self.deadline
+        cost = self._cost(system_prompt, user_prompt)
+
+        for attempt in range(self.max_retries + 1):
+            self.breaker.before_call()
+            try:
+                time.sleep(self._reserve(cost, deadline_at))
+                value = self.inner.generate(
+                    system_prompt=system_prompt,
+                    user_prompt=user_prompt,
+                    expect_json=expect_json,
+                    timeout=self._remaining(deadline_at)
+                )
+            except RETRYABLE_ERRORS as e:
+                time.sleep(self._backoff(attempt, e, deadline_at))
+                continue
+            except BaseException:
+                self.breaker.release()
+                raise
+
+            self.breaker.record_success()
+            return value
+
+    async def agenerate(self, system_prompt: str, user_prompt: str, expect_json: bool = False) -> str:
+        deadline_at = time.monotonic() + self.deadline
+        cost = self._cost(system_prompt, user_prompt)
+
+        for attempt in range(self.max_retries + 1):
+            self.breaker.before_call()
+            try:
+                await asyncio.sleep(self._reserve(cost, deadline_at))
+                kwargs = dict(
+                    system_prompt=system_prompt,
+                    user_prompt=user_prompt,
+                    expect_json=expect_json,
+                    timeout=self._remaining(deadline_at)
+                )
+                if hasattr(self.inner, "agenerate"):
+                    value = await self.inner.agenerate(**kwargs)
+                else:
+                    value = await asyncio.to_thread(self.inner.generate, **kwargs)
+            except RETRYABLE_ERRORS as e:
+                await asyncio.sleep(self._backoff(attempt, e, deadline_at))
+                continue
+            except BaseException:
+                self.breaker.release()
+                raise
+
+            self.breaker.record_success()
+            return value
+
+    def generate_stream(self, system_prompt: str, user_prompt: str, expect_json: bool = False) -> Iterator[str]:
+        deadline_at = time.monotonic() + self.deadline
+        cost = self._cost(system_prompt, user_prompt)
+
+        for attempt in range(self.max_retries + 1):
+            self.breaker.before_call()
+
+            started = False
+            try:
+                time.sleep(self._reserve(cost, deadline_at))
+                for token in self.inner.generate_stream(
+                    system_prompt=system_prompt,
+                    user_prompt=user_prompt,
+                    expect_json=expect_json,
+                    timeout=self._remaining(deadline_at)
+                ):
+                    started = True
+                    yield token
+            except RETRYABLE_ERRORS as e:
+                if started:
+                    self._record_failure(e)
+                    raise
+                time.sleep(self._backoff(attempt, e, deadline_at))
+                continue
+            except BaseException:
+                self.breaker.release()
+                raise
+
+            self.breaker.record_success()
+            return
+
+    async def agenerate_stream(self, system_prompt: str, user_prompt: str, expect_json: bool = False) -> AsyncIterator[str]:
+        if not hasattr(self.inner, "agenerate_stream"):
+            yield await self.agenerate(system_prompt, user_prompt, expect_json)
+            return
+
+        deadline_at = time.monotonic() + self.deadline
+        cost = self._cost(system_prompt, user_prompt)
+
+        for attempt in range(self.max_retries + 1):
+            self.breaker.before_call()
+
+            started = False
+            try:
+                await asyncio.sleep(self._reserve(cost, deadline_at))
+                async for token in self.inner.agenerate_stream(
+                    system_prompt=system_prompt,
+                    user_prompt=user_prompt,
+                    expect_json=expect_json,
+                    timeout=self._remaining(deadline_at)
+                ):
+                    started = True
+                    yield token
+            except RETRYABLE_ERRORS as e:
+                if started:
+                    self._record_failure(e)
+                    raise
+                await asyncio.sleep(self._backoff(attempt, e, deadline_at))
+                continue
+            except BaseException:
+                self.breaker.release()
+                raise
+
+            self.breaker.record_success()
+            return
+
+    def stats(self) -> dict:
+        return {"retries": self.retries, "breaker": self.breaker.state}
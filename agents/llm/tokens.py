@@ -0,0 +1,53 @@
+"""
+Stima dei token per prompt e completion.
+
+Stima euristica (~4 caratteri per token): sufficiente per rate limiting
+e budget, senza dipendere dal tokenizer del modello.
+"""
+
+from typing import List, Tuple
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Numero approssimato di token di `text`.
+    """
+    if not text:
+        return 0
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Tronca `text` a circa `max_tokens` token (con "…" se tagliato).
+    """
+    max_chars = max(0, max_tokens) * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    return text[:max(0, max_chars - 1)] + "…"
+
+
+def fit_to_budget(items: List[str], max_tokens: int) -> Tuple[List[str], int]:
+    """
+    Prende gli elementi in ordine finché stanno nel budget (una riga per
+    elemento). Se nemmeno il primo ci sta, viene troncato.
+
+    Returns:
+        Tuple[List[str], int]: elementi inclusi e numero di esclusi.
+    """
+    kept: List[str] = []
+    used = 0
+
+    for item in items:
+        cost = estimate_tokens(item)
+        if used + cost > max_tokens:
+            break
+        kept.append(item)
+        used += cost
+
+    if not kept and items:
+        kept.append(truncate_to_tokens(items[0], max_tokens))
+
+    return kept, len(items) - len(kept)
@@ -0,0 +1,146 @@
+"""
+Contabilità dei token LLM per chiamata e per goal.
+
+Ogni client registra il `response.usage` di ogni chiamata nel proprio
+UsageTracker (esposto come `llm.usage`, anche attraverso i wrapper di
+cache e resilienza). Il goal viene preso dallo scope corrente
+(`goal_scope`, aperto dal Supervisor e dagli endpoint di streaming):
+essendo una contextvar segue anche i passi del DAG e asyncio.to_thread.
+Prima che il goal esista (anteprima del piano) i token vengono registrati
+sotto una chiave provvisoria (non intera, es. "plan:<preview_id>") e
+spostati sul goal con `transfer`. Le chiavi provvisorie stanno in una mappa
+separata e limitata: quelle mai confermate (anteprime scadute) non si
+accumulano e non compaiono tra i goal.
+"""
+
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Hashable, Iterator, Optional
+
+_current_goal: ContextVar[Optional[Hashable]] = ContextVar("llm_goal_id", default=None)
+
+
+@contextmanager
+def goal_scope(goal_id: Optional[Hashable]) -> Iterator[None]:
+    """
+    Attribuisce al goal (o a una chiave provvisoria) le chiamate LLM
+    eseguite nel blocco. Utilizzabile anche nei generatori async.
+    """
+    token = _current_goal.set(goal_id)
+    try:
+        yield
+    finally:
+        try:
+            _current_goal.reset(token)
+        except ValueError:
+            # generatore chiuso da un altro contesto (es. aclose dal GC)
+            pass
+
+
+def current_goal() -> Optional[Hashable]:
+    return _current_goal.get()
+
+
+def _empty() -> Dict[str, int]:
+    return {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+
+
+class UsageTracker:
+    """
+    Totali di processo, totali per goal e ultima chiamata.
+    Le chiavi provvisorie oltre `max_provisional` vengono scartate
+    a partire dalla meno recente (i token restano nei totali).
+    """
+
+    def __init__(self, max_provisional: int = 1024):
+        self._totals = _empty()
+        self._per_goal: Dict[int, Dict[str, int]] = {}
+        self._provisional: "OrderedDict[Hashable, Dict[str, int]]" = OrderedDict()
+        self.max_provisional = max_provisional
+        self._lock = threading.Lock()
+        self.last: Optional[Dict] = None
+
+    def record(
+        self,
+        prompt_tokens: int,
+        completion_tokens: int,
+        goal_id: Optional[Hashable] = None
+    ) -> None:
+        goal_id = current_goal() if goal_id is None else goal_id
+
+        with self._lock:
+            buckets = [self._totals]
+            if isinstance(goal_id, int):
+                buckets.append(self._per_goal.setdefault(goal_id, _empty()))
+            elif goal_id is not None:
+                buckets.append(self._provisional_bucket(goal_id))
+
+            for b in buckets:
+                b["calls"] += 1
+                b["prompt_tokens"] += prompt_tokens
+                b["completion_tokens"] += completion_tokens
+                b["total_tokens"] += prompt_tokens + completion_tokens
+
+            self.last = {
+                "goal_id": goal_id,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+            }
+
+    def totals(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._totals)
+
+    def for_goal(self, goal_id: Hashable) -> Dict[str, int]:
+        with self._lock:
+            usage = self._per_goal.get(goal_id) or self._provisional.get(goal_id)
+            return dict(usage or _empty())
+
+    def transfer(self, source: Hashable, goal_id: int) -> None:
+        """
+        Sposta sul goal i token registrati sotto una chiave provvisoria.
+        """
+        with self._lock:
+            moved = self._provisional.pop(source, None)
+            if moved is None:
+                return
+
+            bucket = self._per_goal.setdefault(goal_id, _empty())
+            for key, value in moved.items():
+                bucket[key] += value
+
+    def discard(self, source: Hashable) -> None:
+        """
+        Scarta una chiave provvisoria che non diventerà un goal
+        (anteprima scaduta, pianificazione fallita).
+        """
+        with self._lock:
+            self._provisional.pop(source, None)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "totals": dict(self._totals),
+                "per_goal": {g: dict(u) for g, u in self._per_goal.items()},
+                "provisional": len(self._provisional),
+                "last": self.last,
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._totals = _empty()
+            self._per_goal.clear()
+            self._provisional.clear()
+            self.last = None
+
+    def _provisional_bucket(self, key: Hashable) -> Dict[str, int]:
+        bucket = self._provisional.get(key)
+        if bucket is None:
+            bucket = self._provisional[key] = _empty()
+            while len(self._provisional) > self.max_provisional:
+                self._provisional.popitem(last=False)
+        else:
+            self._provisional.move_to_end(key)
+        return bucket
@@ -1,6 +1,12 @@
+import asyncio
 import json
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+
+from agents.llm.openai_client import agenerate
+from agents.llm.tokens import fit_to_budget, truncate_to_tokens
 from storage.qdrant import VectorStorage
+from tools.memory_tools import archive_old_memories
+from app.tracing import traced
 
 
 class MemoryAgent:
@@ -8,9 +14,11 @@ class MemoryAgent:
     Agent che gestisce la memoria semantica: riflessioni, compressione e recupero contesto.
     """
 
-    def __init__(self, llm_client, vector_store: VectorStorage):
+    def __init__(self, llm_client, vector_store: VectorStorage, prompt_budget: int = 1500):
         self.llm = llm_client
         self.vector_store = vector_store
+        # token massimi delle memorie nel prompt (reflection e compressione)
+        self.prompt_budget = prompt_budget
         self.system_prompt = open(
             "agents/prompts/memory.txt", encoding="utf-8"
         ).read()
@@ -19,6 +27,7 @@ class MemoryAgent:
     # WEEKLY REFLECTION
     # -------------------------
 
+    @traced("memory.weekly_reflection")
     def weekly_reflection(self, goal_id: int) -> None:
         memories = self.vector_store.search_memories(
             goal_id=goal_id,
@@ -29,7 +38,7 @@ class MemoryAgent:
         if not memories:
             return
 
-        context = "\n".join(m["content"] for m in memories)
+        context = self._memory_context([m["content"] for m in memories])
 
         raw_output = self.llm.generate(
             system_prompt=self.system_prompt,
@@ -47,10 +56,46 @@ class MemoryAgent:
                 source="memory_agent"
             )
 
+    @traced("memory.weekly_reflection")
+    async def aweekly_reflection(self, goal_id: int) -> None:
+        """
+        Versione async di `weekly_reflection`.
+        """
+        memories = await asyncio.to_thread(
+            self.vector_store.search_memories,
+            goal_id=goal_id,
+            text="last week progress",
+            limit=20
+        )
+
+        if not memories:
+            return
+
+        context = self._memory_context([m["content"] for m in memories])
+
+        raw_output = await agenerate(
+            self.llm,
+            system_prompt=self.system_prompt,
+            user_prompt=f"Recent context:\n{context}",
+            expect_json=True
+        )
+
+        memory = self._validate_and_parse(raw_output)
+
+        if memory["store"]:
+            await asyncio.to_thread(
+                self.vector_store.write_memory,
+                goal_id=goal_id,
+                content=memory["content"],
+                memory_type=memory["memory_type"],
+                source="memory_agent"
+            )
+
     # -------------------------
     # CONTEXT FOR COACH
     # -------------------------
 
+    @traced("memory.get_context_for_coach")
     def get_context_for_coach(self, goal_id: int) -> str:
         memories = self.vector_store.search_memories(
             goal_id=goal_id,
@@ -60,10 +105,70 @@ class MemoryAgent:
 
         return "\n".join(f"- {m['content']}" for m in memories)
 
+    # -------------------------
+    # COMPACTION
+    # -------------------------
+
+    def compress_memories(self, memories: List[Dict]) -> Optional[str]:
+        """
+        Riassume un batch di memorie vecchie in un'unica memoria.
+        None se l'LLM non ritiene utile conservare nulla (store: false).
+        """
+        # il batch viene archiviato: ogni memoria deve restare nel prompt,
+        # quindi si accorcia ciascuna invece di escluderne alcune
+        per_memory = max(16, self.prompt_budget // max(1, len(memories)))
+        context = "\n".join(
+            truncate_to_tokens(f"- [{m.get('type')}] {m['content']}", per_memory)
+            for m in memories
+        )
+
+        raw_output = self.llm.generate(
+            system_prompt=self.system_prompt,
+            user_prompt=(
+                "Compress these old memories into one concise insight "
+                f"that preserves what is still useful:\n{context}"
+            ),
+            expect_json=True
+        )
+
+        memory = self._validate_and_parse(raw_output)
+        if not memory["store"]:
+            return None
+
+        return memory["content"]
+
+    @traced("memory.compact_memories")
+    def compact_memories(
+        self,
+        goal_id: int,
+        older_than_days: int = 30,
+        batch_size: int = 50
+    ) -> Dict:
+        """
+        Compatta le memorie del goal più vecchie di `older_than_days`
+        usando `compress_memories` come riassunto di ogni batch.
+        """
+        return archive_old_memories(
+            vector_store=self.vector_store,
+            goal_id=goal_id,
+            older_than_days=older_than_days,
+            summarize=self.compress_memories,
+            batch_size=batch_size
+        )
+
     # -------------------------
     # INTERNALS
     # -------------------------
 
+    def _memory_context(self, lines: List[str]) -> str:
+        """
+        Righe di memoria (in ordine di rilevanza) entro `prompt_budget` token.
+        """
+        kept, dropped = fit_to_budget(lines, self.prompt_budget)
+        if dropped:
+            kept.append(f"({dropped} less relevant memories omitted)")
+        return "\n".join(kept)
+
     def _validate_and_parse(self, raw_output: str) -> Dict[str, Any]:
         try:
             data = json.loads(raw_output)
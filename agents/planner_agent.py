@@ -3,13 +3,19 @@ Agent che pianifica obiettivi decomponendoli in task tramite LLM.
 Gestisce la generazione, validazione e salvataggio di piani e task nel sistema.
 """
 
+import asyncio
 import json
 import logging
-from typing import Dict, Any
+from typing import AsyncIterator, Dict, Any, Optional
 
-from tools.state_tools import write_goal_state, create_task
+from agents.llm.json_stream import JsonArrayStreamParser
+from agents.llm.openai_client import agenerate, agenerate_stream
+from agents.llm.usage import goal_scope
+from tools.state_tools import write_goal_with_tasks
 from tools.memory_tools import store_plan_version
 from storage.qdrant import VectorStorage
+from storage.plan_previews import PlanPreviewStore, PreviewExpiredError
+from app.tracing import traced
 
 
 class PlannerAgent:
@@ -18,16 +24,23 @@ class PlannerAgent:
     Utilizza un LLM per generare roadmap e task, li valida e li salva nel sistema.
     """
 
-    def __init__(self, llm_client, vector_store: VectorStorage):
+    def __init__(
+        self,
+        llm_client,
+        vector_store: VectorStorage,
+        previews: Optional[PlanPreviewStore] = None
+    ):
         """
         Inizializza il PlannerAgent con un client LLM e il VectorStorage.
 
         Args:
             llm_client: Oggetto client per la generazione LLM.
             vector_store (VectorStorage): Storage per memorie e versioni di piano.
+            previews (PlanPreviewStore, optional): Store dei piani in anteprima.
         """
         self.llm = llm_client
         self.vector_store = vector_store
+        self.previews = previews or PlanPreviewStore()
         self.system_prompt = open(
             "agents/prompts/planner.txt", encoding="utf-8"
         ).read()
@@ -38,6 +51,7 @@ class PlannerAgent:
     # PLAN GENERATION
     # -------------------------
 
+    @traced("planner.plan")
     def plan(self, goal_text: str) -> Dict[str, Any]:
         """
         Genera un piano strutturato (roadmap e task) a partire da un testo obiettivo.
@@ -52,36 +66,206 @@ class PlannerAgent:
 
         return self._validate_and_parse(raw_output)
 
+    @traced("planner.plan")
+    async def aplan(self, goal_text: str) -> Dict[str, Any]:
+        """
+        Versione async di `plan`.
+        """
+        raw_output = await agenerate(
+            self.llm,
+            system_prompt=self.system_prompt,
+            user_prompt=goal_text,
+            expect_json=True
+        )
+
+        logging.info("Planner raw output:\n%s", raw_output)
+
+        return self._validate_and_parse(raw_output)
+
+    async def astream_plan(self, goal_text: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Versione streaming di `plan`: emette ogni task appena il suo JSON
+        è completo, poi il piano intero validato.
+
+        Yields:
+            Dict: eventi {"type": "task", "task": ...} e infine {"type": "plan", "plan": ...}.
+        """
+        parser = JsonArrayStreamParser("tasks")
+        preview_id = self.previews.new_id()
+
+        with goal_scope(self._plan_key(preview_id)):
+            async for token in agenerate_stream(
+                self.llm,
+                system_prompt=self.system_prompt,
+                user_prompt=goal_text,
+                expect_json=True
+            ):
+                for task in parser.feed(token):
+                    yield {"type": "task", "task": task}
+
+        logging.info("Planner raw output:\n%s", parser.text)
+
+        plan = self._validate_and_parse(parser.text)
+        yield {
+            "type": "plan",
+            "plan": plan,
+            "preview_id": self.previews.put(goal_text, plan, preview_id=preview_id)
+        }
+
+    # -------------------------
+    # PREVIEW
+    # -------------------------
+
+    def preview(self, goal_text: str) -> Dict[str, Any]:
+        """
+        Genera il piano e lo conserva nello store delle anteprime.
+
+        Returns:
+            Dict: il piano con in più la chiave `preview_id` da passare a `confirm`.
+        """
+        preview_id = self.previews.new_id()
+        # goal non ancora creato: token sotto una chiave provvisoria fino a confirm
+        with goal_scope(self._plan_key(preview_id)):
+            plan = self.plan(goal_text)
+        return {**plan, "preview_id": self.previews.put(goal_text, plan, preview_id=preview_id)}
+
+    async def apreview(self, goal_text: str) -> Dict[str, Any]:
+        """
+        Versione async di `preview`.
+        """
+        preview_id = self.previews.new_id()
+        with goal_scope(self._plan_key(preview_id)):
+            plan = await self.aplan(goal_text)
+        return {**plan, "preview_id": self.previews.put(goal_text, plan, preview_id=preview_id)}
+
+    @traced("planner.confirm")
+    def confirm(self, preview_id: Optional[str], goal_text: str) -> int:
+        """
+        Persiste esattamente il piano approvato in anteprima.
+        L'anteprima viene prelevata atomicamente prima del salvataggio (un
+        doppio click non crea due goal) e rimessa nello store se la
+        scrittura fallisce, così la conferma può essere ripetuta.
+
+        Raises:
+            PreviewExpiredError: anteprima assente o scaduta (nessuna
+                nuova chiamata LLM: il piano va rigenerato e rivisto).
+        """
+        cached = self._claim_preview(preview_id)
+        try:
+            goal_id = self._persist_plan(cached["goal_text"], cached["plan"])
+        except BaseException:
+            self._restore_preview(preview_id, cached)
+            raise
+        self._attribute_usage(self._plan_key(preview_id), goal_id)
+        return goal_id
+
+    @traced("planner.confirm")
+    async def aconfirm(self, preview_id: Optional[str], goal_text: str) -> int:
+        """
+        Versione async di `confirm`.
+        """
+        cached = self._claim_preview(preview_id)
+        try:
+            goal_id = await asyncio.to_thread(
+                self._persist_plan, cached["goal_text"], cached["plan"]
+            )
+        except BaseException:
+            self._restore_preview(preview_id, cached)
+            raise
+        self._attribute_usage(self._plan_key(preview_id), goal_id)
+        return goal_id
+
+    def _claim_preview(self, preview_id: Optional[str]) -> Dict[str, Any]:
+        cached = self.previews.pop(preview_id) if preview_id else None
+
+        if cached is None:
+            if preview_id:
+                # i token dell'anteprima scaduta non verranno più attribuiti
+                self._discard_usage(self._plan_key(preview_id))
+            raise PreviewExpiredError("preview expired, please re-preview")
+
+        return cached
+
+    def _restore_preview(self, preview_id: str, cached: Dict[str, Any]) -> None:
+        self.previews.put(cached["goal_text"], cached["plan"], preview_id=preview_id)
+
+    # -------------------------
+    # USAGE
+    # -------------------------
+
+    @staticmethod
+    def _plan_key(plan_id: str) -> str:
+        return f"plan:{plan_id}"
+
+    def _attribute_usage(self, key: str, goal_id: int) -> None:
+        """
+        Sposta sul goal appena creato i token spesi per pianificarlo.
+        """
+        usage = getattr(self.llm, "usage", None)
+        if usage is not None:
+            usage.transfer(key, goal_id)
+
+    def _discard_usage(self, key: str) -> None:
+        """
+        Scarta la chiave provvisoria di un piano che non diventerà un goal.
+        """
+        usage = getattr(self.llm, "usage", None)
+        if usage is not None:
+            usage.discard(key)
+
     # -------------------------
     # EXECUTION
     # -------------------------
 
+    @traced("planner.execute")
     def execute(self, goal_text: str) -> int:
         """
         Esegue l'intero ciclo di pianificazione:
-        - Crea il goal
         - Genera e valida il piano
+        - Crea il goal
         - Crea i task associati
         - Salva la versione del piano come memoria
         """
-        # 1. Create goal (stato deterministico → SQLite)
-        goal_id = write_goal_state(
-            description=goal_text,
-            status="active"
-        )
+        key = self._plan_key(self.previews.new_id())
+        try:
+            with goal_scope(key):
+                plan = self.plan(goal_text)
+            goal_id = self._persist_plan(goal_text, plan)
+        except BaseException:
+            self._discard_usage(key)
+            raise
+        self._attribute_usage(key, goal_id)
+        return goal_id
 
-        # 2. Generate plan via LLM
-        plan = self.plan(goal_text)
+    @traced("planner.execute")
+    async def aexecute(self, goal_text: str) -> int:
+        """
+        Versione async di `execute`: LLM async, persistenza in un thread.
+        """
+        key = self._plan_key(self.previews.new_id())
+        try:
+            with goal_scope(key):
+                plan = await self.aplan(goal_text)
+            goal_id = await asyncio.to_thread(self._persist_plan, goal_text, plan)
+        except BaseException:
+            self._discard_usage(key)
+            raise
+        self._attribute_usage(key, goal_id)
+        return goal_id
 
-        # 3. Create tasks
+    def _persist_plan(self, goal_text: str, plan: Dict[str, Any]) -> int:
+        """
+        Salva goal, task e versione del piano già validato.
+        """
+        # 1. Create goal + tasks in una sola transazione (→ SQLite)
         tasks = sorted(plan["tasks"], key=lambda t: t["order"])
-        for task in tasks:
-            create_task(
-                goal_id=goal_id,
-                description=f'{task["title"]}: {task["description"]}'
-            )
+        goal_id = write_goal_with_tasks(
+            description=goal_text,
+            tasks=[f'{t["title"]}: {t["description"]}' for t in tasks],
+            status="active"
+        )
 
-        # 4. Store plan version (memoria → Vector DB)
+        # 2. Store plan version (memoria → Vector DB)
         store_plan_version(
             vector_store=self.vector_store,
             goal_id=goal_id,
@@ -118,6 +302,7 @@ class PlannerAgent:
         return data
 
 
+    @traced("planner.execute_with_feedback")
     def execute_with_feedback(
         self,
         goal_id: int,
@@ -1,11 +1,27 @@
 """
 Scheduler eventi periodici del sistema agentico.
 Gestisce DAILY e WEEKLY.
+
+Ogni run fa fan-out su tutti i goal attivi: gli ID vengono letti da SQLite
+a pagine e ogni goal viene elaborato dal Supervisor su un pool di thread
+limitato, con partenze scaglionate (jitter), timeout per goal, deadline
+complessiva e report finale. Con Qdrant embedded le chiamate dei goal
+paralleli al Vector DB vengono serializzate da VectorStorage (client non
+thread-safe); LLM e SQLite restano concorrenti.
 """
 
 import logging
+import random
+import threading
+import time
+from datetime import datetime
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Optional
+
 from apscheduler.schedulers.background import BackgroundScheduler
 
+from app.config import Config
+from storage.crud import iter_goal_ids, purge_daily_messages
 from supervisor.events import EventType
 from supervisor.state import AppState
 
@@ -17,28 +33,161 @@ class AgentScheduler:
     Wrapper APScheduler per triggerare eventi Supervisor.
     """
 
-    def __init__(self, supervisor):
+    def __init__(
+        self,
+        supervisor,
+        max_workers: Optional[int] = None,
+        goal_timeout: Optional[float] = None,
+        jitter: Optional[float] = None,
+        page_size: Optional[int] = None,
+        deadline: Optional[float] = None
+    ):
         self.supervisor = supervisor
         self.scheduler = BackgroundScheduler()
 
+        self.max_workers = max_workers or Config.SCHEDULER_WORKERS
+        self.goal_timeout = goal_timeout or Config.SCHEDULER_GOAL_TIMEOUT_S
+        self.jitter = Config.SCHEDULER_JITTER_S if jitter is None else jitter
+        self.page_size = page_size or Config.SCHEDULER_PAGE_SIZE
+        self.deadline = deadline or Config.SCHEDULER_DEADLINE_S
+
     # -------------------------
     # JOBS
     # -------------------------
 
     def _daily_job(self):
         logger.info("🗓 DAILY event triggered")
-
-        self.supervisor.handle(
-            AppState(event=EventType.DAILY)
-        )
+        # messaggi giornalieri in cache dei giorni precedenti
+        purged = purge_daily_messages(datetime.utcnow().date().isoformat())
+        logger.info("Purged %s stale daily messages", purged)
+        return self.fan_out(EventType.DAILY)
 
     def _weekly_job(self):
         logger.info("📅 WEEKLY event triggered")
+        return self.fan_out(EventType.WEEKLY)
+
+    # -------------------------
+    # FAN-OUT
+    # -------------------------
 
-        self.supervisor.handle(
-            AppState(event=EventType.WEEKLY)
+    def fan_out(self, event: EventType) -> Dict:
+        """
+        Esegue `event` per ogni goal attivo e restituisce il report:
+        total, ok, failed, timed_out, skipped (oltre la deadline),
+        still_running, duration_s.
+
+        I goal oltre il timeout vengono conteggiati come timed_out e non più
+        attesi, ma un thread non si può interrompere: quello che li elabora
+        resta occupato fino alla fine del goal e il pool lavora con un
+        worker in meno. still_running conta i goal scaduti ancora in
+        esecuzione alla fine del fan-out. Il timeout parte dall'avvio del
+        goal; i goal ancora in coda alla deadline vengono annullati e
+        conteggiati come skipped.
+        """
+        started_at = time.monotonic()
+        deadline_at = started_at + self.deadline
+
+        report = {
+            "event": event.value,
+            "total": 0,
+            "ok": 0,
+            "failed": 0,
+            "timed_out": 0,
+            "skipped": 0,
+        }
+
+        running_since: Dict[int, float] = {}
+        lock = threading.Lock()
+        abandoned = []
+
+        def run_goal(goal_id: int):
+            with lock:
+                running_since[goal_id] = time.monotonic()
+            return self.supervisor.handle(
+                AppState(event=event, goal_id=goal_id)
+            )
+
+        goals = iter_goal_ids(status="active", page_size=self.page_size)
+        in_flight = {}
+        exhausted = False
+
+        pool = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix=f"{event.value}-fanout"
         )
 
+        try:
+            while True:
+                # finestra limitata di goal in volo: memoria costante anche con 10k goal
+                while not exhausted and len(in_flight) < self.max_workers * 2:
+                    goal_id = next(goals, None)
+                    if goal_id is None:
+                        exhausted = True
+                    elif time.monotonic() > deadline_at:
+                        report["skipped"] += 1
+                    else:
+                        self._stagger(report["total"], started_at)
+                        report["total"] += 1
+                        in_flight[pool.submit(run_goal, goal_id)] = goal_id
+
+                if not in_flight:
+                    if exhausted:
+                        break
+                    continue
+
+                done, _ = wait(in_flight, timeout=1.0, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    goal_id = in_flight.pop(future)
+                    error = future.exception()
+                    if error is None:
+                        report["ok"] += 1
+                    else:
+                        report["failed"] += 1
+                        logger.warning("%s failed for goal %s: %r", event.value, goal_id, error)
+
+                now = time.monotonic()
+                with lock:
+                    expired = [
+                        f for f, goal_id in in_flight.items()
+                        if now - running_since.get(goal_id, now) > self.goal_timeout
+                    ]
+                for future in expired:
+                    goal_id = in_flight.pop(future)
+                    report["timed_out"] += 1
+                    abandoned.append(future)
+                    logger.warning("%s timed out for goal %s", event.value, goal_id)
+
+                if now > deadline_at:
+                    # goal in coda non ancora partiti: senza annullarli il fan-out
+                    # li attenderebbe oltre la deadline (il timeout parte all'avvio)
+                    for future in [f for f in in_flight if f.cancel()]:
+                        in_flight.pop(future)
+                        report["skipped"] += 1
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        report["still_running"] = sum(1 for f in abandoned if not f.done())
+        report["duration_s"] = round(time.monotonic() - started_at, 3)
+        logger.info("✅ %s fan-out completed: %s", event.value, report)
+
+        return report
+
+    def _stagger(self, index: int, started_at: float) -> None:
+        """
+        Jitter applicato dal dispatcher, non dai worker: i primi max_workers
+        goal partono distribuiti sui primi `jitter` secondi, poi i goal
+        successivi occupano gli slot man mano che si liberano (già sfasati).
+        Il ritardo complessivo resta <= jitter, indipendente dal numero di goal.
+        """
+        if not self.jitter or index >= self.max_workers:
+            return
+
+        release_at = started_at + self.jitter * (index + random.random()) / self.max_workers
+        delay = release_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
     # -------------------------
     # START / STOP
     # -------------------------
@@ -54,7 +203,9 @@ class AgentScheduler:
             self._daily_job,
             trigger="cron",
             hour=9,
-            minute=0
+            minute=0,
+            max_instances=1,
+            coalesce=True
         )
 
         self.scheduler.add_job(
@@ -62,7 +213,9 @@ class AgentScheduler:
             trigger="cron",
             day_of_week="mon",
             hour=8,
-            minute=0
+            minute=0,
+            max_instances=1,
+            coalesce=True
         )
 
         self.scheduler.start()
@@ -10,16 +10,29 @@ Responsabilità:
 - costruire Supervisor
 
 NESSUNA logica runtime qui.
+
+AppContext permette il warm-up lazy: le risorse pesanti (SentenceTransformer,
+Qdrant, client LLM, prompt) vengono create in un thread in background mentre
+il server accetta già richieste, oppure al primo uso.
 """
 
 import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
 from app.config import Config
 from app.logging import setup_logging
+from app.tracing import build_exporters, tracer
 
 from storage.sqlite import SQLiteDB
 from storage.qdrant import VectorStorage
+from storage.plan_previews import build_plan_preview_store
+from tools import feedback_tools
 
-from agents.llm.openai_client import OpenAIClient
+from agents.llm.openai_client import AsyncOpenAIClient
+from agents.llm.cache import CachedLLMClient, build_llm_cache_backend
+from agents.llm.fake_client import FakeLLMClient
+from agents.llm.resilience import CircuitBreaker, ResilientLLMClient
 from agents.planner_agent import PlannerAgent
 from agents.coach_agent import CoachAgent
 from agents.memory_agent import MemoryAgent
@@ -31,36 +44,154 @@ from supervisor.supervisor import Supervisor
 logger = logging.getLogger(__name__)
 
 
-def bootstrap():
+def check_multi_worker() -> None:
+    """
+    Con più worker uvicorn (WEB_CONCURRENCY > 1) ogni richiesta può
+    arrivare a un processo diverso: lo stato che deve sopravvivere tra
+    richieste va condiviso, altrimenti ad es. /confirm-plan non trova
+    l'anteprima creata da /plan-preview in un altro worker.
+    """
+    if Config.WORKERS <= 1:
+        return
+
+    problems = []
+    if not Config.QDRANT_URL:
+        problems.append("QDRANT_URL (embedded Qdrant locks its path to one process)")
+    if Config.PLAN_PREVIEW_BACKEND != "sqlite":
+        problems.append("PLAN_PREVIEW_BACKEND=sqlite (plan previews)")
+    if Config.LLM_CACHE_AGENTS and Config.LLM_CACHE_BACKEND != "sqlite":
+        problems.append("LLM_CACHE_BACKEND=sqlite (LLM response cache)")
+
+    if problems:
+        raise RuntimeError(
+            f"WEB_CONCURRENCY={Config.WORKERS} requires shared state: "
+            + "; ".join(problems)
+        )
+
+
+def bootstrap(on_stage: Optional[Callable[[str], None]] = None):
+    """
+    Costruisce tutte le dipendenze dell'applicazione.
+
+    Args:
+        on_stage (Callable, optional): Callback invocata con il nome di ogni
+            stage completato (usata da AppContext per il progresso di warm-up).
+
+    Returns:
+        dict: sqlite, vector_storage, llm, supervisor.
+    """
+    stage = on_stage or (lambda name: None)
+
     setup_logging()
+    tracer.set_exporters(build_exporters(Config.TRACE_EXPORTERS, path=Config.TRACE_FILE))
 
     logger.info("🚀 Starting %s [%s]", Config.APP_NAME, Config.ENV)
+    check_multi_worker()
 
     # -------------------------
     # SQLite
     # -------------------------
     sqlite_db = SQLiteDB()
     sqlite_db.run_migrations()
+    stage("sqlite")
 
     # -------------------------
     # Vector DB
     # -------------------------
-    vector_storage = VectorStorage(path=Config.QDRANT_PATH)
+    vector_storage = VectorStorage(
+        path=Config.QDRANT_PATH,
+        cache_size=Config.EMBEDDING_CACHE_SIZE,
+        cache_path=Config.EMBEDDING_CACHE_PATH,
+        tenancy=Config.QDRANT_TENANCY,
+        shards=Config.QDRANT_SHARDS,
+        url=Config.QDRANT_URL,
+        api_key=Config.QDRANT_API_KEY,
+        prefer_grpc=Config.QDRANT_PREFER_GRPC,
+        grpc_port=Config.QDRANT_GRPC_PORT,
+        timeout=Config.QDRANT_TIMEOUT_S,
+        pool_size=Config.QDRANT_POOL_SIZE
+    )
     vector_storage.init()
 
+    # i tool condividono lo stesso storage (e lo stesso encoder)
+    feedback_tools.set_vector_store(vector_storage)
+    stage("vector_storage")
+
     # -------------------------
     # LLM
     # -------------------------
-    llm = OpenAIClient(model=Config.LLM_MODEL)
+    if Config.LLM_BACKEND == "fake":
+        base_llm = FakeLLMClient(
+            latency=Config.LLM_FAKE_LATENCY_S,
+            jitter=Config.LLM_FAKE_JITTER_S,
+            error_rate=Config.LLM_FAKE_ERROR_RATE
+        )
+    elif Config.LLM_BACKEND == "openai":
+        # retry gestiti da ResilientLLMClient: quelli dell'SDK vengono disattivati
+        base_llm = AsyncOpenAIClient(
+            model=Config.LLM_MODEL,
+            max_concurrency=Config.LLM_MAX_CONCURRENCY,
+            max_retries=0
+        )
+    else:
+        raise ValueError(f"Unknown LLM backend: {Config.LLM_BACKEND}")
+
+    llm = ResilientLLMClient(
+        base_llm,
+        rpm=Config.LLM_RPM,
+        tpm=Config.LLM_TPM,
+        max_retries=Config.LLM_MAX_RETRIES,
+        deadline=Config.LLM_CALL_DEADLINE_S,
+        expected_output_tokens=Config.LLM_EXPECTED_OUTPUT_TOKENS,
+        breaker=CircuitBreaker(
+            failure_threshold=Config.LLM_BREAKER_THRESHOLD,
+            reset_timeout=Config.LLM_BREAKER_RESET_S
+        )
+    )
+
+    # cache delle risposte solo per gli agenti in LLM_CACHE_AGENTS
+    # (sopra il livello di resilienza: gli hit non consumano quota)
+    cached_llm = None
+    if Config.LLM_CACHE_AGENTS:
+        cached_llm = CachedLLMClient(
+            llm,
+            build_llm_cache_backend(
+                Config.LLM_CACHE_BACKEND,
+                path=Config.LLM_CACHE_PATH,
+                ttl_seconds=Config.LLM_CACHE_TTL,
+                max_size=Config.LLM_CACHE_SIZE
+            )
+        )
+
+    def llm_for(agent: str):
+        return cached_llm if agent in Config.LLM_CACHE_AGENTS else llm
+
+    stage("llm")
 
     # -------------------------
     # Agents
     # -------------------------
-    memory_agent = MemoryAgent(llm, vector_storage)
-    critic_agent = CriticAgent(llm, vector_storage)
-    advisor_agent = AdvisorAgent(llm)
-    coach_agent = CoachAgent(llm, memory_agent)
-    planner_agent = PlannerAgent(llm, vector_storage)
+    memory_agent = MemoryAgent(
+        llm_for("memory"),
+        vector_storage,
+        prompt_budget=Config.MEMORY_PROMPT_BUDGET
+    )
+    critic_agent = CriticAgent(
+        llm_for("critic"),
+        vector_storage,
+        prompt_budget=Config.CRITIC_PROMPT_BUDGET
+    )
+    advisor_agent = AdvisorAgent(llm_for("advisor"))
+    coach_agent = CoachAgent(llm_for("coach"), memory_agent)
+    planner_agent = PlannerAgent(
+        llm_for("planner"),
+        vector_storage,
+        previews=build_plan_preview_store(
+            Config.PLAN_PREVIEW_BACKEND,
+            ttl_seconds=Config.PLAN_PREVIEW_TTL
+        )
+    )
+    stage("agents")
 
     # -------------------------
     # Supervisor
@@ -73,10 +204,112 @@ def bootstrap():
         advisor_agent=advisor_agent
     )
 
+    stage("supervisor")
+
     logger.info("✅ System ready")
 
     return {
         "sqlite": sqlite_db,
         "vector_storage": vector_storage,
+        "llm": llm,
         "supervisor": supervisor
     }
+
+
+class AppContext:
+    """
+    Contesto applicativo con inizializzazione lazy.
+
+    - start(): avvia il bootstrap in un thread in background
+    - get(): restituisce una risorsa, attendendo (e se serve avviando) il warm-up
+    - status(): progresso del warm-up per l'endpoint di readiness
+    """
+
+    STAGES = ("sqlite", "vector_storage", "llm", "agents", "supervisor")
+
+    def __init__(self, on_ready: Optional[Callable[[Dict], None]] = None):
+        self._on_ready = on_ready
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._ctx: Optional[Dict] = None
+
+        self.completed = []
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.ready_at: Optional[float] = None
+
+    # -------------------------
+    # WARM-UP
+    # -------------------------
+
+    def start(self, background: bool = True) -> None:
+        with self._lock:
+            if self._thread is None and not self._ready.is_set():
+                self.started_at = time.monotonic()
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name="app-warmup",
+                    daemon=True
+                )
+                self._thread.start()
+
+        if not background:
+            self._ready.wait()
+            if self.error:
+                raise RuntimeError(f"Application failed to start: {self.error}")
+
+    def _run(self) -> None:
+        try:
+            ctx = bootstrap(on_stage=self.completed.append)
+            if self._on_ready:
+                self._on_ready(ctx)
+            self._ctx = ctx
+        except Exception as e:
+            logger.exception("Warm-up failed")
+            self.error = repr(e)
+        finally:
+            self.ready_at = time.monotonic()
+            self._ready.set()
+
+    # -------------------------
+    # ACCESS
+    # -------------------------
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set() and self.error is None
+
+    def get(self, key: str, timeout: Optional[float] = None):
+        """
+        Restituisce la risorsa `key` del contesto.
+
+        Raises:
+            TimeoutError: se il warm-up non termina entro `timeout` secondi.
+            RuntimeError: se il warm-up è fallito.
+        """
+        self.start()
+
+        if not self._ready.wait(timeout):
+            raise TimeoutError("Application is still warming up")
+
+        if self.error:
+            raise RuntimeError(f"Application failed to start: {self.error}")
+
+        return self._ctx[key]
+
+    def status(self) -> Dict:
+        if self.started_at is None:
+            elapsed = 0.0
+        else:
+            end = self.ready_at or time.monotonic()
+            elapsed = round(end - self.started_at, 3)
+
+        return {
+            "ready": self.ready,
+            "stages_completed": list(self.completed),
+            "stages_total": len(self.STAGES),
+            "progress": round(len(self.completed) / len(self.STAGES), 2),
+            "elapsed_s": elapsed,
+            "error": self.error,
+        }
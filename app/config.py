@@ -9,4 +9,92 @@ class Config:
     ENV = os.getenv("ENV", "dev")
     DB_PATH = os.getenv("DB_PATH", "goal_agent.db")
     QDRANT_PATH = str(Path("./qdrant_data_final"))
-    LLM_MODEL = "gpt-4.1-mini"
\ No newline at end of file
+    LLM_MODEL = "gpt-4.1-mini"
+
+    # multi-tenancy Qdrant: "shared", "payload" (HNSW per goal) o "sharded"
+    QDRANT_TENANCY = os.getenv("QDRANT_TENANCY", "shared")
+    QDRANT_SHARDS = int(os.getenv("QDRANT_SHARDS", "8"))
+
+    # server Qdrant remoto (condivisibile tra worker); se assente: embedded su QDRANT_PATH
+    QDRANT_URL = os.getenv("QDRANT_URL")
+    QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
+    QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "1") == "1"
+    QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+    QDRANT_TIMEOUT_S = float(os.getenv("QDRANT_TIMEOUT_S", "10"))
+    QDRANT_POOL_SIZE = int(os.getenv("QDRANT_POOL_SIZE", "4"))
+
+    # worker uvicorn (uvicorn legge anch'esso WEB_CONCURRENCY): con più di uno
+    # Qdrant, anteprime e cache LLM devono essere condivisi (vedi bootstrap)
+    WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
+    # con più worker lo scheduler va avviato in uno solo (SCHEDULER_ENABLED=0 negli altri)
+    SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1") == "1"
+
+    # cache embedding: LRU in memoria + tier opzionale su disco
+    EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+    EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH")
+
+    # warm-up lazy del server: le risorse pesanti vengono create in background
+    LAZY_INIT = os.getenv("LAZY_INIT", "0") == "1"
+    WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "30"))
+
+    # chiamate LLM async concorrenti massime (semaforo di AsyncOpenAIClient)
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+
+    # budget (token stimati) del contesto nei prompt di Critic e MemoryAgent
+    CRITIC_PROMPT_BUDGET = int(os.getenv("CRITIC_PROMPT_BUDGET", "2000"))
+    MEMORY_PROMPT_BUDGET = int(os.getenv("MEMORY_PROMPT_BUDGET", "1500"))
+
+    # backend LLM: "openai" oppure "fake" (locale, per load test e benchmark)
+    LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+    LLM_FAKE_LATENCY_S = float(os.getenv("LLM_FAKE_LATENCY_S", "0.5"))
+    LLM_FAKE_JITTER_S = float(os.getenv("LLM_FAKE_JITTER_S", "0.2"))
+    LLM_FAKE_ERROR_RATE = float(os.getenv("LLM_FAKE_ERROR_RATE", "0"))
+
+    # limiti e resilienza delle chiamate LLM (0 = nessun limite RPM/TPM)
+    LLM_RPM = float(os.getenv("LLM_RPM", "500"))
+    LLM_TPM = float(os.getenv("LLM_TPM", "200000"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+    LLM_CALL_DEADLINE_S = float(os.getenv("LLM_CALL_DEADLINE_S", "60"))
+    LLM_EXPECTED_OUTPUT_TOKENS = int(os.getenv("LLM_EXPECTED_OUTPUT_TOKENS", "800"))
+    LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+    LLM_BREAKER_RESET_S = float(os.getenv("LLM_BREAKER_RESET_S", "30"))
+
+    # validità (secondi) dei piani in anteprima prima della conferma
+    PLAN_PREVIEW_TTL = float(os.getenv("PLAN_PREVIEW_TTL", "900"))
+    # "memory" (un solo processo) o "sqlite" (condiviso tra i worker)
+    PLAN_PREVIEW_BACKEND = os.getenv("PLAN_PREVIEW_BACKEND", "memory")
+
+    # cache risposte LLM: opt-in per agente (es. "critic,advisor,memory")
+    LLM_CACHE_AGENTS = {
+        a.strip() for a in os.getenv("LLM_CACHE_AGENTS", "").split(",") if a.strip()
+    }
+    LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "memory")
+    LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+    LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+    LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+
+    # pool connessioni SQLite (WAL)
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+    DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+    DB_STATEMENT_CACHE = int(os.getenv("DB_STATEMENT_CACHE", "256"))
+
+    # compattazione memorie (job settimanale)
+    MEMORY_COMPACTION_DAYS = int(os.getenv("MEMORY_COMPACTION_DAYS", "30"))
+    MEMORY_COMPACTION_BATCH = int(os.getenv("MEMORY_COMPACTION_BATCH", "50"))
+
+    # fan-out DAILY/WEEKLY dello scheduler su tutti i goal attivi
+    SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", "8"))
+    SCHEDULER_GOAL_TIMEOUT_S = float(os.getenv("SCHEDULER_GOAL_TIMEOUT_S", "120"))
+    # finestra (s) su cui scaglionare le prime partenze del fan-out
+    SCHEDULER_JITTER_S = float(os.getenv("SCHEDULER_JITTER_S", "2"))
+    SCHEDULER_PAGE_SIZE = int(os.getenv("SCHEDULER_PAGE_SIZE", "500"))
+    SCHEDULER_DEADLINE_S = float(os.getenv("SCHEDULER_DEADLINE_S", "3600"))
+
+    # timeout (secondi) di ogni passo agente nella pipeline weekly
+    SUPERVISOR_STEP_TIMEOUT_S = float(os.getenv("SUPERVISOR_STEP_TIMEOUT_S", "120"))
+
+    # tracing: exporter degli span ("log", "json", "memory"; vuoto = solo metriche)
+    TRACE_EXPORTERS = [
+        e.strip() for e in os.getenv("TRACE_EXPORTERS", "").split(",") if e.strip()
+    ]
+    TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
@@ -1,29 +1,56 @@
-from fastapi import FastAPI, Form
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, Form, HTTPException
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
+import asyncio
 import atexit
+import json
 
-from app.bootstrap import bootstrap
+from app.bootstrap import AppContext
+from app.config import Config
+from app.tracing import tracer
+from agents.llm.usage import goal_scope
 from agents.scheduler_agent import AgentScheduler
+from storage.plan_previews import PreviewExpiredError
 from supervisor.events import EventType
 from supervisor.state import AppState
-from tools.feedback_tools import save_user_feedback
+from tools.feedback_tools import save_user_feedback_batch
 
 
 # =================================================
 # BOOTSTRAP SOLO UNA VOLTA (processo unico)
 # =================================================
 
-ctx = bootstrap()
+def _start_services(ctx):
+    if Config.SCHEDULER_ENABLED:
+        scheduler = AgentScheduler(ctx["supervisor"])
+        scheduler.start()
 
-supervisor = ctx["supervisor"]
-vector_storage = ctx["vector_storage"]
+    # shutdown pulito
+    atexit.register(ctx["vector_storage"].close)
 
-scheduler = AgentScheduler(supervisor)
-scheduler.start()
 
+app_ctx = AppContext(on_ready=_start_services)
 
-# shutdown pulito
-atexit.register(vector_storage.close)
+if not Config.LAZY_INIT:
+    app_ctx.start(background=False)
+
+
+def _resource(key: str):
+    """
+    Risorsa del contesto applicativo; 503 se il warm-up non è ancora concluso.
+    """
+    try:
+        return app_ctx.get(key, timeout=Config.WARMUP_TIMEOUT)
+    except TimeoutError:
+        raise HTTPException(status_code=503, detail=app_ctx.status())
+
+
+async def _aresource(key: str):
+    """
+    Come `_resource`, senza bloccare l'event loop durante il warm-up.
+    """
+    if app_ctx.ready:
+        return _resource(key)
+    return await asyncio.to_thread(_resource, key)
 
 
 app = FastAPI()
@@ -145,6 +172,7 @@ function hideLoading(){
 }
 let currentGoal = "";
 let currentGoalId = null;
+let currentPreviewId = null;
 
 
 /* ------------------- UI helpers ------------------- */
@@ -181,6 +209,26 @@ function hideTyping(){
     }
 }
 
+/* Legge una risposta SSE e restituisce gli eventi JSON man mano */
+async function* readEvents(res){
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+
+    while(true){
+        const {value, done} = await reader.read();
+        if(done) break;
+        buffer += decoder.decode(value, {stream:true});
+
+        let idx;
+        while((idx = buffer.indexOf("\\n\\n")) >= 0){
+            const raw = buffer.slice(0, idx);
+            buffer = buffer.slice(idx + 2);
+            if(raw.startsWith("data: ")) yield JSON.parse(raw.slice(6));
+        }
+    }
+}
+
 function card(html){
     const d=document.createElement("div");
     d.className="card";
@@ -196,6 +244,7 @@ async function sendGoal(){
     if(!goal) return;
 
     currentGoal = goal;
+    currentPreviewId = null;
 
     bubble(goal,"user");
 
@@ -204,14 +253,31 @@ async function sendGoal(){
 
     showTyping();
 
-    const res=await fetch("/plan-preview",{method:"POST",body:form});
-    const plan=await res.json();
+    const res=await fetch("/plan-preview-stream",{method:"POST",body:form});
 
-    hideTyping();
+    let planBubble=null;
 
-    let tasks=plan.tasks.map(t=>"• "+t.title).join("<br>");
+    for await (const ev of readEvents(res)){
+        if(ev.type==="task"){
+            if(!planBubble){
+                hideTyping();
+                bubble("Ti propongo questo piano:<br>");
+                planBubble=chat.lastChild;
+            }
+            planBubble.innerHTML+="<br>• "+ev.task.title;
+        }
+        if(ev.type==="plan"){
+            currentPreviewId=ev.preview_id;
+        }
+        if(ev.type==="error"){
+            hideTyping();
+            bubble("⚠️ Errore durante la pianificazione");
+            return;
+        }
+    }
 
-    bubble("Ti propongo questo piano:<br><br>"+tasks+"<br><br>Ti va bene?");
+    hideTyping();
+    if(planBubble) planBubble.innerHTML+="<br><br>Ti va bene?";
 
     card(`
         <button class="primary" onclick="confirmPlan()">✅ Conferma</button>
@@ -226,12 +292,24 @@ async function confirmPlan(){
 
     const form=new URLSearchParams();
     form.append("goal",currentGoal);
+    if(currentPreviewId) form.append("preview_id",currentPreviewId);
 
     try{
         showTyping("Sto creando il piano...");
 
         const res = await fetch("/confirm-plan",{method:"POST",body:form});
         const data = await res.json();
+
+        if(res.status===410){
+            hideTyping();
+            hideLoading();
+            bubble("⏳ L'anteprima è scaduta: rigenero il piano da rivedere.");
+            goalInput.value=currentGoal;
+            sendGoal();
+            return;
+        }
+        if(!res.ok) throw new Error(data.detail || res.status);
+
         currentGoalId = data.goal_id;   // 🔥 salva
 
         hideTyping();
@@ -268,13 +346,31 @@ async function loadDaily(){
 
     showTyping();
 
-    const res=await fetch(`/daily?goal_id=${currentGoalId}`);
-    const data=await res.json();
-
-    hideTyping();
-
-
-    bubble(data.message);
+    const res=await fetch(`/daily-stream?goal_id=${currentGoalId}`);
+
+    const data={goal_id:currentGoalId, tasks:[]};
+    let msgBubble=null;
+
+    for await (const ev of readEvents(res)){
+        if(ev.type==="tasks"){
+            data.goal_id=ev.goal_id;
+            data.tasks=ev.tasks;
+        }
+        if(ev.type==="token" || ev.type==="done"){
+            if(!msgBubble){
+                hideTyping();
+                bubble("");
+                msgBubble=chat.lastChild;
+            }
+            if(ev.type==="token") msgBubble.textContent+=ev.text;
+            else msgBubble.textContent=ev.message;
+        }
+        if(ev.type==="error"){
+            hideTyping();
+            bubble("⚠️ Errore durante il caricamento");
+            return;
+        }
+    }
 
     let tasksHTML=data.tasks.map(t=>
         `<label><input type="checkbox" value="${t.id}"> ${t.description}</label><br>`
@@ -329,18 +425,56 @@ async function finishDay(goalId){
 """
 
 
+@app.on_event("startup")
+def warmup():
+    # in modalità lazy il server accetta richieste subito
+    app_ctx.start()
+
+
 @app.get("/", response_class=HTMLResponse)
 def home():
     return HTML
 
 
+@app.get("/ready")
+def ready():
+    status = app_ctx.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+@app.get("/metrics")
+def metrics(format: str = "prometheus"):
+    """
+    Istogrammi di latenza per stadio (supervisor, step, agent, llm, encode,
+    qdrant, sqlite) e token LLM: formato Prometheus o JSON (?format=json).
+    """
+    if format == "json":
+        return tracer.metrics.snapshot()
+    return PlainTextResponse(
+        tracer.metrics.render_prometheus(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+
+@app.get("/usage")
+def usage(goal_id: int = None):
+    """
+    Token LLM consumati: totali di processo e per goal, o di un solo goal.
+    """
+    tracker = _resource("llm").usage
+    if goal_id is not None:
+        return {"goal_id": goal_id, **tracker.for_goal(goal_id)}
+    return tracker.snapshot()
+
+
 # =================================================
 # ENDPOINTS
 # =================================================
 
 @app.post("/goal")
-def create_goal(goal: str = Form(...)):
-    supervisor.handle(
+async def create_goal(goal: str = Form(...)):
+    supervisor = await _aresource("supervisor")
+    await supervisor.ahandle(
         AppState(
             event=EventType.NEW_GOAL,
             meta={"goal_text": goal}
@@ -352,7 +486,7 @@ def create_goal(goal: str = Form(...)):
 @app.get("/daily-ui", response_class=HTMLResponse)
 def daily_ui():
 
-    result = supervisor.handle(
+    result = _resource("supervisor").handle(
         AppState(event=EventType.DAILY)
     )
 
@@ -438,16 +572,56 @@ def daily_ui():
 # PLAN preview (LLM only)
 # -------------------------
 @app.post("/plan-preview")
-def preview(goal: str = Form(...)):
-    return supervisor.planner.plan(goal)
+async def preview(goal: str = Form(...)):
+    supervisor = await _aresource("supervisor")
+    return await supervisor.planner.apreview(goal)
+
+
+async def _sse(events):
+    """
+    Serializza un async iterator di eventi come Server-Sent Events.
+    """
+    try:
+        async for event in events:
+            yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+    except Exception as e:
+        yield f"data: {json.dumps({'type': 'error', 'detail': str(e)})}\n\n"
+
+
+async def _goal_events(goal_id: int, events):
+    """
+    Attribuisce al goal i token LLM di uno stream (fuori dal Supervisor).
+    """
+    with goal_scope(goal_id):
+        async for event in events:
+            yield event
+
+
+def _event_stream(events) -> StreamingResponse:
+    return StreamingResponse(
+        _sse(events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/plan-preview-stream")
+async def preview_stream(goal: str = Form(...)):
+    supervisor = await _aresource("supervisor")
+    return _event_stream(supervisor.planner.astream_plan(goal))
 
 
 # -------------------------
 # CONFIRM + SAVE
 # -------------------------
 @app.post("/confirm-plan")
-def confirm(goal: str = Form(...)):
-    goal_id = supervisor.planner.execute(goal)
+async def confirm(goal: str = Form(...), preview_id: str = Form(None)):
+    supervisor = await _aresource("supervisor")
+    try:
+        goal_id = await supervisor.planner.aconfirm(preview_id, goal)
+    except PreviewExpiredError as e:
+        # mai ripianificare di nascosto: l'utente deve rivedere il nuovo piano
+        raise HTTPException(status_code=410, detail=str(e))
     return {"goal_id": goal_id}
 
 
@@ -455,10 +629,11 @@ def confirm(goal: str = Form(...)):
 # DAILY
 # -------------------------
 @app.get("/daily")
-def daily(
+async def daily(
     goal_id: int = None
 ):
-    result = supervisor.handle(AppState(
+    supervisor = await _aresource("supervisor")
+    result = await supervisor.ahandle(AppState(
         event=EventType.DAILY,
         goal_id=goal_id))
 
@@ -470,6 +645,11 @@ def daily(
         "tasks": result["tasks"]
     }
 
+@app.get("/daily-stream")
+async def daily_stream(goal_id: int):
+    supervisor = await _aresource("supervisor")
+    return _event_stream(_goal_events(goal_id, supervisor.coach.astream_daily_message(goal_id)))
+
 # -------------------------
 # FEEDBACK
 # -------------------------
@@ -477,28 +657,29 @@ def daily(
 @app.post("/feedback")
 def feedback(
     goal_id: int = Form(...),
-    task_id: int = Form(...),
-    done: bool = Form(...),
+    task_ids: str = Form(...),
+    done: bool = Form(True),
     difficulty: int = Form(...),
     energy: int = Form(...),
     note: str = Form("")
 ):
     """
-    task_ids arriva come "1,2,3"
+    task_ids arriva come "1,2,3" (i task spuntati nella card giornaliera)
     """
 
-    ids = [int(x) for x in task_id.split(",") if x]
-
-    for t in ids:
-        save_user_feedback(
-            task_id=t,
-            feedback={
-                "done": True,
-                "difficulty": difficulty,
-                "energy": energy,
-                "note": note
-            }
-        )
+    ids = [int(x) for x in task_ids.split(",") if x.strip()]
+
+    save_user_feedback_batch(
+        task_ids=ids,
+        goal_id=goal_id,
+        vector_store=_resource("vector_storage"),
+        feedback={
+            "done": done,
+            "difficulty": difficulty,
+            "energy": energy,
+            "note": note
+        }
+    )
 
     return {"ok": True}
 
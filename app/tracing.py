@@ -0,0 +1,356 @@
+"""
+Tracing e metriche di latenza per stadio.
+
+Ogni operazione rilevante apre uno span con nome e stadio
+(supervisor, agent, llm, encode, qdrant, sqlite). Gli span si annidano
+tramite contextvars, quindi seguono anche i thread del DAG e
+asyncio.to_thread. Alla chiusura lo span:
+- aggiorna l'istogramma di latenza del suo stadio (sempre attivo,
+  esposto da /metrics);
+- viene passato agli exporter configurati (log, file JSON, memoria).
+"""
+
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# interruzioni dal chiamante (client SSE disconnesso, richiesta annullata):
+# lo span è "cancelled", non un errore dello stadio
+CANCELLATIONS = (GeneratorExit, asyncio.CancelledError)
+
+# limiti superiori dei bucket (secondi)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Span:
+    __slots__ = (
+        "name", "stage", "trace_id", "span_id", "parent_id",
+        "start", "duration_s", "attributes", "status", "error",
+    )
+
+    def __init__(self, name: str, stage: str, parent: Optional["Span"], attributes: Dict):
+        self.name = name
+        self.stage = stage
+        self.span_id = os.urandom(8).hex()
+        self.trace_id = parent.trace_id if parent else os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.start = time.time()
+        self.duration_s = 0.0
+        self.attributes = attributes
+        self.status = "ok"
+        self.error = None
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "stage": self.stage,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration_ms": round(self.duration_s * 1000, 3),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+# -------------------------
+# EXPORTERS
+# -------------------------
+
+class LogExporter:
+    """
+    Una riga di log per span.
+    """
+
+    def __init__(self, level: int = logging.DEBUG):
+        self.level = level
+
+    def export(self, span: Span) -> None:
+        logger.log(
+            self.level,
+            "span %s [%s] %.1fms %s %s",
+            span.name, span.stage, span.duration_s * 1000, span.status, span.attributes
+        )
+
+
+class JsonFileExporter:
+    """
+    Span in formato JSON lines su file (append).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class InMemoryExporter:
+    """
+    Conserva gli span in memoria (per i test).
+    """
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def by_stage(self, stage: str) -> List[Span]:
+        return [s for s in self.spans if s.stage == stage]
+
+    def names(self) -> List[str]:
+        return [s.name for s in self.spans]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.spans.clear()
+
+
+# -------------------------
+# METRICS
+# -------------------------
+
+class StageHistograms:
+    """
+    Istogrammi cumulativi di latenza per stadio e contatori dei token LLM.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._stages: Dict[str, Dict] = {}
+        self._tokens = {"prompt": 0, "completion": 0}
+        self._lock = threading.Lock()
+
+    def observe(self, span: Span) -> None:
+        with self._lock:
+            stage = self._stages.get(span.stage)
+            if stage is None:
+                stage = self._stages[span.stage] = {
+                    "counts": [0] * len(self.buckets),
+                    "count": 0,
+                    "sum": 0.0,
+                    "errors": 0,
+                }
+
+            for i, bound in enumerate(self.buckets):
+                if span.duration_s <= bound:
+                    stage["counts"][i] += 1
+                    break
+            stage["count"] += 1
+            stage["sum"] += span.duration_s
+            if span.status == "error":
+                stage["errors"] += 1
+
+            self._tokens["prompt"] += span.attributes.get("prompt_tokens") or 0
+            self._tokens["completion"] += span.attributes.get("completion_tokens") or 0
+
+    def snapshot(self) -> Dict:
+        """
+        Stato corrente: per stadio count, sum_s, errors e bucket cumulativi.
+        """
+        with self._lock:
+            stages = {}
+            for name, s in self._stages.items():
+                cumulative, running = {}, 0
+                for bound, count in zip(self.buckets, s["counts"]):
+                    running += count
+                    cumulative[str(bound)] = running
+                cumulative["+Inf"] = s["count"]
+                stages[name] = {
+                    "count": s["count"],
+                    "sum_s": round(s["sum"], 6),
+                    "errors": s["errors"],
+                    "buckets": cumulative,
+                }
+            return {"stages": stages, "llm_tokens": dict(self._tokens)}
+
+    def render_prometheus(self, prefix: str = "goal_agent") -> str:
+        """
+        Formato di esposizione testuale Prometheus.
+        """
+        snap = self.snapshot()
+        metric = f"{prefix}_stage_duration_seconds"
+        lines = [
+            f"# HELP {metric} Latency of traced operations per stage.",
+            f"# TYPE {metric} histogram",
+        ]
+        for stage, s in sorted(snap["stages"].items()):
+            for bound, count in s["buckets"].items():
+                lines.append(f'{metric}_bucket{{stage="{stage}",le="{bound}"}} {count}')
+            lines.append(f'{metric}_sum{{stage="{stage}"}} {s["sum_s"]}')
+            lines.append(f'{metric}_count{{stage="{stage}"}} {s["count"]}')
+
+        errors = f"{prefix}_stage_errors_total"
+        lines += [f"# HELP {errors} Failed traced operations per stage.", f"# TYPE {errors} counter"]
+        for stage, s in sorted(snap["stages"].items()):
+            lines.append(f'{errors}{{stage="{stage}"}} {s["errors"]}')
+
+        tokens = f"{prefix}_llm_tokens_total"
+        lines += [f"# HELP {tokens} LLM tokens used.", f"# TYPE {tokens} counter"]
+        for kind, count in snap["llm_tokens"].items():
+            lines.append(f'{tokens}{{kind="{kind}"}} {count}')
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+            self._tokens = {"prompt": 0, "completion": 0}
+
+
+# -------------------------
+# TRACER
+# -------------------------
+
+class Tracer:
+    def __init__(self):
+        self.exporters: List = []
+        self.metrics = StageHistograms()
+
+    def set_exporters(self, exporters: List) -> None:
+        for exporter in self.exporters:
+            if hasattr(exporter, "close"):
+                exporter.close()
+        self.exporters = list(exporters)
+
+    @contextmanager
+    def span(self, name: str, stage: str, attach: bool = True, **attributes) -> Iterator[Span]:
+        """
+        Apre uno span figlio dello span corrente.
+
+        Con attach=False lo span non diventa il corrente: va usato nei
+        generatori, dove il contesto non può essere ripristinato tra un
+        yield e l'altro.
+        """
+        span = Span(name, stage, _current_span.get(), attributes)
+        token = _current_span.set(span) if attach else None
+        started = time.perf_counter()
+
+        try:
+            yield span
+        except CANCELLATIONS:
+            span.status = "cancelled"
+            raise
+        except BaseException as e:
+            span.status = "error"
+            span.error = repr(e)
+            raise
+        finally:
+            span.duration_s = time.perf_counter() - started
+            if token is not None:
+                _current_span.reset(token)
+            self._finish(span)
+
+    def _finish(self, span: Span) -> None:
+        self.metrics.observe(span)
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception:
+                logger.exception("Span exporter %s failed", type(exporter).__name__)
+
+
+tracer = Tracer()
+
+
+def span(name: str, stage: str, attach: bool = True, **attributes):
+    return tracer.span(name, stage, attach=attach, **attributes)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def traced(name: str, stage: str = "agent"):
+    """
+    Decoratore: esegue la funzione (sync o async) dentro uno span.
+    """
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.span(name, stage):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with tracer.span(name, stage):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+class TracedProxy:
+    """
+    Proxy che apre uno span per ogni chiamata di metodo pubblico
+    dell'oggetto avvolto (es. il client Qdrant).
+    """
+
+    def __init__(self, target, stage: str, prefix: str):
+        self._target = target
+        self._stage = stage
+        self._prefix = prefix
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def call(*args, **kwargs):
+            attributes = {}
+            if "collection_name" in kwargs:
+                attributes["collection"] = kwargs["collection_name"]
+            with tracer.span(f"{self._prefix}.{name}", self._stage, **attributes):
+                return attr(*args, **kwargs)
+
+        return call
+
+
+def build_exporters(kinds: List[str], path: Optional[str] = None) -> List:
+    """
+    Exporter indicati in configurazione: "log", "json", "memory".
+    """
+    exporters = []
+    for kind in kinds:
+        if kind == "log":
+            exporters.append(LogExporter(level=logging.INFO))
+        elif kind == "json":
+            exporters.append(JsonFileExporter(path or "traces.jsonl"))
+        elif kind == "memory":
+            exporters.append(InMemoryExporter())
+        else:
+            raise ValueError(f"Unknown trace exporter: {kind}")
+    return exporters
@@ -0,0 +1,181 @@
+"""
+Load test end-to-end degli endpoint di app/server.py.
+
+Ogni utente simulato ripete il flusso: /plan-preview → /confirm-plan →
+N × /daily. Alla fine vengono riportati, per endpoint e complessivi,
+richieste, errori, latenza p50/p99 e throughput.
+
+Il server va avviato a parte, di norma con l'LLM finto per non dipendere
+da OpenAI:
+
+    LLM_BACKEND=fake LLM_FAKE_LATENCY_S=0.3 uvicorn app.server:app
+    python -m benchmarks.load_test --users 20 --iterations 5 --output load.json
+
+Usa solo la libreria standard.
+"""
+
+import argparse
+import json
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """
+    Percentile nearest-rank (pct in 0-100).
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+class LoadTest:
+    def __init__(self, base_url: str, timeout: float = 60.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    # -------------------------
+    # HTTP
+    # -------------------------
+
+    def _request(self, name: str, method: str, path: str, form: Optional[Dict] = None):
+        url = f"{self.base_url}{path}"
+        data = None
+        if form is not None:
+            data = urllib.parse.urlencode(form).encode("utf-8")
+
+        request = urllib.request.Request(url, data=data, method=method)
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                body = json.loads(response.read() or b"null")
+        except (urllib.error.URLError, OSError, ValueError):
+            with self._lock:
+                self.errors[name] += 1
+            return None
+
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.samples[name].append(elapsed)
+        return body
+
+    def wait_ready(self, max_wait: float) -> bool:
+        deadline = time.monotonic() + max_wait
+        while time.monotonic() < deadline:
+            try:
+                with urllib.request.urlopen(f"{self.base_url}/ready", timeout=5) as response:
+                    if response.status == 200:
+                        return True
+            except (urllib.error.URLError, OSError):
+                pass
+            time.sleep(0.5)
+        return False
+
+    # -------------------------
+    # SCENARIO
+    # -------------------------
+
+    def user_session(self, user: int, iterations: int, daily_per_goal: int) -> None:
+        for i in range(iterations):
+            goal = f"Load test goal user {user} iteration {i}: imparare Python"
+
+            preview = self._request("plan-preview", "POST", "/plan-preview", {"goal": goal})
+            if not preview:
+                continue
+
+            confirmed = self._request(
+                "confirm-plan", "POST", "/confirm-plan",
+                {"goal": goal, "preview_id": preview.get("preview_id", "")}
+            )
+            if not confirmed or confirmed.get("goal_id") is None:
+                continue
+
+            for _ in range(daily_per_goal):
+                self._request("daily", "GET", f"/daily?goal_id={confirmed['goal_id']}")
+
+    def run(self, users: int, iterations: int, daily_per_goal: int) -> Dict:
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=users, thread_name_prefix="load-user") as pool:
+            futures = [
+                pool.submit(self.user_session, u, iterations, daily_per_goal)
+                for u in range(users)
+            ]
+            for f in futures:
+                f.result()
+
+        duration = time.perf_counter() - started
+        return self.report(users, duration)
+
+    # -------------------------
+    # REPORT
+    # -------------------------
+
+    @staticmethod
+    def _summary(samples: List[float], errors: int, duration: float) -> Dict:
+        return {
+            "requests": len(samples),
+            "errors": errors,
+            "p50_ms": round(percentile(samples, 50) * 1000, 2) if samples else None,
+            "p99_ms": round(percentile(samples, 99) * 1000, 2) if samples else None,
+            "mean_ms": round(sum(samples) / len(samples) * 1000, 2) if samples else None,
+            "throughput_rps": round(len(samples) / duration, 2) if duration else None,
+        }
+
+    def report(self, users: int, duration: float) -> Dict:
+        endpoints = sorted(set(self.samples) | set(self.errors))
+        all_samples = [s for name in endpoints for s in self.samples[name]]
+
+        return {
+            "users": users,
+            "duration_s": round(duration, 3),
+            "total": self._summary(all_samples, sum(self.errors.values()), duration),
+            "endpoints": {
+                name: self._summary(self.samples[name], self.errors[name], duration)
+                for name in endpoints
+            },
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test degli endpoint HTTP")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--daily-per-goal", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--ready-timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="file JSON in cui salvare il report")
+    args = parser.parse_args()
+
+    test = LoadTest(args.base_url, timeout=args.timeout)
+    if not test.wait_ready(args.ready_timeout):
+        raise SystemExit(f"Server not ready at {args.base_url}")
+
+    report = test.run(args.users, args.iterations, args.daily_per_goal)
+
+    print(f"{'endpoint':<14} {'req':>6} {'err':>5} {'p50 ms':>9} {'p99 ms':>9} {'rps':>8}")
+    for name, s in [*report["endpoints"].items(), ("TOTAL", report["total"])]:
+        print(
+            f"{name:<14} {s['requests']:>6} {s['errors']:>5} "
+            f"{s['p50_ms'] or 0:>9} {s['p99_ms'] or 0:>9} {s['throughput_rps'] or 0:>8}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+"""
+Micro-benchmark dei percorsi caldi: storage vettoriale, CRUD SQLite,
+get_active_tasks e Supervisor.handle con LLM finto.
+
+Per ogni dimensione (numero di punti/righe) viene generato un dataset
+sintetico con seed fisso: i punti sono distribuiti su goal da
+`--points-per-goal` elementi, quindi le query per goal misurano la
+selettività dei filtri al crescere della collection; su SQLite lo
+stesso numero di task è distribuito su goal da 20 task. L'encoder è
+HashEncoder (deterministico, senza modello) e l'LLM è FakeLLMClient.
+
+    python -m benchmarks.micro --sizes 1000,10000 --output bench.json
+    python -m benchmarks.micro --sizes 1000 --baseline bench.json
+
+Con `--baseline` il confronto segnala le regressioni della mediana oltre
+`--max-regression` e termina con codice 1.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+WORDS = (
+    "study python practice review sleep energy focus morning evening "
+    "exercise reading notes project deadline tired motivated skipped "
+    "finished difficult easy habit routine week progress goal plan"
+).split()
+
+INSERT_BATCH = 1000
+TASKS_PER_GOAL = 20
+
+
+# -------------------------
+# MISURA
+# -------------------------
+
+def measure(fn: Callable[[], object], repeat: int, warmup: int = 1) -> Dict:
+    """
+    Esegue `fn` (warmup + repeat volte) e restituisce le statistiche in ms.
+    """
+    for _ in range(warmup):
+        fn()
+
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000)
+
+    times.sort()
+    return {
+        "repeat": repeat,
+        "min_ms": round(times[0], 4),
+        "median_ms": round(statistics.median(times), 4),
+        "p95_ms": round(times[min(len(times) - 1, int(len(times) * 0.95))], 4),
+        "mean_ms": round(statistics.fmean(times), 4),
+        "ops_per_s": round(1000 / statistics.fmean(times), 2) if times[0] else None,
+    }
+
+
+def sentence(rng: random.Random, n_words: int = 12) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n_words))
+
+
+# -------------------------
+# SUITE
+# -------------------------
+
+class BenchmarkSuite:
+    """
+    Dataset e benchmark per una singola dimensione.
+    """
+
+    def __init__(
+        self,
+        workdir: str,
+        size: int,
+        seed: int,
+        points_per_goal: int,
+        repeat: int,
+        tenancy: str = "shared"
+    ):
+        from storage.encoders import HashEncoder
+        from storage.qdrant import VectorStorage
+
+        self.size = size
+        self.tenancy = tenancy
+        self.repeat = repeat
+        self.points_per_goal = points_per_goal
+        self.rng = random.Random(seed)
+
+        self.vector_store = VectorStorage(
+            path=os.path.join(workdir, f"qdrant_{size}"),
+            embedding_model="hash-384",
+            encoder=HashEncoder(384),
+            tenancy=tenancy
+        )
+        self.vector_store.init()
+
+        self.goal_ids: List[int] = []
+        self.vector_goal_ids: List[int] = []
+        self.task_ids: List[int] = []
+        self.results: List[Dict] = []
+
+    def record(self, name: str, fn: Callable[[], object], repeat: Optional[int] = None) -> None:
+        stats = measure(fn, repeat or self.repeat)
+        self.results.append({"name": name, "size": self.size, "tenancy": self.tenancy, **stats})
+        print(f"  {name:<40} median={stats['median_ms']:>10.3f} ms  p95={stats['p95_ms']:>10.3f} ms")
+
+    # -------------------------
+    # DATASET
+    # -------------------------
+
+    def populate(self) -> None:
+        from storage.crud import create_goal_with_tasks
+        from storage.sqlite import SQLiteDB
+
+        started = time.perf_counter()
+
+        # SQLite: `size` task in goal da TASKS_PER_GOAL
+        for g in range(max(1, self.size // TASKS_PER_GOAL)):
+            self.goal_ids.append(create_goal_with_tasks(
+                description=f"Benchmark goal {g}: {sentence(self.rng, 6)}",
+                tasks=[f"Task {i}: {sentence(self.rng, 8)}" for i in range(TASKS_PER_GOAL)],
+                status="active"
+            ))
+
+        with SQLiteDB().connection() as conn:
+            self.task_ids = [
+                r[0] for r in conn.execute("SELECT id FROM tasks ORDER BY id").fetchall()
+            ]
+            # metà dei task già completati, come in un sistema in uso
+            conn.executemany(
+                "UPDATE tasks SET status = 'done' WHERE id = ?",
+                [(t,) for t in self.rng.sample(self.task_ids, len(self.task_ids) // 2)]
+            )
+
+        # Qdrant: `size` memorie e `size` progress log su goal da points_per_goal punti
+        self.vector_goal_ids = self.goal_ids[:max(1, self.size // self.points_per_goal)]
+
+        memories, progress = [], []
+        for i in range(self.size):
+            goal_id = self.vector_goal_ids[i % len(self.vector_goal_ids)]
+            memories.append({
+                "goal_id": goal_id,
+                "content": sentence(self.rng),
+                "memory_type": self.rng.choice(["pattern", "observation", "reflection"]),
+                "source": "benchmark",
+            })
+            progress.append({
+                "goal_id": goal_id,
+                "task_id": self.rng.choice(self.task_ids),
+                "done": self.rng.random() < 0.6,
+                "difficulty": self.rng.randint(1, 5),
+                "energy": self.rng.randint(1, 5),
+                "note": sentence(self.rng, 6) if self.rng.random() < 0.3 else None,
+            })
+
+            if len(memories) >= INSERT_BATCH:
+                self.vector_store.write_memories(memories)
+                self.vector_store.write_progress_batch(progress)
+                memories, progress = [], []
+
+        self.vector_store.write_memories(memories)
+        self.vector_store.write_progress_batch(progress)
+
+        print(
+            f"  dataset size={self.size} goals={len(self.goal_ids)} "
+            f"vector_goals={len(self.vector_goal_ids)} "
+            f"built in {time.perf_counter() - started:.1f}s"
+        )
+
+    # -------------------------
+    # BENCHMARKS
+    # -------------------------
+
+    def bench_vector_storage(self) -> None:
+        vs = self.vector_store
+        goal = lambda: self.rng.choice(self.vector_goal_ids)
+
+        self.record("vector.write_memory", lambda: vs.write_memory(
+            goal_id=goal(), content=sentence(self.rng),
+            memory_type="observation", source="benchmark"
+        ))
+        self.record("vector.search_memories", lambda: vs.search_memories(
+            goal_id=goal(), text=sentence(self.rng), limit=10
+        ))
+        self.record("vector.retrieve_recent_progress", lambda: vs.retrieve_recent_progress(
+            goal_id=goal(), days=7, limit=50
+        ))
+        self.record("vector.compute_basic_metrics[aggregates]", lambda: vs.compute_basic_metrics(
+            goal_id=goal(), days=7
+        ))
+
+        self.record("vector.compute_basic_metrics[scan]", lambda: vs.compute_basic_metrics(
+            goal_id=goal(), days=7, from_aggregates=False
+        ))
+
+    def bench_crud(self) -> None:
+        from storage.crud import create_goal, create_goal_with_tasks, get_goal, update_task_status
+        from tools.state_tools import get_active_tasks
+
+        goal = lambda: self.rng.choice(self.goal_ids)
+
+        self.record("crud.create_goal", lambda: create_goal(
+            description=sentence(self.rng, 6)
+        ))
+        self.record("crud.create_goal_with_tasks[10]", lambda: create_goal_with_tasks(
+            description=sentence(self.rng, 6),
+            tasks=[sentence(self.rng, 8) for _ in range(10)]
+        ))
+        self.record("crud.get_goal", lambda: get_goal(goal()))
+        self.record("crud.update_task_status", lambda: update_task_status(
+            self.rng.choice(self.task_ids), self.rng.choice(["pending", "done"])
+        ))
+        self.record("state.get_active_tasks", lambda: get_active_tasks(goal()))
+
+    def bench_supervisor(self) -> None:
+        from agents.advisor_agent import AdvisorAgent
+        from agents.coach_agent import CoachAgent
+        from agents.critic_agent import CriticAgent
+        from agents.llm.fake_client import FakeLLMClient
+        from agents.memory_agent import MemoryAgent
+        from agents.planner_agent import PlannerAgent
+        from supervisor.events import EventType
+        from supervisor.state import AppState
+        from supervisor.supervisor import Supervisor
+
+        # solo overhead del sistema: l'LLM risponde subito
+        llm = FakeLLMClient(seed=0)
+        memory = MemoryAgent(llm, self.vector_store)
+        supervisor = Supervisor(
+            planner_agent=PlannerAgent(llm, self.vector_store),
+            coach_agent=CoachAgent(llm, memory),
+            memory_agent=memory,
+            critic_agent=CriticAgent(llm, self.vector_store),
+            advisor_agent=AdvisorAgent(llm)
+        )
+        goal = lambda: self.rng.choice(self.vector_goal_ids)
+
+        self.record("supervisor.handle[DAILY]", lambda: supervisor.handle(AppState(
+            event=EventType.DAILY, goal_id=goal(), meta={"refresh": True}
+        )))
+        self.record("supervisor.handle[DAILY cached]", lambda: supervisor.handle(AppState(
+            event=EventType.DAILY, goal_id=self.vector_goal_ids[0]
+        )))
+        self.record("supervisor.handle[WEEKLY]", lambda: supervisor.handle(AppState(
+            event=EventType.WEEKLY, goal_id=goal()
+        )), repeat=max(1, self.repeat // 10))
+
+    def run(self, groups: List[str]) -> List[Dict]:
+        self.populate()
+        if "vector" in groups:
+            self.bench_vector_storage()
+        if "crud" in groups:
+            self.bench_crud()
+        if "supervisor" in groups:
+            self.bench_supervisor()
+        self.vector_store.close()
+        return self.results
+
+
+# -------------------------
+# REPORT / CONFRONTO
+# -------------------------
+
+def environment(seed: int) -> Dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "commit": commit,
+        "seed": seed,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def compare(results: List[Dict], baseline: Dict, max_regression: float) -> List[Dict]:
+    """
+    Benchmark la cui mediana peggiora oltre `max_regression` (0.2 = +20%).
+    """
+    previous = {
+        (r["name"], r["size"], r.get("tenancy", "shared")): r
+        for r in baseline.get("results", [])
+    }
+    regressions = []
+
+    for r in results:
+        old = previous.get((r["name"], r["size"], r.get("tenancy", "shared")))
+        if not old or not old["median_ms"]:
+            continue
+        ratio = r["median_ms"] / old["median_ms"]
+        if ratio > 1 + max_regression:
+            regressions.append({
+                "name": r["name"],
+                "size": r["size"],
+                "baseline_ms": old["median_ms"],
+                "current_ms": r["median_ms"],
+                "ratio": round(ratio, 3),
+            })
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark dei percorsi caldi")
+    parser.add_argument("--sizes", default="1000,10000",
+                        help="dimensioni dei dataset, es. 1000,10000,100000,1000000")
+    parser.add_argument("--groups", default="vector,crud,supervisor")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--points-per-goal", type=int, default=1000)
+    parser.add_argument("--tenancy", default="shared", choices=["shared", "payload", "sharded"])
+    parser.add_argument("--output", help="file JSON dei risultati")
+    parser.add_argument("--baseline", help="risultati precedenti da confrontare")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    groups = [g.strip() for g in args.groups.split(",") if g.strip()]
+    workdir = tempfile.mkdtemp(prefix="goal-agent-bench-")
+    results: List[Dict] = []
+
+    from app.config import Config
+    from storage.sqlite import SQLiteDB
+
+    try:
+        for size in sizes:
+            # database SQLite isolato per dimensione (SQLiteDB legge Config.DB_PATH a ogni uso)
+            Config.DB_PATH = os.path.join(workdir, f"bench_{size}.db")
+            SQLiteDB().run_migrations()
+
+            print(f"size={size}")
+            suite = BenchmarkSuite(
+                workdir, size, args.seed, args.points_per_goal, args.repeat,
+                tenancy=args.tenancy
+            )
+            results.extend(suite.run(groups))
+            SQLiteDB().pool.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {"environment": environment(args.seed), "results": results}
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        for r in regressions:
+            print(f"REGRESSION {r['name']} size={r['size']}: "
+                  f"{r['baseline_ms']} → {r['current_ms']} ms (x{r['ratio']})")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Compattazione incrementale delle memorie semantiche.
+
+Per un goal, le memorie più vecchie di N giorni vengono lette a batch,
+riassunte (tipicamente da MemoryAgent) in una sola memoria "compressed"
+per batch e spostate nella collection di archivio. La memoria compressa
+conserva il timestamp della più recente del batch; se il riassunto è
+vuoto (nulla da conservare) il batch viene solo archiviato.
+
+Il job è riprendibile:
+- il checkpoint su SQLite fissa la soglia temporale e il progresso;
+- l'id della memoria compressa dipende dagli id del batch, quindi un batch
+  interrotto e rieseguito sovrascrive lo stesso punto invece di duplicarlo.
+"""
+
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from storage.crud import get_compaction_checkpoint, save_compaction_checkpoint
+
+logger = logging.getLogger(__name__)
+
+COMPACTION_NAMESPACE = uuid.UUID("6f1c8a52-3d4e-4b8f-9a27-5c0e1d2f3a4b")
+
+Summarizer = Callable[[List[Dict]], Optional[str]]
+
+
+def default_summarizer(memories: List[Dict]) -> str:
+    """
+    Riassunto deterministico (senza LLM): concatena i contenuti.
+    """
+    return "\n".join(f"- {m['content']}" for m in memories if m.get("content"))
+
+
+class MemoryCompactor:
+    """
+    Esegue la compattazione delle memorie di un goal su un VectorStorage.
+    """
+
+    def __init__(
+        self,
+        vector_store,
+        summarize: Optional[Summarizer] = None,
+        batch_size: int = 50,
+        archive: bool = True
+    ):
+        self.vector_store = vector_store
+        self.summarize = summarize or default_summarizer
+        self.batch_size = batch_size
+        self.archive = archive
+
+    def run(self, goal_id: int, older_than_days: int = 30) -> Dict:
+        """
+        Compatta le memorie del goal più vecchie di `older_than_days`,
+        riprendendo da un eventuale checkpoint interrotto.
+
+        Returns:
+            Dict: batches, archived (totali del job) e resumed.
+        """
+        checkpoint = get_compaction_checkpoint(goal_id)
+        resumed = bool(checkpoint and checkpoint["status"] == "running")
+
+        if resumed:
+            cutoff_ts = checkpoint["cutoff_ts"]
+            batches = checkpoint["batches_done"]
+            archived = checkpoint["archived"]
+        else:
+            cutoff_ts = (
+                datetime.utcnow() - timedelta(days=older_than_days)
+            ).timestamp()
+            batches = 0
+            archived = 0
+
+        save_compaction_checkpoint(goal_id, cutoff_ts, batches, archived, "running")
+
+        while True:
+            records = self.vector_store.scroll_compactable_memories(
+                goal_id=goal_id,
+                before_ts=cutoff_ts,
+                limit=self.batch_size
+            )
+            if not records:
+                break
+
+            ids = sorted(str(r.id) for r in records)
+            batch_id = str(uuid.uuid5(COMPACTION_NAMESPACE, f"{goal_id}:{','.join(ids)}"))
+
+            summary = self.summarize([r.payload for r in records])
+
+            if summary and summary.strip():
+                newest = max(records, key=lambda r: r.payload.get("timestamp_ts") or 0)
+                self.vector_store.write_memories([
+                    {
+                        "id": batch_id,
+                        "goal_id": goal_id,
+                        "content": summary,
+                        "memory_type": "compressed",
+                        "source": "memory_compactor",
+                        # età del batch, non della compattazione (recency e passate successive)
+                        "timestamp": newest.payload.get("timestamp"),
+                        "timestamp_ts": newest.payload.get("timestamp_ts"),
+                    }
+                ])
+
+            if self.archive:
+                self.vector_store.archive_memory_points(records)
+            self.vector_store.delete_memories([r.id for r in records], goal_id=goal_id)
+
+            batches += 1
+            archived += len(records)
+            save_compaction_checkpoint(goal_id, cutoff_ts, batches, archived, "running")
+
+        save_compaction_checkpoint(goal_id, cutoff_ts, batches, archived, "completed")
+
+        logger.info(
+            "Memory compaction goal=%s batches=%s archived=%s resumed=%s",
+            goal_id, batches, archived, resumed
+        )
+
+        return {"batches": batches, "archived": archived, "resumed": resumed}
@@ -2,9 +2,17 @@
 Funzioni CRUD per goals e tasks su SQLite.
 """
 
-from datetime import datetime
+import json
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
 from storage.sqlite import SQLiteDB
 
+# connessioni riusate dal pool condiviso (vedi SQLiteDB.connection)
+db = SQLiteDB()
+
 
 # -------------------------
 # GOALS
@@ -21,18 +29,15 @@ def create_goal(description: str, status: str = "pending") -> int:
     Returns:
         int: ID del goal creato.
     """
-    conn = SQLiteDB().connect()
-    cur = conn.execute(
-        """
-        INSERT INTO goals (description, status, created_at)
-        VALUES (?, ?, ?)
-        """,
-        (description, status, datetime.utcnow().isoformat())
-    )
-    conn.commit()
-    goal_id = cur.lastrowid
-    conn.close()
-    return goal_id
+    with db.connection() as conn:
+        cur = conn.execute(
+            """
+            INSERT INTO goals (description, status, created_at)
+            VALUES (?, ?, ?)
+            """,
+            (description, status, datetime.utcnow().isoformat())
+        )
+        return cur.lastrowid
 
 
 def get_goal(goal_id: int):
@@ -45,16 +50,48 @@ def get_goal(goal_id: int):
     Returns:
         dict | None: Dizionario con i dati del goal, oppure None se non trovato.
     """
-    conn = SQLiteDB().connect()
-    cur = conn.execute(
-        "SELECT * FROM goals WHERE id = ?",
-        (goal_id,)
-    )
-    row = cur.fetchone()
-    conn.close()
+    with db.connection() as conn:
+        row = conn.execute(
+            "SELECT * FROM goals WHERE id = ?",
+            (goal_id,)
+        ).fetchone()
     return dict(row) if row else None
 
 
+def iter_goal_ids(status: str = "active", page_size: int = 500) -> Iterator[int]:
+    """
+    Itera sugli ID dei goal con un certo stato, a pagine (keyset su id):
+    nessuna connessione resta occupata tra una pagina e l'altra.
+
+    Args:
+        status (str, optional): Stato dei goal da enumerare. Default 'active'.
+        page_size (int, optional): Righe lette per query.
+
+    Yields:
+        int: ID del goal, in ordine crescente.
+    """
+    last_id = 0
+    while True:
+        with db.connection() as conn:
+            rows = conn.execute(
+                """
+                SELECT id FROM goals
+                WHERE status = ? AND id > ?
+                ORDER BY id
+                LIMIT ?
+                """,
+                (status, last_id, page_size)
+            ).fetchall()
+
+        if not rows:
+            return
+
+        for row in rows:
+            yield row["id"]
+
+        last_id = rows[-1]["id"]
+
+
 # -------------------------
 # TASKS
 # -------------------------
@@ -75,18 +112,87 @@ def create_task(
     Returns:
         int: ID del task creato.
     """
-    conn = SQLiteDB().connect()
-    cur = conn.execute(
+    with db.connection() as conn:
+        cur = conn.execute(
+            """
+            INSERT INTO tasks (goal_id, description, status, created_at)
+            VALUES (?, ?, ?, ?)
+            """,
+            (goal_id, description, status, datetime.utcnow().isoformat())
+        )
+        _delete_daily_messages(conn, goal_id)
+        return cur.lastrowid
+
+
+def create_tasks_bulk(
+    goal_id: int,
+    tasks: List[str],
+    status: str = "pending"
+) -> None:
+    """
+    Crea più task per lo stesso goal con un solo executemany
+    in un'unica transazione.
+
+    Args:
+        goal_id (int): Identificativo del goal a cui associare i task.
+        tasks (List[str]): Descrizioni dei task, nell'ordine di inserimento.
+        status (str, optional): Stato iniziale dei task. Default 'pending'.
+
+    Returns:
+        None
+    """
+    with db.connection() as conn:
+        _insert_tasks(conn, goal_id, tasks, status)
+        _delete_daily_messages(conn, goal_id)
+
+
+def create_goal_with_tasks(
+    description: str,
+    tasks: List[str],
+    status: str = "pending"
+) -> int:
+    """
+    Crea un goal e tutti i suoi task nella stessa transazione:
+    o viene salvato tutto, o niente.
+
+    Args:
+        description (str): Descrizione del goal.
+        tasks (List[str]): Descrizioni dei task, nell'ordine di inserimento.
+        status (str): Stato iniziale del goal.
+
+    Returns:
+        int: ID del goal creato.
+    """
+    now = datetime.utcnow().isoformat()
+
+    with db.connection() as conn:
+        cur = conn.execute(
+            """
+            INSERT INTO goals (description, status, created_at)
+            VALUES (?, ?, ?)
+            """,
+            (description, status, now)
+        )
+        goal_id = cur.lastrowid
+        _insert_tasks(conn, goal_id, tasks, "pending")
+
+    return goal_id
+
+
+def _insert_tasks(
+    conn: sqlite3.Connection,
+    goal_id: int,
+    tasks: List[str],
+    status: str
+) -> None:
+    now = datetime.utcnow().isoformat()
+    conn.executemany(
         """
         INSERT INTO tasks (goal_id, description, status, created_at)
         VALUES (?, ?, ?, ?)
         """,
-        (goal_id, description, status, datetime.utcnow().isoformat())
+        [(goal_id, task, status, now) for task in tasks]
     )
-    conn.commit()
-    task_id = cur.lastrowid
-    conn.close()
-    return task_id
 
 
 def update_task_status(task_id: int, status: str) -> None:
@@ -100,10 +206,391 @@ def update_task_status(task_id: int, status: str) -> None:
     Returns:
         None
     """
-    conn = SQLiteDB().connect()
+    with db.connection() as conn:
+        conn.execute(
+            "UPDATE tasks SET status = ? WHERE id = ?",
+            (status, task_id)
+        )
+        # i task attivi sono cambiati: il messaggio del giorno va rigenerato
+        row = conn.execute(
+            "SELECT goal_id FROM tasks WHERE id = ?",
+            (task_id,)
+        ).fetchone()
+        if row is not None:
+            _delete_daily_messages(conn, row["goal_id"])
+
+
+# -------------------------
+# MEMORY COMPACTION
+# -------------------------
+
+def get_compaction_checkpoint(goal_id: int) -> Optional[Dict]:
+    """
+    Recupera il checkpoint dell'ultima compattazione memorie di un goal.
+
+    Args:
+        goal_id (int): Identificativo del goal.
+
+    Returns:
+        dict | None: cutoff_ts, batches_done, archived, status; None se mai eseguita.
+    """
+    with db.connection() as conn:
+        row = conn.execute(
+            "SELECT * FROM memory_compaction_checkpoints WHERE goal_id = ?",
+            (goal_id,)
+        ).fetchone()
+    return dict(row) if row else None
+
+
+def save_compaction_checkpoint(
+    goal_id: int,
+    cutoff_ts: float,
+    batches_done: int,
+    archived: int,
+    status: str
+) -> None:
+    """
+    Salva (o sovrascrive) il checkpoint di compattazione di un goal.
+
+    Args:
+        goal_id (int): Identificativo del goal.
+        cutoff_ts (float): Soglia temporale del job in corso.
+        batches_done (int): Batch già compattati.
+        archived (int): Memorie originali già archiviate.
+        status (str): 'running' o 'completed'.
+
+    Returns:
+        None
+    """
+    with db.connection() as conn:
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO memory_compaction_checkpoints
+                (goal_id, cutoff_ts, batches_done, archived, status, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (
+                goal_id,
+                cutoff_ts,
+                batches_done,
+                archived,
+                status,
+                datetime.utcnow().isoformat()
+            )
+        )
+
+
+# -------------------------
+# PROGRESS AGGREGATES
+# -------------------------
+
+@contextmanager
+def progress_aggregates_transaction() -> Iterator[sqlite3.Connection]:
+    """
+    Transazione esclusiva (BEGIN IMMEDIATE) per la ricostruzione dei bucket:
+    tiene il lock di scrittura del database, quindi serializza anche tra
+    processi diversi ricostruzioni e scritture dei goal non ancora ricostruiti.
+    Le funzioni degli aggregati accettano la connessione tramite `conn`.
+    """
+    with db.connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        yield conn
+
+
+@contextmanager
+def _connection(conn: Optional[sqlite3.Connection]) -> Iterator[sqlite3.Connection]:
+    # connessione della transazione in corso, altrimenti una del pool
+    if conn is not None:
+        yield conn
+    else:
+        with db.connection() as pooled:
+            yield pooled
+
+
+def increment_progress_aggregates(
+    entries: List[Dict],
+    conn: Optional[sqlite3.Connection] = None
+) -> None:
+    """
+    Aggiorna i bucket giornalieri (goal_id, giorno UTC) con nuovi progress log.
+    I log vengono pre-aggregati per bucket e scritti in un'unica transazione.
+
+    Args:
+        entries (List[Dict]): Log con chiavi goal_id, done, difficulty, energy
+            e timestamp_ts; quelli senza goal_id vengono ignorati.
+        conn (sqlite3.Connection, optional): Connessione di una transazione in corso.
+
+    Returns:
+        None
+    """
+    buckets: Dict[tuple, List[int]] = {}
+
+    for e in entries:
+        if e.get("goal_id") is None:
+            continue
+        day = datetime.utcfromtimestamp(e["timestamp_ts"]).date().isoformat()
+        b = buckets.setdefault((e["goal_id"], day), [0, 0, 0, 0])
+        b[0] += 1
+        b[1] += 1 if e["done"] else 0
+        b[2] += e["difficulty"]
+        b[3] += e["energy"]
+
+    if not buckets:
+        return
+
+    with _connection(conn) as conn:
+        conn.executemany(
+            """
+            INSERT INTO progress_daily_aggregates
+                (goal_id, day, log_count, done_count, difficulty_sum, energy_sum)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (goal_id, day) DO UPDATE SET
+                log_count = log_count + excluded.log_count,
+                done_count = done_count + excluded.done_count,
+                difficulty_sum = difficulty_sum + excluded.difficulty_sum,
+                energy_sum = energy_sum + excluded.energy_sum
+            """,
+            [(goal_id, day, *values) for (goal_id, day), values in buckets.items()]
+        )
+
+
+def get_progress_buckets(goal_id: int, days: int) -> List[Dict]:
+    """
+    Bucket giornalieri degli ultimi `days` giorni (oggi incluso, UTC).
+
+    Args:
+        goal_id (int): Identificativo del goal.
+        days (int): Ampiezza della finestra in giorni.
+
+    Returns:
+        List[Dict]: Un dizionario per giorno con log_count, done_count,
+            difficulty_sum, energy_sum.
+    """
+    since = (datetime.utcnow().date() - timedelta(days=days - 1)).isoformat()
+
+    with db.connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT * FROM progress_daily_aggregates
+            WHERE goal_id = ? AND day >= ?
+            ORDER BY day
+            """,
+            (goal_id, since)
+        ).fetchall()
+    return [dict(r) for r in rows]
+
+
+def reset_progress_aggregates(goal_id: int, conn: Optional[sqlite3.Connection] = None) -> None:
+    """
+    Cancella i bucket di un goal (prima di una ricostruzione completa).
+
+    Args:
+        goal_id (int): Identificativo del goal.
+        conn (sqlite3.Connection, optional): Connessione di una transazione in corso.
+
+    Returns:
+        None
+    """
+    with _connection(conn) as conn:
+        conn.execute(
+            "DELETE FROM progress_daily_aggregates WHERE goal_id = ?",
+            (goal_id,)
+        )
+
+
+def is_progress_backfilled(goal_id: int, conn: Optional[sqlite3.Connection] = None) -> bool:
+    """
+    Indica se i bucket del goal sono già stati ricostruiti dai progress log.
+
+    Args:
+        goal_id (int): Identificativo del goal.
+        conn (sqlite3.Connection, optional): Connessione di una transazione in corso.
+
+    Returns:
+        bool
+    """
+    with _connection(conn) as conn:
+        row = conn.execute(
+            "SELECT 1 FROM progress_aggregate_backfills WHERE goal_id = ?",
+            (goal_id,)
+        ).fetchone()
+    return row is not None
+
+
+def mark_progress_backfilled(goal_id: int, conn: Optional[sqlite3.Connection] = None) -> None:
+    """
+    Registra il completamento della ricostruzione dei bucket di un goal.
+
+    Args:
+        goal_id (int): Identificativo del goal.
+        conn (sqlite3.Connection, optional): Connessione di una transazione in corso.
+
+    Returns:
+        None
+    """
+    with _connection(conn) as conn:
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO progress_aggregate_backfills (goal_id, completed_at)
+            VALUES (?, ?)
+            """,
+            (goal_id, datetime.utcnow().isoformat())
+        )
+
+
+# -------------------------
+# DAILY MESSAGES (cache)
+# -------------------------
+
+def get_daily_message(goal_id: int, day: str) -> Optional[Dict]:
+    """
+    Recupera il messaggio giornaliero già generato per un goal.
+
+    Args:
+        goal_id (int): Identificativo del goal.
+        day (str): Giorno in formato ISO (YYYY-MM-DD).
+
+    Returns:
+        dict | None: Payload salvato (goal_id, message, tasks), oppure None.
+    """
+    with db.connection() as conn:
+        row = conn.execute(
+            "SELECT payload FROM daily_messages WHERE goal_id = ? AND day = ?",
+            (goal_id, day)
+        ).fetchone()
+    return json.loads(row["payload"]) if row else None
+
+
+def get_daily_message_version(goal_id: int) -> int:
+    """
+    Versione corrente della cache giornaliera di un goal: cresce a ogni
+    invalidazione (cambio stato dei task, feedback).
+
+    Args:
+        goal_id (int): Identificativo del goal.
+
+    Returns:
+        int: 0 se il goal non è mai stato invalidato.
+    """
+    with db.connection() as conn:
+        row = conn.execute(
+            "SELECT version FROM daily_message_versions WHERE goal_id = ?",
+            (goal_id,)
+        ).fetchone()
+    return row["version"] if row else 0
+
+
+def save_daily_message(
+    goal_id: int,
+    day: str,
+    payload: Dict,
+    version: Optional[int] = None
+) -> bool:
+    """
+    Salva (o sostituisce) il messaggio giornaliero di un goal e rimuove
+    quelli dei giorni precedenti.
+
+    Args:
+        goal_id (int): Identificativo del goal.
+        day (str): Giorno in formato ISO (YYYY-MM-DD).
+        payload (Dict): Risultato di CoachAgent.daily_message.
+        version (int, optional): Versione letta prima di generare il messaggio;
+            se nel frattempo c'è stata un'invalidazione il messaggio non viene salvato.
+
+    Returns:
+        bool: True se il messaggio è stato salvato.
+    """
+    with db.connection() as conn:
+        conn.execute(
+            "DELETE FROM daily_messages WHERE goal_id = ? AND day < ?",
+            (goal_id, day)
+        )
+        cur = conn.execute(
+            """
+            INSERT OR REPLACE INTO daily_messages (goal_id, day, payload, created_at)
+            SELECT ?, ?, ?, ?
+            WHERE ? IS NULL OR ? = COALESCE(
+                (SELECT version FROM daily_message_versions WHERE goal_id = ?), 0
+            )
+            """,
+            (
+                goal_id,
+                day,
+                json.dumps(payload),
+                datetime.utcnow().isoformat(),
+                version,
+                version,
+                goal_id
+            )
+        )
+        return cur.rowcount > 0
+
+
+def purge_daily_messages(before_day: str) -> int:
+    """
+    Cancella i messaggi giornalieri dei giorni precedenti a `before_day`
+    (anche dei goal non più consultati).
+
+    Args:
+        before_day (str): Giorno in formato ISO (YYYY-MM-DD), escluso.
+
+    Returns:
+        int: Numero di messaggi cancellati.
+    """
+    with db.connection() as conn:
+        cur = conn.execute(
+            "DELETE FROM daily_messages WHERE day < ?",
+            (before_day,)
+        )
+        return cur.rowcount
+
+
+def invalidate_daily_message(goal_id: int) -> None:
+    """
+    Invalida i messaggi giornalieri di un goal (es. dopo un feedback).
+
+    Args:
+        goal_id (int): Identificativo del goal.
+
+    Returns:
+        None
+    """
+    with db.connection() as conn:
+        _delete_daily_messages(conn, goal_id)
+
+
+def invalidate_daily_messages_for_tasks(task_ids: List[int]) -> None:
+    """
+    Invalida i messaggi giornalieri dei goal a cui appartengono i task.
+
+    Args:
+        task_ids (List[int]): Identificativi dei task.
+
+    Returns:
+        None
+    """
+    if not task_ids:
+        return
+
+    placeholders = ",".join("?" for _ in task_ids)
+    with db.connection() as conn:
+        goal_ids = [
+            row["goal_id"]
+            for row in conn.execute(
+                f"SELECT DISTINCT goal_id FROM tasks WHERE id IN ({placeholders})",
+                list(task_ids)
+            )
+        ]
+        for goal_id in goal_ids:
+            _delete_daily_messages(conn, goal_id)
+
+
+def _delete_daily_messages(conn: sqlite3.Connection, goal_id: int) -> None:
+    conn.execute("DELETE FROM daily_messages WHERE goal_id = ?", (goal_id,))
     conn.execute(
-        "UPDATE tasks SET status = ? WHERE id = ?",
-        (status, task_id)
+        """
+        INSERT INTO daily_message_versions (goal_id, version) VALUES (?, 1)
+        ON CONFLICT (goal_id) DO UPDATE SET version = version + 1
+        """,
+        (goal_id,)
     )
-    conn.commit()
-    conn.close()
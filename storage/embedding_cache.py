@@ -0,0 +1,126 @@
+"""
+Cache degli embedding indirizzata per contenuto.
+
+Chiave = hash(modello + testo): testi ripetuti o costanti (query fisse,
+"progress log", ...) non passano più dal transformer.
+
+Due livelli:
+- LRU in memoria, limitata a `max_size` elementi
+- tier persistente opzionale su SQLite (sopravvive ai riavvii)
+"""
+
+import hashlib
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+
+class EmbeddingCache:
+    """
+    LRU in memoria + tier opzionale su disco, thread-safe.
+    """
+
+    def __init__(self, max_size: int = 4096, path: Optional[str] = None):
+        self.max_size = max_size
+        self.path = path
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lru: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = None
+
+        if path:
+            self._disk = sqlite3.connect(path, check_same_thread=False)
+            self._disk.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    vector BLOB NOT NULL
+                )
+            """)
+            self._disk.commit()
+
+    # -------------------------
+    # KEYS
+    # -------------------------
+
+    @staticmethod
+    def make_key(model_name: str, text: str) -> str:
+        digest = hashlib.sha256(f"{model_name}\0{text}".encode("utf-8"))
+        return digest.hexdigest()
+
+    # -------------------------
+    # GET / PUT
+    # -------------------------
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._lru.get(key)
+
+            if vector is not None:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return vector
+
+            if self._disk is not None:
+                row = self._disk.execute(
+                    "SELECT vector FROM embeddings WHERE key = ?",
+                    (key,)
+                ).fetchone()
+
+                if row:
+                    vector = array("f", row[0]).tolist()
+                    self._remember(key, vector)
+                    self.hits += 1
+                    return vector
+
+            self.misses += 1
+            return None
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        if not items:
+            return
+
+        with self._lock:
+            for key, vector in items.items():
+                self._remember(key, vector)
+
+            if self._disk is not None:
+                self._disk.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [
+                        (key, array("f", vector).tobytes())
+                        for key, vector in items.items()
+                    ]
+                )
+                self._disk.commit()
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+
+        while len(self._lru) > self.max_size:
+            self._lru.popitem(last=False)
+
+    # -------------------------
+    # STATS / CLEANUP
+    # -------------------------
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._lru),
+                "max_size": self.max_size,
+                "persistent": self._disk is not None,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._disk is not None:
+                self._disk.close()
+                self._disk = None
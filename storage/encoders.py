@@ -0,0 +1,73 @@
+"""
+Registry di processo per i modelli di embedding.
+
+Ogni SentenceTransformer viene caricato una sola volta per nome modello
+e condiviso da tutti i VectorStorage e i tool dello stesso processo.
+
+HashEncoder è un encoder deterministico senza modello, da iniettare in
+VectorStorage per benchmark e test (stessa interfaccia `encode`).
+"""
+
+import hashlib
+import math
+import random
+import threading
+from typing import Dict, List
+
+from sentence_transformers import SentenceTransformer
+
+_encoders: Dict[str, SentenceTransformer] = {}
+_lock = threading.Lock()
+
+
+def get_encoder(model_name: str) -> SentenceTransformer:
+    """
+    Restituisce l'encoder condiviso per `model_name`, caricandolo al primo uso.
+
+    Args:
+        model_name (str): Nome del modello sentence-transformers.
+
+    Returns:
+        SentenceTransformer: Istanza condivisa nel processo.
+    """
+    encoder = _encoders.get(model_name)
+    if encoder is not None:
+        return encoder
+
+    with _lock:
+        if model_name not in _encoders:
+            _encoders[model_name] = SentenceTransformer(model_name)
+        return _encoders[model_name]
+
+
+def loaded_models() -> List[str]:
+    return list(_encoders)
+
+
+class _Vectors(list):
+    """
+    Lista di vettori con `tolist()`, come l'ndarray di SentenceTransformer.
+    """
+
+    def tolist(self) -> List[List[float]]:
+        return list(self)
+
+
+class HashEncoder:
+    """
+    Encoder deterministico: il vettore (normalizzato) dipende solo
+    dall'hash del testo. Nessun significato semantico, costo trascurabile.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def _vector(self, text: str) -> List[float]:
+        seed = int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:16], 16)
+        rng = random.Random(seed)
+        values = [rng.gauss(0.0, 1.0) for _ in range(self.dim)]
+        norm = math.sqrt(sum(v * v for v in values)) or 1.0
+        return [v / norm for v in values]
+
+    def encode(self, texts: List[str]) -> _Vectors:
+        return _Vectors(self._vector(t) for t in texts)
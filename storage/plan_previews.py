@@ -0,0 +1,208 @@
+"""
+Store dei piani in anteprima.
+
+/plan-preview salva il piano generato sotto un preview_id con TTL;
+/confirm-plan persiste esattamente quel piano senza richiamare l'LLM.
+Il backend in memoria vale per un solo processo; con più worker
+uvicorn /confirm-plan può arrivare a un worker diverso da /plan-preview
+e serve il backend SQLite (tabella plan_previews del database app).
+"""
+
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from storage.sqlite import SQLiteDB
+
+
+class PreviewExpiredError(LookupError):
+    """
+    Anteprima sconosciuta o scaduta: il piano va rigenerato con /plan-preview.
+    """
+
+
+class PlanPreviewStore:
+    """
+    Piani in anteprima indicizzati per preview_id, con scadenza e dimensione massima.
+    """
+
+    def __init__(self, ttl_seconds: float = 900, max_size: int = 1000):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+
+        self._items: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def new_id() -> str:
+        return uuid.uuid4().hex
+
+    def put(self, goal_text: str, plan: Dict, preview_id: Optional[str] = None) -> str:
+        """
+        Salva un piano e restituisce il suo preview_id (generato se non indicato).
+        """
+        preview_id = preview_id or self.new_id()
+
+        with self._lock:
+            self._purge()
+            self._items[preview_id] = {
+                "goal_text": goal_text,
+                "plan": plan,
+                "expires_at": time.monotonic() + self.ttl_seconds,
+            }
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+        return preview_id
+
+    def get(self, preview_id: str) -> Optional[Dict]:
+        """
+        Restituisce l'anteprima ({goal_text, plan}) senza rimuoverla,
+        oppure None se sconosciuta o scaduta.
+        """
+        with self._lock:
+            item = self._items.get(preview_id)
+
+        if item is None or item["expires_at"] < time.monotonic():
+            return None
+
+        return {"goal_text": item["goal_text"], "plan": item["plan"]}
+
+    def delete(self, preview_id: str) -> None:
+        with self._lock:
+            self._items.pop(preview_id, None)
+
+    def pop(self, preview_id: str) -> Optional[Dict]:
+        """
+        Rimuove e restituisce l'anteprima ({goal_text, plan}),
+        oppure None se sconosciuta o scaduta. Atomica: tra conferme
+        concorrenti della stessa anteprima una sola la ottiene.
+        """
+        with self._lock:
+            item = self._items.pop(preview_id, None)
+
+        if item is None or item["expires_at"] < time.monotonic():
+            return None
+
+        return {"goal_text": item["goal_text"], "plan": item["plan"]}
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._purge()
+            return len(self._items)
+
+    def _purge(self) -> None:
+        now = time.monotonic()
+        expired = [k for k, v in self._items.items() if v["expires_at"] < now]
+        for key in expired:
+            del self._items[key]
+
+
+class SQLitePlanPreviewStore:
+    """
+    Piani in anteprima su SQLite, condivisi tra i processi.
+    Stessa interfaccia di PlanPreviewStore; scadenza su orologio di sistema.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 900,
+        max_size: int = 1000,
+        db: Optional[SQLiteDB] = None
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.db = db or SQLiteDB()
+
+    @staticmethod
+    def new_id() -> str:
+        return uuid.uuid4().hex
+
+    def put(self, goal_text: str, plan: Dict, preview_id: Optional[str] = None) -> str:
+        preview_id = preview_id or self.new_id()
+        now = time.time()
+
+        with self.db.connection() as conn:
+            conn.execute("DELETE FROM plan_previews WHERE expires_at < ?", (now,))
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO plan_previews (preview_id, goal_text, plan, expires_at)
+                VALUES (?, ?, ?, ?)
+                """,
+                (preview_id, goal_text, json.dumps(plan), now + self.ttl_seconds)
+            )
+            conn.execute(
+                """
+                DELETE FROM plan_previews WHERE preview_id NOT IN (
+                    SELECT preview_id FROM plan_previews
+                    ORDER BY expires_at DESC LIMIT ?
+                )
+                """,
+                (self.max_size,)
+            )
+
+        return preview_id
+
+    def get(self, preview_id: str) -> Optional[Dict]:
+        with self.db.connection() as conn:
+            row = conn.execute(
+                """
+                SELECT goal_text, plan FROM plan_previews
+                WHERE preview_id = ? AND expires_at >= ?
+                """,
+                (preview_id, time.time())
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return {"goal_text": row["goal_text"], "plan": json.loads(row["plan"])}
+
+    def delete(self, preview_id: str) -> None:
+        with self.db.connection() as conn:
+            conn.execute("DELETE FROM plan_previews WHERE preview_id = ?", (preview_id,))
+
+    def pop(self, preview_id: str) -> Optional[Dict]:
+        """
+        Rimozione atomica (DELETE ... RETURNING): tra più worker che
+        confermano la stessa anteprima uno solo la ottiene.
+        """
+        with self.db.connection() as conn:
+            # fetchall: lo statement va completato prima del commit
+            rows = conn.execute(
+                """
+                DELETE FROM plan_previews WHERE preview_id = ?
+                RETURNING goal_text, plan, expires_at
+                """,
+                (preview_id,)
+            ).fetchall()
+
+        if not rows or rows[0]["expires_at"] < time.time():
+            return None
+
+        row = rows[0]
+        return {"goal_text": row["goal_text"], "plan": json.loads(row["plan"])}
+
+    def __len__(self) -> int:
+        with self.db.connection() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) AS n FROM plan_previews WHERE expires_at >= ?",
+                (time.time(),)
+            ).fetchone()
+        return row["n"]
+
+
+def build_plan_preview_store(kind: str, ttl_seconds: float):
+    """
+    Crea lo store delle anteprime indicato in configurazione ("memory" o "sqlite").
+    """
+    if kind == "sqlite":
+        return SQLitePlanPreviewStore(ttl_seconds=ttl_seconds)
+
+    if kind == "memory":
+        return PlanPreviewStore(ttl_seconds=ttl_seconds)
+
+    raise ValueError(f"Unknown plan preview backend: {kind}")
@@ -1,4 +1,3 @@
-from qdrant_client import QdrantClient
 from qdrant_client.models import (
     VectorParams,
     Distance,
@@ -7,27 +6,141 @@ from qdrant_client.models import (
     FieldCondition,
     MatchValue,
     Range,
+    PayloadSchemaType,
+    PointIdsList,
+    HnswConfigDiff,
 )
-from sentence_transformers import SentenceTransformer
+from collections import defaultdict
 from datetime import datetime, timedelta
+import logging
 import uuid
-from typing import List, Dict, Optional
+import zlib
+from itertools import islice
+from typing import Callable, Iterator, List, Dict, Optional, Set
+
+from app.tracing import TracedProxy, span
+from storage.compaction import MemoryCompactor
+from storage.crud import (
+    get_progress_buckets,
+    increment_progress_aggregates,
+    is_progress_backfilled,
+    mark_progress_backfilled,
+    progress_aggregates_transaction,
+    reset_progress_aggregates,
+)
+from storage.embedding_cache import EmbeddingCache
+from storage.encoders import get_encoder
+from storage.qdrant_clients import build_qdrant_client
+
+
+logger = logging.getLogger(__name__)
+
+TENANCY_MODES = ("shared", "payload", "sharded")
+
+
+def shard_for(goal_id: int, shards: int) -> int:
+    """
+    Shard stabile (tra processi e riavvii) di un goal.
+    """
+    return zlib.crc32(str(goal_id).encode("utf-8")) % shards
 
 
 class VectorStorage:
     """
     Gateway unico verso il Vector DB (Qdrant).
     Compatibile con qdrant-client==1.7.x
+
+    I progress log aggiornano sempre gli aggregati giornalieri su SQLite
+    (richiede le migrazioni), qualunque sia il processo che li scrive.
+
+    Modalità multi-tenant (`tenancy`), trasparenti per i metodi pubblici:
+    - "shared": una collection per tipo, filtro su goal_id (default);
+    - "payload": stesse collection, ma l'indice HNSW è costruito per
+      goal_id (payload_m=16, m=0): ogni ricerca per goal esplora solo
+      il grafo del proprio goal. Le ricerche senza filtro goal_id
+      diventano scansioni complete. Solo su server: Qdrant embedded
+      ignora hnsw_config (equivale a "shared");
+    - "sharded": `shards` collection per tipo (es. memories_3), scelte
+      con un hash di goal_id; ogni shard contiene una frazione dei goal.
+      Un'installazione esistente, o un cambio del numero di shard, va
+      migrata con `reshard`.
     """
 
+    # collection logiche; in modalità "sharded" ognuna ha `shards` collection fisiche
+    COLLECTIONS = ("memories", "memories_archive", "progress_logs")
+
+    # indici payload usati dai filtri di search/scroll
+    PAYLOAD_INDEXES = {
+        "memories": {
+            "goal_id": PayloadSchemaType.INTEGER,
+            "type": PayloadSchemaType.KEYWORD,
+            "source": PayloadSchemaType.KEYWORD,
+            "timestamp_ts": PayloadSchemaType.FLOAT,
+        },
+        # in modalità "payload" il grafo HNSW per goal richiede l'indice su goal_id
+        "memories_archive": {
+            "goal_id": PayloadSchemaType.INTEGER,
+            "timestamp_ts": PayloadSchemaType.FLOAT,
+        },
+        "progress_logs": {
+            "goal_id": PayloadSchemaType.INTEGER,
+            "timestamp_ts": PayloadSchemaType.FLOAT,
+        },
+    }
+
     def __init__(
         self,
         path: str = "./qdrant_data",
-        embedding_model: str = "all-MiniLM-L6-v2"
+        embedding_model: str = "all-MiniLM-L6-v2",
+        cache_size: int = 4096,
+        cache_path: Optional[str] = None,
+        encoder=None,
+        tenancy: str = "shared",
+        shards: int = 8,
+        url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        prefer_grpc: bool = True,
+        grpc_port: int = 6334,
+        timeout: Optional[float] = None,
+        pool_size: int = 1
     ):
-        self.client = QdrantClient(path=path)
-        self.encoder = SentenceTransformer(embedding_model)
+        if tenancy not in TENANCY_MODES:
+            raise ValueError(f"Unknown tenancy mode: {tenancy}")
+
+        # server remoto se `url` è indicato (condivisibile tra worker),
+        # altrimenti Qdrant embedded su `path` (lock su file, un solo processo;
+        # non thread-safe: le chiamate dei passi paralleli vengono serializzate)
+        client = build_qdrant_client(
+            path=path,
+            url=url,
+            api_key=api_key,
+            prefer_grpc=prefer_grpc,
+            grpc_port=grpc_port,
+            timeout=timeout,
+            pool_size=pool_size
+        )
+        # ogni chiamata al client apre uno span "qdrant"
+        self.client = TracedProxy(client, stage="qdrant", prefix="qdrant")
+        # Qdrant embedded ignora indici payload e config HNSW
+        self.is_local = not url
+        self.embedding_model = embedding_model
+        # encoder condiviso nel processo (vedi storage.encoders)
+        self.encoder = encoder or get_encoder(embedding_model)
+        self.embedding_cache = EmbeddingCache(
+            max_size=cache_size,
+            path=cache_path
+        )
         self.vector_size = 384
+        # goal con aggregati già ricostruiti (il flag su SQLite è definitivo)
+        self._backfilled = set()
+        self.tenancy = tenancy
+        self.shards = shards if tenancy == "sharded" else 1
+
+        if tenancy == "payload" and self.is_local:
+            logger.warning(
+                "tenancy='payload' needs a Qdrant server (QDRANT_URL): embedded "
+                "Qdrant ignores hnsw_config, collections behave as 'shared'"
+            )
 
     # -------------------------
     # INIT
@@ -36,24 +149,278 @@ class VectorStorage:
     def init(self):
         existing = {c.name for c in self.client.get_collections().collections}
 
-        if "memories" not in existing:
-            self.client.create_collection(
-                collection_name="memories",
-                vectors_config=VectorParams(
-                    size=self.vector_size,
-                    distance=Distance.COSINE
+        if self.tenancy == "sharded":
+            self._check_unsharded(existing)
+            self._check_shard_count(existing)
+
+        self._ensure_collections(existing)
+
+    def _ensure_collections(self, existing) -> None:
+        # payload: grafo HNSW per goal_id invece di quello globale
+        # (solo su server: Qdrant embedded ignora hnsw_config)
+        hnsw_config = (
+            HnswConfigDiff(payload_m=16, m=0)
+            if self.tenancy == "payload" and not self.is_local else None
+        )
+
+        for base in self.COLLECTIONS:
+            for collection_name in self._collections(base):
+                if collection_name not in existing:
+                    self._create_collection(collection_name, hnsw_config)
+                elif hnsw_config is not None:
+                    current = self.client.get_collection(collection_name).config.hnsw_config
+                    if (current.m, current.payload_m) != (hnsw_config.m, hnsw_config.payload_m):
+                        # collection esistente: l'indice viene ricostruito per goal
+                        self.client.update_collection(
+                            collection_name=collection_name,
+                            hnsw_config=hnsw_config
+                        )
+
+                fields = self.PAYLOAD_INDEXES.get(base)
+                if fields:
+                    self._ensure_payload_indexes(collection_name, fields)
+
+    def _check_unsharded(self, existing) -> None:
+        """
+        Passando a "sharded" su un'installazione esistente, i punti delle
+        collection non shardate non sarebbero più raggiungibili: meglio
+        non partire finché non sono stati spostati con `reshard`.
+        """
+        legacy = {
+            base: self.client.count(collection_name=base, exact=True).count
+            for base in self.COLLECTIONS
+            if base in existing
+        }
+        legacy = {base: n for base, n in legacy.items() if n}
+
+        if legacy:
+            raise RuntimeError(
+                f"Unsharded collections still contain points {legacy}: "
+                "run `python -m storage.reshard` before using tenancy='sharded'"
+            )
+
+    def _check_shard_count(self, existing) -> None:
+        """
+        Con un numero di shard diverso da quello usato per scrivere, l'hash
+        di goal_id punterebbe allo shard sbagliato: i punti esistenti non
+        sarebbero più trovati. Si parte solo dopo `reshard`.
+        """
+        mismatched = {}
+        for base in self.COLLECTIONS:
+            current = self._existing_shards(existing, base)
+            if not current or current == set(range(self.shards)):
+                continue
+            points = sum(
+                self.client.count(collection_name=f"{base}_{i}", exact=True).count
+                for i in current
+            )
+            if points:
+                mismatched[base] = max(current) + 1
+
+        if mismatched:
+            raise RuntimeError(
+                f"Sharded collections were written with a different shard count "
+                f"{mismatched} (configured {self.shards}): run "
+                f"`python -m storage.reshard --shards {self.shards}` first"
+            )
+
+    @staticmethod
+    def _existing_shards(existing, base: str) -> Set[int]:
+        prefix = f"{base}_"
+        return {
+            int(name[len(prefix):])
+            for name in existing
+            if name.startswith(prefix) and name[len(prefix):].isdigit()
+        }
+
+    def reshard(self, batch_size: int = 256) -> Dict[str, int]:
+        """
+        Migrazione una tantum verso "sharded": copia i punti delle collection
+        non shardate (memories, progress_logs, ...) negli shard del loro goal,
+        poi cancella le collection originali.
+        Se gli shard esistenti hanno un numero diverso da `shards`, i loro
+        punti vengono prima riportati nella collection non shardata e poi
+        ridistribuiti: un'interruzione lascia punti non shardati, e init
+        rifiuta di partire finché la migrazione non viene rilanciata.
+        Idempotente (upsert per id): se interrotta si può rilanciare.
+
+        Returns:
+            Dict: punti spostati per collection.
+        """
+        if self.tenancy != "sharded":
+            raise ValueError("reshard requires tenancy='sharded'")
+
+        existing = {c.name for c in self.client.get_collections().collections}
+
+        for base in self.COLLECTIONS:
+            current = self._existing_shards(existing, base)
+            if not current or current == set(range(self.shards)):
+                continue
+
+            if base not in existing:
+                self._create_collection(base, None)
+                existing.add(base)
+            for i in sorted(current):
+                count = self._move_points(
+                    f"{base}_{i}",
+                    lambda points: self.client.upsert(collection_name=base, points=points),
+                    batch_size
                 )
+                self.client.delete_collection(collection_name=f"{base}_{i}")
+                existing.discard(f"{base}_{i}")
+                logger.info("Unsharded %s points from %s_%s", count, base, i)
+
+        self._ensure_collections(existing)
+
+        moved = {}
+        for base in self.COLLECTIONS:
+            if base not in existing:
+                continue
+
+            count = self._move_points(
+                base,
+                lambda points: self._upsert_routed(base, points),
+                batch_size
+            )
+            self.client.delete_collection(collection_name=base)
+            moved[base] = count
+            logger.info("Resharded %s points from %s", count, base)
+
+        return moved
+
+    def _move_points(
+        self,
+        source: str,
+        write: Callable[[List[PointStruct]], None],
+        batch_size: int
+    ) -> int:
+        """
+        Copia tutti i punti di `source` (payload e vettori) con `write`.
+        """
+        count = 0
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=source,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True
             )
+            if points:
+                write([
+                    PointStruct(id=p.id, vector=p.vector, payload=p.payload)
+                    for p in points
+                ])
+                count += len(points)
+            if offset is None:
+                return count
 
-        if "progress_logs" not in existing:
+    def _create_collection(self, collection_name: str, hnsw_config) -> None:
+        try:
             self.client.create_collection(
-                collection_name="progress_logs",
+                collection_name=collection_name,
                 vectors_config=VectorParams(
                     size=self.vector_size,
                     distance=Distance.COSINE
-                )
+                ),
+                hnsw_config=hnsw_config
+            )
+        except Exception:
+            # su server condiviso un altro worker può averla appena creata
+            existing = {c.name for c in self.client.get_collections().collections}
+            if collection_name not in existing:
+                raise
+
+    def _ensure_payload_indexes(self, collection_name: str, fields: Dict) -> None:
+        """
+        Crea gli indici payload mancanti: i filtri su goal_id / type / source /
+        timestamp_ts non devono scansionare tutti i punti.
+        Qdrant embedded li ignora (e non li riporta nello schema): lì non
+        vengono creati, altrimenti ogni init ripeterebbe la chiamata.
+        """
+        if self.is_local:
+            return
+
+        info = self.client.get_collection(collection_name)
+        existing = set((info.payload_schema or {}).keys())
+
+        for field_name, schema in fields.items():
+            if field_name in existing:
+                continue
+            self.client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=schema
             )
 
+    # -------------------------
+    # ROUTING
+    # -------------------------
+
+    def _collection(self, base: str, goal_id: int) -> str:
+        """
+        Collection fisica che contiene i punti del goal.
+        """
+        if self.tenancy != "sharded":
+            return base
+        return f"{base}_{shard_for(goal_id, self.shards)}"
+
+    def _collections(self, base: str) -> List[str]:
+        if self.tenancy != "sharded":
+            return [base]
+        return [f"{base}_{i}" for i in range(self.shards)]
+
+    def _upsert_routed(self, base: str, points: List[PointStruct]) -> None:
+        """
+        Upsert raggruppato per collection fisica (un upsert per shard).
+        """
+        by_collection = defaultdict(list)
+        for point in points:
+            by_collection[self._collection(base, point.payload["goal_id"])].append(point)
+
+        for collection_name, group in by_collection.items():
+            self.client.upsert(
+                collection_name=collection_name,
+                points=group
+            )
+
+    # -------------------------
+    # EMBEDDING
+    # -------------------------
+
+    def _encode(self, text: str) -> List[float]:
+        return self._encode_batch([text])[0]
+
+    def _encode_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Encoda più testi con una sola chiamata batch al transformer.
+        I testi già in cache (o duplicati nel batch) non vengono ricalcolati.
+        """
+        keys = [
+            EmbeddingCache.make_key(self.embedding_model, t) for t in texts
+        ]
+
+        vectors = {}
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key in vectors or key in missing:
+                continue
+            cached = self.embedding_cache.get(key)
+            if cached is None:
+                missing[key] = text
+            else:
+                vectors[key] = cached
+
+        if missing:
+            with span("embedding.encode", "encode", texts=len(texts), misses=len(missing)):
+                encoded = self.encoder.encode(list(missing.values())).tolist()
+            fresh = dict(zip(missing.keys(), encoded))
+            self.embedding_cache.put_many(fresh)
+            vectors.update(fresh)
+
+        return [vectors[key] for key in keys]
+
     # -------------------------
     # MEMORY
     # -------------------------
@@ -65,28 +432,48 @@ class VectorStorage:
         memory_type: str,
         source: str
     ) -> None:
-        vector = self.encoder.encode(content).tolist()
+        self.write_memories([
+            {
+                "goal_id": goal_id,
+                "content": content,
+                "memory_type": memory_type,
+                "source": source,
+            }
+        ])
+
+    def write_memories(self, memories: List[Dict]) -> None:
+        """
+        Scrittura bulk di memorie: un solo encode batch e un solo upsert.
+
+        Args:
+            memories (List[Dict]): Elementi con chiavi goal_id, content,
+                memory_type, source (stessi argomenti di write_memory),
+                id opzionale (altrimenti generato) e timestamp/timestamp_ts
+                opzionali (altrimenti l'istante di scrittura).
+        """
+        if not memories:
+            return
+
+        vectors = self._encode_batch([m["content"] for m in memories])
         now = datetime.utcnow()
 
-        payload = {
-            "goal_id": goal_id,
-            "type": memory_type,
-            "source": source,
-            "content": content,
-            "timestamp": now.isoformat(),
-            "timestamp_ts": now.timestamp(),
-        }
+        points = [
+            PointStruct(
+                id=m.get("id") or str(uuid.uuid4()),
+                vector=vector,
+                payload={
+                    "goal_id": m["goal_id"],
+                    "type": m["memory_type"],
+                    "source": m["source"],
+                    "content": m["content"],
+                    "timestamp": m.get("timestamp") or now.isoformat(),
+                    "timestamp_ts": m.get("timestamp_ts") or now.timestamp(),
+                }
+            )
+            for m, vector in zip(memories, vectors)
+        ]
 
-        self.client.upsert(
-            collection_name="memories",
-            points=[
-                PointStruct(
-                    id=str(uuid.uuid4()),
-                    vector=vector,
-                    payload=payload
-                )
-            ]
-        )
+        self._upsert_routed("memories", points)
 
     def search_memories(
         self,
@@ -94,10 +481,10 @@ class VectorStorage:
         text: str,
         limit: int = 10
     ):
-        vector = self.encoder.encode(text).tolist()
+        vector = self._encode(text)
 
         results = self.client.search(
-            collection_name="memories",
+            collection_name=self._collection("memories", goal_id),
             query_vector=vector,
             limit=limit,
             query_filter=Filter(
@@ -118,12 +505,100 @@ class VectorStorage:
         days: int = 7,
         limit: int = 20
     ) -> List[Dict]:
-        cutoff_ts = (datetime.utcnow() - timedelta(days=days)).timestamp()
+        return list(islice(
+            self.iter_memories(goal_id, days=days, page_size=limit),
+            limit
+        ))
+
+    def iter_memories(
+        self,
+        goal_id: int,
+        days: Optional[int] = None,
+        page_size: int = 256
+    ) -> Iterator[Dict]:
+        """
+        Itera (a pagine di `page_size`) sulle memorie del goal degli ultimi
+        `days` giorni, o su tutta la storia se days è None.
+        Memoria costante: una sola pagina alla volta.
+        """
+        return self._iter_payloads("memories", goal_id, days, page_size)
+
+    def _iter_payloads(
+        self,
+        collection_name: str,
+        goal_id: int,
+        days: Optional[int],
+        page_size: int
+    ) -> Iterator[Dict]:
+        must = [
+            FieldCondition(
+                key="goal_id",
+                match=MatchValue(value=goal_id)
+            )
+        ]
+
+        if days is not None:
+            cutoff_ts = (datetime.utcnow() - timedelta(days=days)).timestamp()
+            must.append(
+                FieldCondition(
+                    key="timestamp_ts",
+                    range=Range(gte=cutoff_ts)
+                )
+            )
+
+        offset = None
+        while True:
+            results, offset = self.client.scroll(
+                collection_name=self._collection(collection_name, goal_id),
+                limit=page_size,
+                offset=offset,
+                with_payload=True,
+                scroll_filter=Filter(must=must)
+            )
+
+            for r in results:
+                yield r.payload
+
+            if offset is None:
+                return
 
+    # -------------------------
+    # COMPACTION / ARCHIVE
+    # -------------------------
+
+    def archive_old_memories(
+        self,
+        goal_id: int,
+        older_than_days: int = 30,
+        summarize: Optional[Callable[[List[Dict]], str]] = None,
+        batch_size: int = 50
+    ) -> Dict:
+        """
+        Compatta le memorie del goal più vecchie di `older_than_days`:
+        una memoria "compressed" per batch, originali spostati in
+        `memories_archive`. Riprende da checkpoint (vedi storage.compaction).
+        """
+        return MemoryCompactor(
+            self,
+            summarize=summarize,
+            batch_size=batch_size
+        ).run(goal_id, older_than_days=older_than_days)
+
+    def scroll_compactable_memories(
+        self,
+        goal_id: int,
+        before_ts: float,
+        limit: int
+    ):
+        """
+        Primo batch di memorie del goal anteriori a `before_ts`,
+        escluse quelle già compresse (con vettori, per l'archivio).
+        """
         results, _ = self.client.scroll(
-            collection_name="memories",
+            collection_name=self._collection("memories", goal_id),
             limit=limit,
             with_payload=True,
+            with_vectors=True,
             scroll_filter=Filter(
                 must=[
                     FieldCondition(
@@ -132,13 +607,49 @@ class VectorStorage:
                     ),
                     FieldCondition(
                         key="timestamp_ts",
-                        range=Range(gte=cutoff_ts)
+                        range=Range(lt=before_ts)
+                    )
+                ],
+                must_not=[
+                    FieldCondition(
+                        key="type",
+                        match=MatchValue(value="compressed")
                     )
                 ]
             )
         )
+        return results
 
-        return [r.payload for r in results]
+    def archive_memory_points(self, records) -> None:
+        archived_at = datetime.utcnow().isoformat()
+
+        self._upsert_routed("memories_archive", [
+            PointStruct(
+                id=r.id,
+                vector=r.vector,
+                payload={**r.payload, "archived_at": archived_at}
+            )
+            for r in records
+        ])
+
+    def delete_memories(self, ids: List, goal_id: Optional[int] = None) -> None:
+        """
+        Elimina le memorie indicate. Senza goal_id, in modalità "sharded"
+        la cancellazione viene inviata a tutti gli shard.
+        """
+        if not ids:
+            return
+
+        collections = (
+            self._collections("memories") if goal_id is None
+            else [self._collection("memories", goal_id)]
+        )
+
+        for collection_name in collections:
+            self.client.delete(
+                collection_name=collection_name,
+                points_selector=PointIdsList(points=list(ids))
+            )
 
     # -------------------------
     # PROGRESS LOGS
@@ -153,31 +664,73 @@ class VectorStorage:
         energy: int,
         note: Optional[str] = None
     ) -> None:
-        text = note or "progress log"
-        vector = self.encoder.encode(text).tolist()
+        self.write_progress_batch([
+            {
+                "goal_id": goal_id,
+                "task_id": task_id,
+                "done": done,
+                "difficulty": difficulty,
+                "energy": energy,
+                "note": note,
+            }
+        ])
+
+    def write_progress_batch(self, entries: List[Dict]) -> None:
+        """
+        Scrittura bulk di progress log (es. feedback di fine giornata
+        su più task): un solo encode batch e un solo upsert.
+
+        Args:
+            entries (List[Dict]): Elementi con chiavi goal_id, task_id, done,
+                difficulty, energy e note opzionale.
+        """
+        if not entries:
+            return
+
+        vectors = self._encode_batch(
+            [e.get("note") or "progress log" for e in entries]
+        )
         now = datetime.utcnow()
 
-        payload = {
-            "goal_id": goal_id,
-            "task_id": task_id,
-            "done": done,
-            "difficulty": difficulty,
-            "energy": energy,
-            "note": note,
-            "timestamp": now.isoformat(),
-            "timestamp_ts": now.timestamp(),
+        points = [
+            PointStruct(
+                id=str(uuid.uuid4()),
+                vector=vector,
+                payload={
+                    "goal_id": e["goal_id"],
+                    "task_id": e["task_id"],
+                    "done": e["done"],
+                    "difficulty": e["difficulty"],
+                    "energy": e["energy"],
+                    "note": e.get("note"),
+                    "timestamp": now.isoformat(),
+                    "timestamp_ts": now.timestamp(),
+                }
+            )
+            for e, vector in zip(entries, vectors)
+        ]
+
+        payloads = [p.payload for p in points]
+        pending = {
+            p["goal_id"] for p in payloads
+            if p["goal_id"] is not None and not self._is_backfilled(p["goal_id"])
         }
 
-        self.client.upsert(
-            collection_name="progress_logs",
-            points=[
-                PointStruct(
-                    id=str(uuid.uuid4()),
-                    vector=vector,
-                    payload=payload
-                )
-            ]
-        )
+        if not pending:
+            self._upsert_routed("progress_logs", points)
+            increment_progress_aggregates(payloads)
+            return
+
+        # goal senza aggregati ricostruiti: upsert e ricostruzione sotto lo stesso
+        # lock, così nessun log viene contato due volte (scansione + incremento)
+        with progress_aggregates_transaction() as conn:
+            self._upsert_routed("progress_logs", points)
+            rebuilt = {g for g in pending if self._rebuild_locked(g, conn)}
+            increment_progress_aggregates(
+                [p for p in payloads if p["goal_id"] not in rebuilt],
+                conn=conn
+            )
+        self._backfilled.update(pending)
 
     def retrieve_recent_progress(
         self,
@@ -185,27 +738,22 @@ class VectorStorage:
         days: int = 7,
         limit: int = 50
     ) -> List[Dict]:
-        cutoff_ts = (datetime.utcnow() - timedelta(days=days)).timestamp()
-
-        results, _ = self.client.scroll(
-            collection_name="progress_logs",
-            limit=limit,
-            with_payload=True,
-            scroll_filter=Filter(
-                must=[
-                    FieldCondition(
-                        key="goal_id",
-                        match=MatchValue(value=goal_id)
-                    ),
-                    FieldCondition(
-                        key="timestamp_ts",
-                        range=Range(gte=cutoff_ts)
-                    )
-                ]
-            )
-        )
+        return list(islice(
+            self.iter_progress(goal_id, days=days, page_size=limit),
+            limit
+        ))
 
-        return [r.payload for r in results]
+    def iter_progress(
+        self,
+        goal_id: int,
+        days: Optional[int] = None,
+        page_size: int = 256
+    ) -> Iterator[Dict]:
+        """
+        Itera (a pagine di `page_size`) sui progress log del goal degli ultimi
+        `days` giorni, o su tutta la storia se days è None.
+        """
+        return self._iter_payloads("progress_logs", goal_id, days, page_size)
 
     # -------------------------
     # METRICS
@@ -214,27 +762,98 @@ class VectorStorage:
     def compute_basic_metrics(
         self,
         goal_id: int,
-        days: int = 7
+        days: int = 7,
+        from_aggregates: bool = True
     ) -> Dict:
-        logs = self.retrieve_recent_progress(goal_id, days=days)
+        """
+        Metriche del goal sulla finestra di `days` giorni.
 
-        if not logs:
-            return {}
+        Con from_aggregates è una lettura O(bucket) dei contatori giornalieri
+        su SQLite (finestra = ultimi `days` giorni di calendario UTC);
+        altrimenti somma in streaming i progress log da Qdrant.
+        Alla prima lettura di un goal i bucket vengono ricostruiti dai log
+        già presenti (scritti prima dell'introduzione degli aggregati).
+        """
+        if from_aggregates:
+            self.ensure_progress_aggregates(goal_id)
+            buckets = get_progress_buckets(goal_id, days)
+            total = sum(b["log_count"] for b in buckets)
+            completed = sum(b["done_count"] for b in buckets)
+            difficulty = sum(b["difficulty_sum"] for b in buckets)
+            energy = sum(b["energy_sum"] for b in buckets)
+        else:
+            total = 0
+            completed = 0
+            difficulty = 0
+            energy = 0
 
-        total = len(logs)
-        completed = sum(1 for l in logs if l["done"])
+            # somme in streaming: nessun troncamento a 50 log, memoria costante
+            for log in self.iter_progress(goal_id, days=days):
+                total += 1
+                completed += 1 if log["done"] else 0
+                difficulty += log["difficulty"]
+                energy += log["energy"]
+
+        if not total:
+            return {}
 
         return {
             "completion_rate": completed / total,
-            "avg_difficulty": round(
-                sum(l["difficulty"] for l in logs) / total, 2
-            ),
-            "avg_energy": round(
-                sum(l["energy"] for l in logs) / total, 2
-            ),
+            "avg_difficulty": round(difficulty / total, 2),
+            "avg_energy": round(energy / total, 2),
             "total_logs": total
         }
 
+    def ensure_progress_aggregates(self, goal_id: int) -> None:
+        """
+        Backfill una tantum dei bucket del goal, registrato su SQLite
+        (progress_aggregate_backfills): i riavvii non lo ripetono.
+        """
+        if not self._is_backfilled(goal_id):
+            self.rebuild_progress_aggregates(goal_id)
+
+    def rebuild_progress_aggregates(self, goal_id: int) -> None:
+        """
+        Ricostruisce i contatori giornalieri del goal dai progress log
+        (backfill dei dati scritti prima dell'introduzione degli aggregati).
+        Esclusiva: reset, scansione e checkpoint in un'unica transazione;
+        nessun effetto se un altro processo l'ha già completata.
+        """
+        with progress_aggregates_transaction() as conn:
+            self._rebuild_locked(goal_id, conn)
+        self._backfilled.add(goal_id)
+
+    def _rebuild_locked(self, goal_id: int, conn) -> bool:
+        """
+        Ricostruzione dentro `progress_aggregates_transaction`.
+        Restituisce False se il goal risultava già ricostruito.
+        """
+        if is_progress_backfilled(goal_id, conn=conn):
+            return False
+
+        reset_progress_aggregates(goal_id, conn=conn)
+
+        batch = []
+        for log in self.iter_progress(goal_id):
+            batch.append(log)
+            if len(batch) >= 1000:
+                increment_progress_aggregates(batch, conn=conn)
+                batch = []
+
+        increment_progress_aggregates(batch, conn=conn)
+        mark_progress_backfilled(goal_id, conn=conn)
+        return True
+
+    def _is_backfilled(self, goal_id: int) -> bool:
+        if goal_id in self._backfilled:
+            return True
+
+        if is_progress_backfilled(goal_id):
+            self._backfilled.add(goal_id)
+            return True
+
+        return False
+
     # -------------------------
     # CLEANUP
     # -------------------------
@@ -242,3 +861,4 @@ class VectorStorage:
     def close(self):
         if hasattr(self.client, "close"):
             self.client.close()
+        self.embedding_cache.close()
@@ -0,0 +1,102 @@
+"""
+Costruzione del client Qdrant: locale (embedded) o server remoto.
+
+La modalità locale (`path`) prende un lock sul file: un solo processo
+alla volta. Il client embedded non è thread-safe (upsert e search
+concorrenti corrompono gli array interni), quindi le sue chiamate vengono
+serializzate da un lock. Con `url` il client si collega a un server Qdrant (gRPC con
+`prefer_grpc`), condivisibile da più worker uvicorn. Con `pool_size` > 1
+le chiamate vengono distribuite a rotazione su più client, ognuno con il
+proprio canale, per non serializzare le richieste concorrenti su una
+sola connessione.
+"""
+
+import functools
+import itertools
+import math
+import threading
+from typing import Callable, List, Optional
+
+from qdrant_client import QdrantClient
+
+
+class QdrantClientPool:
+    """
+    Pool round-robin di QdrantClient con la stessa interfaccia del client.
+    """
+
+    def __init__(self, factory: Callable[[], QdrantClient], size: int):
+        if size < 1:
+            raise ValueError("Qdrant pool size must be >= 1")
+
+        self.clients: List[QdrantClient] = [factory() for _ in range(size)]
+        self._cycle = itertools.cycle(self.clients)
+        self._lock = threading.Lock()
+
+    def _next(self) -> QdrantClient:
+        with self._lock:
+            return next(self._cycle)
+
+    def __getattr__(self, name):
+        # ogni accesso a un metodo usa il client successivo
+        return getattr(self._next(), name)
+
+    def close(self) -> None:
+        for client in self.clients:
+            client.close()
+
+
+class SerializedClient:
+    """
+    Proxy che esegue una chiamata alla volta sul client avvolto
+    (Qdrant embedded condiviso tra thread: DAG, fan-out, to_thread).
+    """
+
+    def __init__(self, client: QdrantClient):
+        self._client = client
+        self._lock = threading.RLock()
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def call(*args, **kwargs):
+            with self._lock:
+                return attr(*args, **kwargs)
+
+        return call
+
+
+def build_qdrant_client(
+    path: Optional[str] = None,
+    url: Optional[str] = None,
+    api_key: Optional[str] = None,
+    prefer_grpc: bool = True,
+    grpc_port: int = 6334,
+    timeout: Optional[float] = None,
+    pool_size: int = 1
+):
+    """
+    Client Qdrant remoto se `url` è indicato, altrimenti embedded su `path`.
+    """
+    if not url:
+        return SerializedClient(QdrantClient(path=path))
+
+    # il client accetta solo secondi interi: arrotonda per eccesso (0.5 → 1, non 0)
+    timeout_s = max(1, math.ceil(timeout)) if timeout else None
+
+    def factory() -> QdrantClient:
+        return QdrantClient(
+            url=url,
+            api_key=api_key,
+            prefer_grpc=prefer_grpc,
+            grpc_port=grpc_port,
+            timeout=timeout_s
+        )
+
+    if pool_size <= 1:
+        return factory()
+
+    return QdrantClientPool(factory, size=pool_size)
@@ -0,0 +1,54 @@
+"""
+Migrazione una tantum verso la tenancy "sharded".
+
+Sposta i punti delle collection non shardate (memories, memories_archive,
+progress_logs) negli shard del loro goal e cancella le originali. Va
+eseguita con il server fermo, prima di avviarlo con QDRANT_TENANCY=sharded:
+
+    QDRANT_SHARDS=8 python -m storage.reshard
+
+Serve anche quando cambia QDRANT_SHARDS: i punti vengono ridistribuiti
+sul nuovo numero di shard (init rifiuta di partire finché non è fatto).
+
+Usa la stessa configurazione Qdrant del bootstrap (path o QDRANT_URL).
+"""
+
+import argparse
+
+from app.config import Config
+from storage.encoders import HashEncoder
+from storage.qdrant import VectorStorage
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrazione delle collection Qdrant agli shard")
+    parser.add_argument("--shards", type=int, default=Config.QDRANT_SHARDS)
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    vector_storage = VectorStorage(
+        path=Config.QDRANT_PATH,
+        tenancy="sharded",
+        shards=args.shards,
+        # i vettori vengono copiati: nessun encoding, niente modello da caricare
+        encoder=HashEncoder(384),
+        url=Config.QDRANT_URL,
+        api_key=Config.QDRANT_API_KEY,
+        prefer_grpc=Config.QDRANT_PREFER_GRPC,
+        grpc_port=Config.QDRANT_GRPC_PORT,
+        timeout=Config.QDRANT_TIMEOUT_S
+    )
+
+    try:
+        moved = vector_storage.reshard(batch_size=args.batch_size)
+    finally:
+        vector_storage.close()
+
+    for collection_name, count in moved.items():
+        print(f"{collection_name}: {count} points moved to {args.shards} shards")
+    if not moved:
+        print("Nothing to reshard")
+
+
+if __name__ == "__main__":
+    main()
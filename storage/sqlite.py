@@ -1,20 +1,212 @@
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Set
+
 from app.config import Config
+from app.tracing import span
 from datetime import datetime
 
 
+def _statement(sql: str, max_len: int = 120) -> str:
+    return " ".join(sql.split())[:max_len]
+
+
+class TracedConnection(sqlite3.Connection):
+    """
+    Connessione che apre uno span (stadio "sqlite") per ogni statement e commit.
+    """
+
+    def execute(self, sql, parameters=()):
+        with span("sqlite.execute", "sqlite", sql=_statement(sql)):
+            return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        with span("sqlite.executemany", "sqlite", sql=_statement(sql)):
+            return super().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        with span("sqlite.commit", "sqlite"):
+            return super().commit()
+
+
+class ConnectionPool:
+    """
+    Pool thread-safe di connessioni SQLite verso un singolo file.
+
+    Le connessioni vengono create al primo bisogno (fino a `size`),
+    configurate una volta sola (WAL, synchronous=NORMAL, busy timeout,
+    foreign keys) e riusate: restano così in cache anche gli statement
+    preparati di ciascuna connessione. Se tutte le connessioni restano
+    occupate oltre il busy timeout, `acquire` solleva OperationalError.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        size: int = 8,
+        busy_timeout_ms: int = 5000,
+        cached_statements: int = 256
+    ):
+        self.db_path = db_path
+        self.size = size
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cached_statements = cached_statements
+
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        # connessioni prese in prestito; quelle ritirate da close() si chiudono al rilascio
+        self._in_use: Set[sqlite3.Connection] = set()
+        self._retired: Set[sqlite3.Connection] = set()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+            factory=TracedConnection
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode = WAL;")
+        conn.execute("PRAGMA synchronous = NORMAL;")
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)};")
+        conn.execute("PRAGMA foreign_keys = ON;")
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        conn = self._take()
+        with self._lock:
+            self._in_use.add(conn)
+        return conn
+
+    def _take(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+
+        if create:
+            try:
+                return self._open()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=self.busy_timeout_ms / 1000)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"connection pool exhausted: {self.size} connections in use "
+                f"for more than {self.busy_timeout_ms} ms"
+            ) from None
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            self._in_use.discard(conn)
+            retired = conn in self._retired
+            self._retired.discard(conn)
+
+        if retired:
+            conn.close()
+        else:
+            self._idle.put(conn)
+
+    def close(self) -> None:
+        """
+        Chiude le connessioni libere; quelle in uso vengono chiuse al rilascio.
+        """
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+        with self._lock:
+            self._retired.update(self._in_use)
+            self._created -= len(self._in_use)
+            self._in_use.clear()
+
+
 class SQLiteDB:
-    def __init__(self, db_path: str = None):
-        self.db_path = db_path or Config.DB_PATH
+    # un pool per file di database, condiviso da tutte le istanze del processo
+    _pools: Dict[str, ConnectionPool] = {}
+    _pools_lock = threading.Lock()
+
+    def __init__(self, db_path: Optional[str] = None):
+        self._db_path = db_path
+
+    @property
+    def db_path(self) -> str:
+        # senza path esplicito Config.DB_PATH viene letto a ogni uso:
+        # le istanze create all'import (es. in crud) seguono la configurazione corrente
+        return self._db_path or Config.DB_PATH
+
+    @property
+    def pool(self) -> ConnectionPool:
+        pool = SQLiteDB._pools.get(self.db_path)
+        if pool is not None:
+            return pool
+
+        with SQLiteDB._pools_lock:
+            if self.db_path not in SQLiteDB._pools:
+                SQLiteDB._pools[self.db_path] = ConnectionPool(
+                    self.db_path,
+                    size=Config.DB_POOL_SIZE,
+                    busy_timeout_ms=Config.DB_BUSY_TIMEOUT_MS,
+                    cached_statements=Config.DB_STATEMENT_CACHE
+                )
+            return SQLiteDB._pools[self.db_path]
 
     def connect(self):
-        conn = sqlite3.connect(self.db_path)
+        """
+        Apre una connessione dedicata (non del pool); va chiusa dal chiamante.
+        """
+        conn = sqlite3.connect(self.db_path, factory=TracedConnection)
         conn.row_factory = sqlite3.Row
         conn.execute("PRAGMA foreign_keys = ON;")
         return conn
 
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Connessione presa dal pool: commit all'uscita, rollback in caso
+        di eccezione, poi restituita al pool.
+        """
+        conn = self.pool.acquire()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.pool.release(conn)
+
+    def explain_query_plan(self, sql: str, params: Sequence = ()) -> List[str]:
+        """
+        Restituisce il dettaglio di EXPLAIN QUERY PLAN per una query
+        (es. "SEARCH tasks USING INDEX idx_tasks_goal_status_id (goal_id=? AND status=?)").
+        """
+        with self.connection() as conn:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        return [row["detail"] for row in rows]
+
     def run_migrations(self):
-        with self.connect() as conn:
+        with self.connection() as conn:
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS schema_migrations (
                     version INTEGER PRIMARY KEY,
@@ -30,6 +222,14 @@ class SQLiteDB:
             migrations = [
                 (1, self._migration_001_init),
                 (2, self._migration_002_progress_logs),
+                (3, self._migration_003_indexes),
+                (4, self._migration_004_memory_compaction),
+                (5, self._migration_005_progress_aggregates),
+                (6, self._migration_006_goals_status_index),
+                (7, self._migration_007_daily_messages),
+                (8, self._migration_008_progress_backfills),
+                (9, self._migration_009_daily_message_versions),
+                (10, self._migration_010_plan_previews),
             ]
 
             for version, fn in migrations:
@@ -88,3 +288,88 @@ class SQLiteDB:
         )
         """)
 
+    def _migration_003_indexes(self, conn):
+        conn.executescript("""
+        CREATE INDEX IF NOT EXISTS idx_tasks_goal_status_id
+            ON tasks (goal_id, status, id);
+
+        CREATE INDEX IF NOT EXISTS idx_task_events_task_timestamp
+            ON task_events (task_id, timestamp);
+
+        CREATE INDEX IF NOT EXISTS idx_progress_logs_task_created
+            ON progress_logs (task_id, created_at);
+        """)
+
+    def _migration_004_memory_compaction(self, conn):
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS memory_compaction_checkpoints (
+            goal_id INTEGER PRIMARY KEY,
+            cutoff_ts REAL NOT NULL,
+            batches_done INTEGER NOT NULL DEFAULT 0,
+            archived INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL CHECK (
+                status IN ('running', 'completed')
+            ),
+            updated_at TEXT NOT NULL
+        )
+        """)
+
+    def _migration_005_progress_aggregates(self, conn):
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS progress_daily_aggregates (
+            goal_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            log_count INTEGER NOT NULL DEFAULT 0,
+            done_count INTEGER NOT NULL DEFAULT 0,
+            difficulty_sum INTEGER NOT NULL DEFAULT 0,
+            energy_sum INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (goal_id, day)
+        ) WITHOUT ROWID
+        """)
+
+    def _migration_006_goals_status_index(self, conn):
+        conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_goals_status_id
+            ON goals (status, id)
+        """)
+
+    def _migration_007_daily_messages(self, conn):
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS daily_messages (
+            goal_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            PRIMARY KEY (goal_id, day)
+        ) WITHOUT ROWID
+        """)
+
+    def _migration_008_progress_backfills(self, conn):
+        # goal i cui aggregati giornalieri sono stati ricostruiti da Qdrant
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS progress_aggregate_backfills (
+            goal_id INTEGER PRIMARY KEY,
+            completed_at TEXT NOT NULL
+        )
+        """)
+
+    def _migration_009_daily_message_versions(self, conn):
+        # contatore delle invalidazioni: un messaggio generato durante
+        # un'invalidazione non viene salvato
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS daily_message_versions (
+            goal_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+        """)
+
+    def _migration_010_plan_previews(self, conn):
+        # anteprime dei piani condivise tra i worker (SQLitePlanPreviewStore)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS plan_previews (
+            preview_id TEXT PRIMARY KEY,
+            goal_text TEXT NOT NULL,
+            plan TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )
+        """)
@@ -0,0 +1,149 @@
+"""
+Piccolo esecutore DAG per i passi degli agenti.
+
+I passi indipendenti girano in parallelo su un pool di thread; un passo parte
+appena tutte le sue dipendenze sono concluse con successo. Ogni passo ha
+timing (e uno span "step"), timeout opzionale e isolamento degli errori:
+un fallimento rende "skipped" solo i passi che ne dipendono.
+"""
+
+import contextvars
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Step:
+    """
+    Passo del DAG: `fn` riceve il dizionario {dipendenza: valore}.
+    """
+    name: str
+    fn: Callable[[Dict[str, Any]], Any]
+    deps: Tuple[str, ...] = ()
+    timeout: Optional[float] = None
+
+
+@dataclass
+class StepResult:
+    name: str
+    status: str  # ok | failed | timeout | skipped
+    value: Any = None
+    error: Optional[str] = None
+    duration_s: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "ok"
+
+
+def _check_acyclic(steps: List[Step]) -> None:
+    names = {s.name for s in steps}
+    for s in steps:
+        missing = set(s.deps) - names
+        if missing:
+            raise ValueError(f"Step {s.name} depends on unknown steps: {missing}")
+
+    resolved = set()
+    remaining = list(steps)
+    while remaining:
+        ready = [s for s in remaining if set(s.deps) <= resolved]
+        if not ready:
+            raise ValueError("DAG contains a cycle")
+        resolved.update(s.name for s in ready)
+        remaining = [s for s in remaining if s.name not in resolved]
+
+
+def _run_step(step: Step, values: Dict[str, Any]) -> Any:
+    with span(f"step.{step.name}", "step"):
+        return step.fn(values)
+
+
+def run_dag(steps: List[Step], max_workers: Optional[int] = None) -> Dict[str, StepResult]:
+    """
+    Esegue i passi rispettando le dipendenze.
+
+    Returns:
+        Dict[str, StepResult]: esito di ogni passo, indicizzato per nome.
+    """
+    _check_acyclic(steps)
+
+    pending = {s.name: s for s in steps}
+    running: Dict[Any, Tuple[Step, float]] = {}
+    results: Dict[str, StepResult] = {}
+
+    pool = ThreadPoolExecutor(
+        max_workers=max_workers or len(steps),
+        thread_name_prefix="dag-step"
+    )
+
+    try:
+        while pending or running:
+            for name, step in list(pending.items()):
+                deps = [results.get(d) for d in step.deps]
+
+                if any(r is not None and not r.ok for r in deps):
+                    failed = [r.name for r in deps if r is not None and not r.ok]
+                    results[name] = StepResult(
+                        name, "skipped", error=f"dependency not ok: {failed}"
+                    )
+                    del pending[name]
+
+                elif all(r is not None for r in deps):
+                    values = {d: results[d].value for d in step.deps}
+                    # ogni passo eredita il contesto del chiamante (contextvars)
+                    ctx = contextvars.copy_context()
+                    future = pool.submit(ctx.run, _run_step, step, values)
+                    running[future] = (step, time.monotonic())
+                    del pending[name]
+
+            if not running:
+                continue
+
+            now = time.monotonic()
+            waits = [
+                t0 + step.timeout - now
+                for step, t0 in running.values()
+                if step.timeout is not None
+            ]
+            timeout = max(min(waits), 0) if waits else None
+
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            now = time.monotonic()
+            for future in done:
+                step, t0 = running.pop(future)
+                error = future.exception()
+                if error is None:
+                    results[step.name] = StepResult(
+                        step.name, "ok", value=future.result(), duration_s=now - t0
+                    )
+                else:
+                    logger.warning("Step %s failed: %r", step.name, error)
+                    results[step.name] = StepResult(
+                        step.name, "failed", error=repr(error), duration_s=now - t0
+                    )
+
+            for future, (step, t0) in list(running.items()):
+                if step.timeout is not None and now - t0 >= step.timeout:
+                    running.pop(future)
+                    logger.warning("Step %s timed out after %ss", step.name, step.timeout)
+                    results[step.name] = StepResult(
+                        step.name, "timeout",
+                        error=f"timeout after {step.timeout}s",
+                        duration_s=now - t0
+                    )
+    finally:
+        # i passi in timeout terminano in background
+        pool.shutdown(wait=False)
+
+    for r in results.values():
+        logger.debug("Step %s: %s in %.3fs", r.name, r.status, r.duration_s)
+
+    return results
@@ -1,7 +1,13 @@
+import asyncio
 import logging
+
+from app.config import Config
+from agents.llm.usage import goal_scope
+from app.tracing import span
 from supervisor.events import EventType
 from supervisor.state import AppState
 from supervisor.rules import should_replan
+from supervisor.dag import Step, run_dag
 
 
 class Supervisor:
@@ -35,14 +41,55 @@ class Supervisor:
 
         state.step_count += 1
 
-        if state.event == EventType.NEW_GOAL:
-            return self._handle_new_goal(state)
+        # token LLM attribuiti al goal (vedi agents.llm.usage)
+        with span(f"supervisor.{state.event.value}", "supervisor", goal_id=state.goal_id), \
+                goal_scope(state.goal_id):
+            if state.event == EventType.NEW_GOAL:
+                return self._handle_new_goal(state)
+
+            if state.event == EventType.DAILY:
+                return self._handle_daily(state)
+
+            if state.event == EventType.WEEKLY:
+                return self._handle_weekly(state)
+
+    async def ahandle(self, state: AppState):
+        """
+        Versione async di `handle` per gli endpoint async:
+        NEW_GOAL e DAILY usano le varianti async degli agenti,
+        WEEKLY gira in un thread.
+        """
+        if state.step_count >= state.max_steps:
+            state.decisions.append("ABORT_MAX_STEPS")
+            return None
 
-        if state.event == EventType.DAILY:
-            return self._handle_daily(state)
+        state.step_count += 1
 
-        if state.event == EventType.WEEKLY:
-            return self._handle_weekly(state)
+        # token LLM attribuiti al goal (vedi agents.llm.usage)
+        with span(f"supervisor.{state.event.value}", "supervisor", goal_id=state.goal_id), \
+                goal_scope(state.goal_id):
+            if state.event == EventType.NEW_GOAL:
+                goal_id = await self.planner.aexecute(state.meta["goal_text"])
+                state.decisions.append("GOAL_CREATED")
+
+                return await self.ahandle(
+                    AppState(
+                        event=EventType.DAILY,
+                        goal_id=goal_id,
+                        decisions=state.decisions
+                    )
+                )
+
+            if state.event == EventType.DAILY:
+                result = await self.coach.adaily_message(
+                    state.goal_id,
+                    refresh=state.meta.get("refresh", False)
+                )
+                state.decisions.append("DAILY_RUN")
+                return result
+
+            if state.event == EventType.WEEKLY:
+                return await asyncio.to_thread(self._handle_weekly, state)
 
     # -------------------------
 
@@ -59,32 +106,76 @@ class Supervisor:
         )
 
     def _handle_daily(self, state):
-        result = self.coach.daily_message(state.goal_id)
+        result = self.coach.daily_message(
+            state.goal_id,
+            refresh=state.meta.get("refresh", False)
+        )
         state.decisions.append("DAILY_RUN")
         return result
 
     def _handle_weekly(self, state):
+        goal_id = state.goal_id
+        timeout = Config.SUPERVISOR_STEP_TIMEOUT_S
+
+        # reflection e compaction sono indipendenti da critic;
+        # solo advisor dipende dal critic
+        results = run_dag([
+            Step(
+                "reflection",
+                lambda _: self.memory.weekly_reflection(goal_id),
+                timeout=timeout
+            ),
+            Step(
+                "compaction",
+                lambda _: self.memory.compact_memories(
+                    goal_id,
+                    older_than_days=Config.MEMORY_COMPACTION_DAYS,
+                    batch_size=Config.MEMORY_COMPACTION_BATCH
+                ),
+                timeout=timeout
+            ),
+            Step(
+                "critic",
+                lambda _: self.critic.analyze_week(goal_id),
+                timeout=timeout
+            ),
+            Step(
+                "advisor",
+                lambda deps: self.advisor.advise(deps["critic"]),
+                deps=("critic",),
+                timeout=timeout
+            ),
+        ])
+
+        for r in results.values():
+            if not r.ok:
+                state.decisions.append(f"STEP_{r.status.upper()}: {r.name}")
+
+        if results["compaction"].ok:
+            state.decisions.append(
+                f"MEMORY_COMPACTED: archived={results['compaction'].value['archived']}"
+            )
 
-        # 1 memory
-        self.memory.weekly_reflection(state.goal_id)
-
-        # 2 critic (LLM)
-        critic_output = self.critic.analyze_week(state.goal_id)
-
-        # 3 advisor (LLM consultivo)
-        advice = self.advisor.advise(critic_output)
+        critic_output = results["critic"].value
+        advice = results["advisor"].value
 
-        state.decisions.append(
-            f"ADVISOR: suggest={advice['suggest_replan']} "
-            f"conf={advice['confidence']}"
-        )
+        if advice is not None:
+            state.decisions.append(
+                f"ADVISOR: suggest={advice['suggest_replan']} "
+                f"conf={advice['confidence']}"
+            )
 
         # 4 regole dure + advisory
         hard_rule = should_replan(critic_output)
 
-        if hard_rule and advice["suggest_replan"] and advice["confidence"] > 0.6:
+        if (
+            hard_rule
+            and advice is not None
+            and advice["suggest_replan"]
+            and advice["confidence"] > 0.6
+        ):
             self.planner.execute_with_feedback(
-                goal_id=state.goal_id,
+                goal_id=goal_id,
                 critic_feedback=critic_output
             )
             state.decisions.append("REPLAN_EXECUTED")
@@ -94,5 +185,8 @@ class Supervisor:
         return {
             "critic": critic_output,
             "advisor": advice,
-            "decisions": state.decisions
-        }
\ No newline at end of file
+            "decisions": state.decisions,
+            "timings": {
+                name: round(r.duration_s, 3) for name, r in results.items()
+            }
+        }
@@ -3,8 +3,29 @@ Test funzionali CRUD per la gestione di goal e task su SQLite.
 Verifica la creazione, lettura e aggiornamento di goal e task tramite le funzioni di storage.
 """
 
-from storage.sqlite import SQLiteDB
-from storage.crud import create_goal, get_goal, create_task, update_task_status
+from storage.sqlite import ConnectionPool, SQLiteDB
+import os
+import sqlite3
+import tempfile
+import time
+
+from app.config import Config
+from storage import crud
+
+from storage.crud import (
+    create_goal,
+    get_goal,
+    create_task,
+    update_task_status,
+    increment_progress_aggregates,
+    get_progress_buckets,
+    is_progress_backfilled,
+    mark_progress_backfilled,
+    get_daily_message,
+    get_daily_message_version,
+    purge_daily_messages,
+    save_daily_message,
+)
 
 def run_tests():
     """
@@ -25,6 +46,87 @@ def run_tests():
     task_id = create_task(goal_id, "Studiare variabili")
     update_task_status(task_id, "done")
 
+    now = time.time()
+    increment_progress_aggregates([
+        {"goal_id": goal_id, "done": True, "difficulty": 3, "energy": 4, "timestamp_ts": now},
+        {"goal_id": goal_id, "done": False, "difficulty": 5, "energy": 1, "timestamp_ts": now},
+        {"goal_id": goal_id, "done": True, "difficulty": 2, "energy": 2, "timestamp_ts": now - 30 * 86400},
+    ])
+    buckets = get_progress_buckets(goal_id, days=7)
+    assert len(buckets) == 1
+    assert buckets[0]["log_count"] == 2
+    assert buckets[0]["done_count"] == 1
+    assert buckets[0]["difficulty_sum"] == 8
+    assert len(get_progress_buckets(goal_id, days=60)) == 2
+
+    # checkpoint del backfill degli aggregati
+    assert not is_progress_backfilled(goal_id)
+    mark_progress_backfilled(goal_id)
+    assert is_progress_backfilled(goal_id)
+
+    # cache del messaggio giornaliero: invalidata dal cambio stato dei task
+    task_id = create_task(goal_id, "Scrivere un test")
+    payload = {"goal_id": goal_id, "message": "Forza!", "tasks": []}
+    save_daily_message(goal_id, "2026-01-01", payload)
+    assert get_daily_message(goal_id, "2026-01-01") == payload
+
+    update_task_status(task_id, "done")
+    assert get_daily_message(goal_id, "2026-01-01") is None
+
+    # messaggio generato durante un'invalidazione: non viene salvato
+    version = get_daily_message_version(goal_id)
+    update_task_status(task_id, "pending")
+    assert not save_daily_message(goal_id, "2026-01-01", payload, version=version)
+    assert get_daily_message(goal_id, "2026-01-01") is None
+    assert save_daily_message(
+        goal_id, "2026-01-01", payload, version=get_daily_message_version(goal_id)
+    )
+
+    # il salvataggio di oggi rimuove i giorni precedenti del goal
+    save_daily_message(goal_id, "2026-01-02", payload)
+    assert get_daily_message(goal_id, "2026-01-01") is None
+
+    # pulizia globale (job DAILY)
+    assert purge_daily_messages("2026-01-03") >= 1
+    assert get_daily_message(goal_id, "2026-01-02") is None
+
+    # -------------------------
+    # POOL DI CONNESSIONI
+    # -------------------------
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(os.path.join(tmp, "pool.db"), size=1, busy_timeout_ms=50)
+        conn = pool.acquire()
+
+        # pool esaurito: errore SQLite esplicito, non queue.Empty
+        try:
+            pool.acquire()
+            assert False, "expected OperationalError"
+        except sqlite3.OperationalError as e:
+            assert "pool exhausted" in str(e)
+
+        # close chiude anche le connessioni in uso, al loro rilascio
+        pool.close()
+        pool.release(conn)
+        try:
+            conn.execute("SELECT 1")
+            assert False, "expected ProgrammingError"
+        except sqlite3.ProgrammingError:
+            pass
+        pool.close()
+
+        # il path del database è risolto a ogni uso, non all'import di crud
+        original = Config.DB_PATH
+        Config.DB_PATH = os.path.join(tmp, "other.db")
+        try:
+            assert crud.db.db_path == Config.DB_PATH
+            SQLiteDB().run_migrations()
+            other_goal = create_goal("Altro database")
+            assert get_goal(other_goal)["description"] == "Altro database"
+            SQLiteDB().pool.close()
+        finally:
+            Config.DB_PATH = original
+        assert get_goal(goal_id)["description"] == "Imparare Python"
+
     print("✅ SQLite CRUD tests passed")
 
 if __name__ == "__main__":
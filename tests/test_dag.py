@@ -0,0 +1,69 @@
+"""
+Test funzionale per l'esecutore DAG del Supervisor.
+Verifica parallelismo dei passi indipendenti, passaggio dei risultati,
+isolamento degli errori e timeout.
+"""
+
+import time
+
+from supervisor.dag import Step, run_dag
+
+
+def run_tests():
+    # -------------------------
+    # PARALLELISMO + DIPENDENZE
+    # -------------------------
+    def slow(value):
+        def fn(_):
+            time.sleep(0.3)
+            return value
+        return fn
+
+    start = time.monotonic()
+    results = run_dag([
+        Step("reflection", slow("r")),
+        Step("critic", slow({"replan_needed": False})),
+        Step("advisor", lambda deps: {"seen": deps["critic"]}, deps=("critic",)),
+    ])
+    elapsed = time.monotonic() - start
+
+    assert all(r.ok for r in results.values())
+    assert results["advisor"].value == {"seen": {"replan_needed": False}}
+    # reflection e critic in parallelo: ~0.3s, non ~0.6s
+    assert elapsed < 0.55, elapsed
+
+    # -------------------------
+    # ERRORI E TIMEOUT
+    # -------------------------
+    def boom(_):
+        raise RuntimeError("critic down")
+
+    results = run_dag([
+        Step("reflection", lambda _: "ok"),
+        Step("critic", boom),
+        Step("advisor", lambda deps: deps["critic"], deps=("critic",)),
+        Step("stuck", slow("late"), timeout=0.05),
+    ])
+
+    assert results["reflection"].ok
+    assert results["critic"].status == "failed"
+    assert results["advisor"].status == "skipped"
+    assert results["stuck"].status == "timeout"
+
+    # -------------------------
+    # CICLI
+    # -------------------------
+    try:
+        run_dag([
+            Step("a", lambda _: 1, deps=("b",)),
+            Step("b", lambda _: 2, deps=("a",)),
+        ])
+        assert False, "cycle not detected"
+    except ValueError:
+        pass
+
+    print("✅ dag tests passed")
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,59 @@
+"""
+Test funzionali per la cache degli embedding.
+Verifica LRU, contatori hit/miss e persistenza del tier su disco.
+"""
+
+import os
+import tempfile
+
+from storage.embedding_cache import EmbeddingCache
+
+
+def run_tests():
+    model = "all-MiniLM-L6-v2"
+
+    # -------------------------
+    # LRU IN MEMORIA
+    # -------------------------
+    cache = EmbeddingCache(max_size=2)
+
+    k1 = EmbeddingCache.make_key(model, "progress log")
+    k2 = EmbeddingCache.make_key(model, "relevant coaching context")
+    k3 = EmbeddingCache.make_key(model, "last week progress")
+
+    assert k1 != EmbeddingCache.make_key("other-model", "progress log")
+
+    assert cache.get(k1) is None
+    cache.put_many({k1: [0.1, 0.2], k2: [0.3, 0.4]})
+    assert cache.get(k1) == [0.1, 0.2]
+
+    # k2 è il meno recente → rimosso
+    cache.put_many({k3: [0.5, 0.6]})
+    assert cache.get(k2) is None
+    assert cache.get(k1) is not None
+
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 2
+    assert stats["size"] == 2
+
+    # -------------------------
+    # TIER SU DISCO
+    # -------------------------
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "embeddings.db")
+
+        disk = EmbeddingCache(max_size=1, path=path)
+        disk.put_many({k1: [0.25, 0.5]})
+        disk.close()
+
+        reopened = EmbeddingCache(max_size=1, path=path)
+        assert reopened.get(k1) == [0.25, 0.5]
+        assert reopened.stats()["hits"] == 1
+        reopened.close()
+
+    print("✅ embedding_cache tests passed")
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,94 @@
+"""
+Test funzionali per FakeLLMClient.
+Verifica il riconoscimento dei prompt degli agenti, JSON conforme agli
+schemi, determinismo, stream e iniezione di errori.
+"""
+
+import asyncio
+import json
+from pathlib import Path
+
+from agents.llm.fake_client import FakeLLMClient, FakeLLMError, detect_prompt_kind
+
+PROMPTS_DIR = Path("agents/prompts")
+
+
+def load_prompt(name: str) -> str:
+    return (PROMPTS_DIR / f"{name}.txt").read_text(encoding="utf-8")
+
+
+def run_tests():
+    llm = FakeLLMClient(seed=42)
+
+    # -------------------------
+    # RICONOSCIMENTO PROMPT
+    # -------------------------
+    for name in ("planner", "critic", "advisor", "memory", "coach"):
+        assert detect_prompt_kind(load_prompt(name)) == name, name
+    assert detect_prompt_kind("You are a helpful assistant") == "text"
+
+    # -------------------------
+    # SCHEMI JSON
+    # -------------------------
+    plan = json.loads(llm.generate(load_prompt("planner"), "Imparare Python", expect_json=True))
+    assert plan["roadmap"]["goal_summary"]
+    assert plan["tasks"]
+    assert all({"title", "description", "order"} <= set(t) for t in plan["tasks"])
+
+    critic = json.loads(llm.generate(load_prompt("critic"), "logs", expect_json=True))
+    assert isinstance(critic["replan_needed"], bool)
+    assert critic["recommendations"]
+
+    advisor = json.loads(llm.generate(load_prompt("advisor"), "issues", expect_json=True))
+    assert isinstance(advisor["suggest_replan"], bool)
+    assert 0 <= advisor["confidence"] <= 1
+
+    memory = json.loads(llm.generate(load_prompt("memory"), "events", expect_json=True))
+    assert memory["store"] is True
+    assert memory["memory_type"] and memory["content"]
+
+    # -------------------------
+    # DETERMINISMO
+    # -------------------------
+    other = FakeLLMClient(seed=42)
+    assert other.generate(load_prompt("planner"), "Imparare Python") == json.dumps(plan, ensure_ascii=False)
+
+    # -------------------------
+    # STREAM
+    # -------------------------
+    coach_prompt = load_prompt("coach")
+    full = llm.generate(coach_prompt, "tasks of today")
+    assert "".join(llm.generate_stream(coach_prompt, "tasks of today")) == full
+
+    async def collect():
+        return [c async for c in llm.agenerate_stream(coach_prompt, "tasks of today")]
+
+    assert "".join(asyncio.run(collect())) == full
+    assert asyncio.run(llm.agenerate(coach_prompt, "tasks of today")) == full
+
+    # -------------------------
+    # ERRORI E LATENZA
+    # -------------------------
+    failing = FakeLLMClient(error_rate=1.0)
+    try:
+        failing.generate(coach_prompt, "x")
+        assert False, "expected FakeLLMError"
+    except FakeLLMError:
+        pass
+    assert failing.stats() == {"calls": 1, "errors": 1}
+
+    flaky = FakeLLMClient(error_rate=0.5, seed=1)
+    outcomes = []
+    for _ in range(200):
+        try:
+            flaky.generate(coach_prompt, "x")
+            outcomes.append(True)
+        except FakeLLMError:
+            outcomes.append(False)
+    assert 50 < outcomes.count(False) < 150
+
+    print("✅ Fake LLM tests passed")
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,60 @@
+"""
+Test funzionale per l'endpoint /feedback.
+La card giornaliera invia i task spuntati come "1,2,3" nel campo
+task_ids: un solo POST deve produrre un progress log per task
+(scrittura batch) senza caricare il modello di embedding.
+"""
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+# database dedicato e niente bootstrap all'import del server
+TEST_DIR = tempfile.mkdtemp(prefix="feedback_endpoint_")
+os.environ["DB_PATH"] = os.path.join(TEST_DIR, "test.db")
+os.environ["LAZY_INIT"] = "1"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import app.server as server  # noqa: E402
+from storage.encoders import HashEncoder  # noqa: E402
+from storage.qdrant import VectorStorage  # noqa: E402
+from storage.sqlite import SQLiteDB  # noqa: E402
+
+
+def run_test():
+    SQLiteDB().run_migrations()
+
+    vector_store = VectorStorage(
+        path=str(Path(TEST_DIR) / "qdrant"),
+        embedding_model="hash-384",
+        encoder=HashEncoder(384)
+    )
+    vector_store.init()
+    server._resource = lambda key: vector_store
+
+    client = TestClient(server.app)
+    goal_id = 1
+
+    response = client.post("/feedback", data={
+        "goal_id": goal_id,
+        "task_ids": "1,2,3",
+        "difficulty": 3,
+        "energy": 4,
+        "note": "giornata piena"
+    })
+    assert response.status_code == 200, response.text
+    assert response.json() == {"ok": True}
+
+    logs = list(vector_store.iter_progress(goal_id))
+    assert sorted(log["task_id"] for log in logs) == [1, 2, 3]
+    assert all(log["done"] and log["difficulty"] == 3 for log in logs)
+
+    vector_store.close()
+    shutil.rmtree(TEST_DIR, ignore_errors=True)
+    print("✅ Feedback endpoint tests passed")
+
+
+if __name__ == "__main__":
+    run_test()
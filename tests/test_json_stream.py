@@ -0,0 +1,51 @@
+"""
+Test funzionale per il parser JSON incrementale usato nello streaming del planner.
+Verifica che i task vengano emessi appena completi, qualunque sia la frammentazione.
+"""
+
+import json
+import random
+
+from agents.llm.json_stream import JsonArrayStreamParser
+
+
+def run_tests():
+    plan = {
+        "roadmap": {
+            "goal_summary": "Imparare Python {base} [3 mesi]",
+            "tasks": [{"ignored": True}]
+        },
+        "tasks": [
+            {"title": 'Variabili "}"', "description": "Tipi base", "order": 1},
+            {"title": "Funzioni", "description": "def e return", "order": 2,
+             "meta": {"tags": ["a", "b"]}},
+        ],
+        # chiavi dopo l'array: i loro oggetti non sono task
+        "notes": {"weekly": {"review": True}, "extra": [{"ignored": True}]}
+    }
+    text = json.dumps(plan, indent=2)
+
+    rng = random.Random(42)
+
+    for _ in range(50):
+        parser = JsonArrayStreamParser("tasks")
+        emitted = []
+        i = 0
+        while i < len(text):
+            size = rng.randint(1, 8)
+            emitted.extend(parser.feed(text[i:i + size]))
+            i += size
+
+        assert emitted == plan["tasks"]
+        assert parser.text == text
+
+    # il primo task è disponibile prima che arrivi il secondo
+    parser = JsonArrayStreamParser("tasks")
+    cut = text.index('"Funzioni"')
+    assert parser.feed(text[:cut]) == plan["tasks"][:1]
+
+    print("✅ json_stream tests passed")
+
+
+if __name__ == "__main__":
+    run_tests()
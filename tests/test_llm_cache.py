@@ -0,0 +1,72 @@
+"""
+Test funzionali per la cache delle risposte LLM.
+Verifica hit/miss su input identici, chiavi distinte per prompt diversi,
+esclusione dei JSON non validi e TTL del backend SQLite.
+"""
+
+import os
+import tempfile
+import time
+
+from agents.llm.cache import (
+    CachedLLMClient,
+    InMemoryLRUBackend,
+    SQLiteCacheBackend,
+)
+
+
+class CountingLLM:
+    model = "test-model"
+    temperature = 0.2
+
+    def __init__(self, output: str):
+        self.output = output
+        self.calls = 0
+
+    def generate(self, system_prompt, user_prompt, expect_json=False):
+        self.calls += 1
+        return self.output
+
+
+def run_tests():
+    # -------------------------
+    # HIT / MISS
+    # -------------------------
+    inner = CountingLLM('{"suggest_replan": false, "confidence": 0.4}')
+    llm = CachedLLMClient(inner, InMemoryLRUBackend(max_size=10))
+
+    first = llm.generate("advisor", "week 1", expect_json=True)
+    second = llm.generate("advisor", "week 1", expect_json=True)
+    assert first == second
+    assert inner.calls == 1
+
+    llm.generate("advisor", "week 2", expect_json=True)
+    assert inner.calls == 2
+    assert llm.stats() == {"hits": 1, "misses": 2}
+    assert llm.model == "test-model"
+
+    # -------------------------
+    # JSON NON VALIDO → NON IN CACHE
+    # -------------------------
+    broken = CountingLLM("not json")
+    llm = CachedLLMClient(broken, InMemoryLRUBackend())
+    llm.generate("critic", "logs", expect_json=True)
+    llm.generate("critic", "logs", expect_json=True)
+    assert broken.calls == 2
+
+    # -------------------------
+    # SQLITE + TTL
+    # -------------------------
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = SQLiteCacheBackend(os.path.join(tmp, "llm.db"), ttl_seconds=0.05)
+        backend.set("k", "v")
+        assert backend.get("k") == "v"
+        time.sleep(0.1)
+        assert backend.get("k") is None
+        backend.close()
+
+    print("✅ llm cache tests passed")
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,156 @@
+"""
+Test funzionali per il livello di resilienza LLM.
+Verifica token bucket, retry su errori transitori (con Retry-After),
+nessun retry su errori non transitori, deadline e circuit breaker
+(che ignora i 429).
+"""
+
+import time
+
+import httpx
+import openai
+
+from agents.llm.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LLMDeadlineExceeded,
+    ResilientLLMClient,
+    TokenBucket,
+)
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+
+def rate_limit_error(retry_after: str) -> openai.RateLimitError:
+    response = httpx.Response(429, headers={"retry-after": retry_after}, request=REQUEST)
+    return openai.RateLimitError("rate limited", response=response, body=None)
+
+
+class FlakyLLM:
+    model = "test-model"
+    temperature = 0.2
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+        self.timeouts = []
+
+    def generate(self, system_prompt, user_prompt, expect_json=False, timeout=None):
+        self.calls += 1
+        self.timeouts.append(timeout)
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+    def generate_stream(self, system_prompt, user_prompt, expect_json=False, timeout=None):
+        yield self.generate(system_prompt, user_prompt, expect_json, timeout)
+
+
+def run_tests():
+    # -------------------------
+    # TOKEN BUCKET
+    # -------------------------
+    bucket = TokenBucket(rate_per_minute=600, capacity=2)  # 10 token/s
+    assert bucket.reserve(1) == 0
+    assert bucket.reserve(1) == 0
+    wait = bucket.reserve(1)
+    assert 0.05 < wait <= 0.1
+
+    try:
+        bucket.reserve(2, max_wait=0.01)
+        assert False, "expected LLMDeadlineExceeded"
+    except LLMDeadlineExceeded:
+        pass
+
+    # -------------------------
+    # RETRY SU ERRORI TRANSITORI
+    # -------------------------
+    inner = FlakyLLM([
+        openai.APIConnectionError(request=REQUEST),
+        rate_limit_error("0.01"),
+    ])
+    llm = ResilientLLMClient(inner, rpm=6000, tpm=10**6, base_delay=0.01, deadline=5)
+
+    assert llm.generate("sys", "user") == "ok"
+    assert inner.calls == 3
+    assert llm.stats() == {"retries": 2, "breaker": "closed"}
+    assert all(0 < t <= 5 for t in inner.timeouts)
+    assert llm.model == "test-model"
+
+    # stream: ritentato se fallisce prima del primo token
+    inner = FlakyLLM([openai.APIConnectionError(request=REQUEST)])
+    llm = ResilientLLMClient(inner, base_delay=0.01, deadline=5)
+    assert list(llm.generate_stream("sys", "user")) == ["ok"]
+    assert inner.calls == 2
+
+    # -------------------------
+    # ERRORI NON TRANSITORI
+    # -------------------------
+    inner = FlakyLLM([ValueError("bad request")])
+    llm = ResilientLLMClient(inner, base_delay=0.01)
+    try:
+        llm.generate("sys", "user")
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    assert inner.calls == 1
+
+    # -------------------------
+    # DEADLINE
+    # -------------------------
+    inner = FlakyLLM([rate_limit_error("10")])
+    llm = ResilientLLMClient(inner, deadline=0.5)
+    started = time.monotonic()
+    try:
+        llm.generate("sys", "user")
+        assert False, "expected LLMDeadlineExceeded"
+    except LLMDeadlineExceeded:
+        pass
+    assert time.monotonic() - started < 0.5
+
+    # -------------------------
+    # CIRCUIT BREAKER
+    # -------------------------
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.1)
+    inner = FlakyLLM([openai.APIConnectionError(request=REQUEST)] * 2)
+    llm = ResilientLLMClient(inner, max_retries=1, base_delay=0.01, breaker=breaker)
+
+    try:
+        llm.generate("sys", "user")
+        assert False, "expected APIConnectionError"
+    except openai.APIConnectionError:
+        pass
+    assert breaker.state == "open"
+
+    try:
+        llm.generate("sys", "user")
+        assert False, "expected CircuitOpenError"
+    except CircuitOpenError:
+        pass
+    assert inner.calls == 2
+
+    time.sleep(0.15)
+    assert llm.generate("sys", "user") == "ok"
+    assert breaker.state == "closed"
+
+    # i 429 non contano: backoff e retry, breaker sempre chiuso
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+    inner = FlakyLLM([rate_limit_error("0.01")] * 4)
+    llm = ResilientLLMClient(inner, max_retries=5, base_delay=0.01, breaker=breaker)
+    assert llm.generate("sys", "user") == "ok"
+    assert breaker.state == "closed"
+
+    inner = FlakyLLM([rate_limit_error("0.01")] * 3)
+    llm = ResilientLLMClient(inner, max_retries=2, base_delay=0.01, breaker=breaker)
+    try:
+        llm.generate("sys", "user")
+        assert False, "expected RateLimitError"
+    except openai.RateLimitError:
+        pass
+    assert breaker.state == "closed"
+
+    print("✅ LLM resilience tests passed")
+
+
+if __name__ == "__main__":
+    run_tests()
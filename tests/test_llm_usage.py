@@ -0,0 +1,185 @@
+"""
+Test funzionali per contabilità dei token e budget dei prompt.
+Verifica totali per chiamata e per goal (anche dai passi del DAG e
+dall'anteprima del piano in streaming, attribuita al goal alla conferma),
+troncamento a budget e prompt di Critic / MemoryAgent limitati.
+"""
+
+import asyncio
+import time
+
+from agents.critic_agent import CriticAgent
+from agents.llm.fake_client import FakeLLMClient
+from agents.llm.tokens import estimate_tokens, fit_to_budget
+from agents.llm.usage import UsageTracker, goal_scope
+from agents.memory_agent import MemoryAgent
+from agents.planner_agent import PlannerAgent
+from storage.plan_previews import PlanPreviewStore, PreviewExpiredError
+from supervisor.dag import Step, run_dag
+
+
+class RecordingLLM:
+    model = "recording"
+
+    def __init__(self, output):
+        self.output = output
+        self.prompts = []
+
+    def generate(self, system_prompt, user_prompt, expect_json=False):
+        self.prompts.append(user_prompt)
+        return self.output
+
+
+class ProgressStore:
+    def __init__(self, progress):
+        self.progress = progress
+
+    def retrieve_recent_progress(self, goal_id, days=7, limit=50):
+        return self.progress
+
+
+def run_tests():
+    # -------------------------
+    # USAGE TRACKER
+    # -------------------------
+    tracker = UsageTracker()
+    tracker.record(100, 20)
+    with goal_scope(7):
+        tracker.record(50, 10)
+    tracker.record(5, 5, goal_id=8)
+
+    assert tracker.totals() == {
+        "calls": 3, "prompt_tokens": 155, "completion_tokens": 35, "total_tokens": 190
+    }
+    assert tracker.for_goal(7)["total_tokens"] == 60
+    assert tracker.for_goal(8)["calls"] == 1
+    assert tracker.for_goal(99)["calls"] == 0
+    assert tracker.last == {"goal_id": 8, "prompt_tokens": 5, "completion_tokens": 5}
+
+    # lo scope del goal segue i passi del DAG
+    llm = FakeLLMClient()
+    with goal_scope(42):
+        run_dag([
+            Step("a", lambda _: llm.generate("You are a planning agent.", "goal a")),
+            Step("b", lambda _: llm.generate("You are a Critic agent.", "logs b")),
+        ])
+    assert llm.usage.for_goal(42)["calls"] == 2
+    assert llm.usage.totals()["prompt_tokens"] > 0
+
+    # trasferimento da chiave provvisoria al goal
+    tracker.record(30, 10, goal_id="plan:x")
+    tracker.transfer("plan:x", 7)
+    assert tracker.for_goal(7)["total_tokens"] == 100
+    assert "plan:x" not in tracker.snapshot()["per_goal"]
+
+    # chiavi provvisorie mai confermate: mappa separata e limitata
+    bounded = UsageTracker(max_provisional=3)
+    for i in range(10):
+        bounded.record(1, 1, goal_id=f"plan:{i}")
+    assert bounded.snapshot()["per_goal"] == {}
+    assert bounded.snapshot()["provisional"] == 3
+    assert bounded.for_goal("plan:0")["calls"] == 0
+    assert bounded.for_goal("plan:9")["calls"] == 1
+    assert bounded.totals()["calls"] == 10
+
+    # -------------------------
+    # ANTEPRIME E STREAMING: token attribuiti al goal creato
+    # -------------------------
+    planner = PlannerAgent.__new__(PlannerAgent)
+    planner.llm = FakeLLMClient()
+    planner.previews = PlanPreviewStore()
+    planner.system_prompt = "You are a planning agent."
+    planner._persist_plan = lambda goal_text, plan: 501
+
+    async def stream_preview():
+        return [e async for e in planner.astream_plan("Imparare Python")]
+
+    events = asyncio.run(stream_preview())
+    preview_id = events[-1]["preview_id"]
+    spent = planner.llm.usage.totals()["total_tokens"]
+    assert spent > 0
+    assert planner.llm.usage.for_goal(501)["calls"] == 0
+
+    assert planner.confirm(preview_id, "Imparare Python") == 501
+    assert planner.llm.usage.for_goal(501)["total_tokens"] == spent
+
+    # execute: stesso trasferimento dopo la creazione del goal
+    planner._persist_plan = lambda goal_text, plan: 502
+    assert planner.execute("Imparare Go") == 502
+    assert planner.llm.usage.for_goal(502)["calls"] == 1
+
+    # anteprima scaduta o piano non salvato: la chiave provvisoria viene scartata
+    def failing_persist(goal_text, plan):
+        raise RuntimeError("db down")
+
+    planner._persist_plan = failing_persist
+    try:
+        planner.execute("Imparare Rust")
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("persist failure not raised")
+
+    expired_id = planner.preview("Imparare C")["preview_id"]
+    planner.previews.pop(expired_id)
+    try:
+        planner.confirm(expired_id, "Imparare C")
+    except PreviewExpiredError:
+        pass
+    else:
+        raise AssertionError("expired preview confirmed")
+    assert planner.llm.usage.snapshot()["provisional"] == 0
+
+    # -------------------------
+    # BUDGET
+    # -------------------------
+    kept, dropped = fit_to_budget(["x" * 40] * 10, max_tokens=35)
+    assert len(kept) == 3 and dropped == 7
+
+    now = time.time()
+    progress = [
+        {
+            "done": i % 2 == 0,
+            "difficulty": 3,
+            "energy": 4,
+            "note": f"note {i} " + "long text " * 20,
+            "timestamp_ts": now - i * 3600,
+        }
+        for i in range(200)
+    ]
+
+    critic_llm = RecordingLLM('{"issues": [], "recommendations": [], "replan_needed": false}')
+    critic = CriticAgent.__new__(CriticAgent)
+    critic.llm = critic_llm
+    critic.vector_store = ProgressStore(progress)
+    critic.system_prompt = "critic"
+    critic.prompt_budget = 300
+
+    critic.analyze_week(goal_id=1)
+    prompt = critic_llm.prompts[0]
+    lines = prompt.splitlines()
+    assert estimate_tokens(prompt) < 400
+    assert "older logs summarized" in lines[0]
+    # i log più recenti restano, in ordine cronologico
+    assert "note 0 " in lines[-1]
+
+    memory_llm = RecordingLLM('{"store": false, "content": "", "memory_type": null}')
+    memory = MemoryAgent.__new__(MemoryAgent)
+    memory.llm = memory_llm
+    memory.system_prompt = "memory"
+    memory.prompt_budget = 200
+
+    memories = [{"type": "observation", "content": "memory " * 50} for _ in range(40)]
+    memory.compress_memories(memories)
+    # in compressione ogni memoria resta nel prompt, accorciata
+    assert memory_llm.prompts[0].count("[observation]") == 40
+
+    context = memory._memory_context([m["content"] for m in memories])
+    assert estimate_tokens(context) < 260
+    assert "less relevant memories omitted" in context
+
+    print("✅ LLM usage tests passed")
+
+
+if __name__ == "__main__":
+    run_tests()
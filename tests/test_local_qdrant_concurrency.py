@@ -0,0 +1,78 @@
+"""
+Test funzionale per l'accesso concorrente a Qdrant embedded.
+Reflection (search + upsert) e compaction (scroll, upsert, delete) girano
+in parallelo nel DAG WEEKLY sullo stesso client locale, che non è
+thread-safe: VectorStorage deve serializzarne le chiamate.
+"""
+
+import shutil
+from pathlib import Path
+
+from agents.llm.fake_client import FakeLLMClient
+from agents.memory_agent import MemoryAgent
+from storage.encoders import HashEncoder
+from storage.qdrant import VectorStorage
+from storage.sqlite import SQLiteDB
+from supervisor.dag import Step, run_dag
+
+
+TEST_QDRANT_PATH = Path("./qdrant_test_data_local_concurrency")
+
+ROUNDS = 2
+REFLECTIONS = 60
+MEMORIES = 300
+
+
+def run_test():
+    if TEST_QDRANT_PATH.exists():
+        shutil.rmtree(TEST_QDRANT_PATH, ignore_errors=True)
+
+    SQLiteDB().run_migrations()
+
+    vector_store = VectorStorage(
+        path=str(TEST_QDRANT_PATH),
+        embedding_model="hash-384",
+        encoder=HashEncoder(384)
+    )
+    vector_store.init()
+    memory = MemoryAgent(FakeLLMClient(), vector_store)
+
+    for round_ in range(ROUNDS):
+        goal_id = 9100 + round_
+        vector_store.write_memories([
+            {
+                "goal_id": goal_id,
+                "content": f"osservazione {i}",
+                "memory_type": "observation",
+                "source": "test",
+            }
+            for i in range(MEMORIES)
+        ])
+
+        def reflect(_):
+            for _ in range(REFLECTIONS):
+                memory.weekly_reflection(goal_id)
+
+        results = run_dag([
+            Step("reflection", reflect),
+            Step(
+                "compaction",
+                lambda _: vector_store.archive_old_memories(
+                    goal_id,
+                    older_than_days=-1,
+                    batch_size=10
+                )
+            ),
+        ])
+
+        failed = {name: r.error for name, r in results.items() if not r.ok}
+        assert not failed, failed
+        assert results["compaction"].value["archived"] >= MEMORIES
+
+    vector_store.close()
+    shutil.rmtree(TEST_QDRANT_PATH, ignore_errors=True)
+    print("✅ Local Qdrant concurrency tests passed")
+
+
+if __name__ == "__main__":
+    run_test()
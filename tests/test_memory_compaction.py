@@ -0,0 +1,121 @@
+"""
+Test funzionale per la compattazione delle memorie.
+Verifica riassunto per batch, spostamento in archivio, checkpoint riprendibile,
+timestamp delle memorie compresse e batch senza riassunto.
+"""
+
+import shutil
+from pathlib import Path
+
+from storage.sqlite import SQLiteDB
+from storage.encoders import HashEncoder
+from storage.qdrant import VectorStorage
+from storage.crud import get_compaction_checkpoint
+from tools.memory_tools import archive_old_memories, retrieve_memories_by_type
+
+
+TEST_QDRANT_PATH = Path("./qdrant_test_data_compaction")
+
+
+def run_test():
+    if TEST_QDRANT_PATH.exists():
+        shutil.rmtree(TEST_QDRANT_PATH, ignore_errors=True)
+
+    db = SQLiteDB()
+    db.run_migrations()
+
+    vector_store = VectorStorage(
+        path=str(TEST_QDRANT_PATH),
+        embedding_model="hash-384",
+        encoder=HashEncoder(384)
+    )
+    vector_store.init()
+
+    goal_id = 4242
+
+    vector_store.write_memories([
+        {
+            "goal_id": goal_id,
+            "content": f"Osservazione {i}",
+            "memory_type": "observation",
+            "source": "coach"
+        }
+        for i in range(5)
+    ])
+
+    # older_than_days=-1 → soglia nel futuro: tutte le memorie sono "vecchie"
+    result = archive_old_memories(
+        vector_store=vector_store,
+        goal_id=goal_id,
+        older_than_days=-1,
+        summarize=lambda batch: f"{len(batch)} osservazioni",
+        batch_size=2
+    )
+    assert result["batches"] == 3
+    assert result["archived"] == 5
+
+    compressed = retrieve_memories_by_type(
+        vector_store=vector_store,
+        goal_id=goal_id,
+        memory_type="compressed",
+        limit=10
+    )
+    assert sorted(m["content"] for m in compressed) == [
+        "1 osservazioni", "2 osservazioni", "2 osservazioni"
+    ]
+
+    observations = retrieve_memories_by_type(
+        vector_store=vector_store,
+        goal_id=goal_id,
+        memory_type="observation",
+        limit=10
+    )
+    assert observations == []
+
+    archived, _ = vector_store.client.scroll(
+        collection_name="memories_archive",
+        limit=10
+    )
+    assert len(archived) == 5
+
+    assert get_compaction_checkpoint(goal_id)["status"] == "completed"
+
+    # le memorie compresse conservano l'età del batch, non quella della compattazione
+    original_ts = {r.payload["timestamp_ts"] for r in archived}
+    assert {m["timestamp_ts"] for m in compressed} <= original_ts
+
+    # le memorie compresse non vengono ricompattate
+    again = archive_old_memories(
+        vector_store=vector_store,
+        goal_id=goal_id,
+        older_than_days=-1
+    )
+    assert again["archived"] == 0
+
+    # riassunto vuoto (store: false): il batch viene archiviato senza memoria compressa
+    other_goal = 4343
+    vector_store.write_memories([
+        {
+            "goal_id": other_goal,
+            "content": f"Dettaglio {i}",
+            "memory_type": "observation",
+            "source": "coach"
+        }
+        for i in range(3)
+    ])
+    skipped = archive_old_memories(
+        vector_store=vector_store,
+        goal_id=other_goal,
+        older_than_days=-1,
+        summarize=lambda batch: None
+    )
+    assert skipped["archived"] == 3
+    assert list(vector_store.iter_memories(other_goal)) == []
+
+    print("✅ memory compaction test passed")
+
+    vector_store.close()
+
+
+if __name__ == "__main__":
+    run_test()
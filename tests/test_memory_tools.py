@@ -7,6 +7,8 @@ from tools.memory_tools import (
     retrieve_recent_memories,
     retrieve_memories_by_type,
     retrieve_recent_progress,
+    iter_memories,
+    iter_progress,
     store_plan_version,
     summarize_memories,
 )
@@ -133,6 +135,64 @@ def run_tests():
     assert len(progress) >= 1
     assert progress[0]["done"] is True
 
+    # -------------------------
+    # BATCH WRITES
+    # -------------------------
+    vector_store.write_memories([
+        {
+            "goal_id": goal_id,
+            "content": f"Osservazione batch {i}",
+            "memory_type": "observation",
+            "source": "coach"
+        }
+        for i in range(3)
+    ])
+
+    vector_store.write_progress_batch([
+        {
+            "goal_id": goal_id,
+            "task_id": task_id + i,
+            "done": i % 2 == 0,
+            "difficulty": 2,
+            "energy": 3,
+            "note": None
+        }
+        for i in range(3)
+    ])
+
+    observations = retrieve_memories_by_type(
+        vector_store=vector_store,
+        goal_id=goal_id,
+        memory_type="observation",
+        limit=20
+    )
+    assert len(observations) == 3
+
+    progress = retrieve_recent_progress(
+        vector_store=vector_store,
+        goal_id=goal_id,
+        days=1
+    )
+    assert len(progress) == 4
+
+    # -------------------------
+    # ITERAZIONE A PAGINE
+    # -------------------------
+    all_memories = list(iter_memories(
+        vector_store=vector_store,
+        goal_id=goal_id,
+        page_size=2
+    ))
+    assert len(all_memories) == 6
+
+    all_progress = list(iter_progress(
+        vector_store=vector_store,
+        goal_id=goal_id,
+        days=1,
+        page_size=1
+    ))
+    assert len(all_progress) == 4
+
     # -------------------------
     # CHIUSURA
     # -------------------------
@@ -0,0 +1,160 @@
+"""
+Test funzionali per lo store dei piani in anteprima.
+Verifica preview_id, consumo singolo alla conferma (anche con conferme
+concorrenti), errore su anteprima scaduta (senza ripianificare), scadenza
+TTL e backend SQLite condiviso tra worker.
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from agents.planner_agent import PlannerAgent
+from storage.plan_previews import (
+    PlanPreviewStore,
+    PreviewExpiredError,
+    SQLitePlanPreviewStore,
+)
+from storage.sqlite import SQLiteDB
+
+
+def run_tests():
+    plan = {
+        "roadmap": {"goal_summary": "Python", "estimated_duration_days": 90},
+        "tasks": [{"title": "Variabili", "description": "Tipi base", "order": 1}]
+    }
+
+    store = PlanPreviewStore(ttl_seconds=60, max_size=2)
+
+    preview_id = store.put("Imparare Python", plan)
+    assert len(store) == 1
+
+    # la conferma consuma esattamente il piano approvato
+    cached = store.pop(preview_id)
+    assert cached == {"goal_text": "Imparare Python", "plan": plan}
+    assert store.pop(preview_id) is None
+
+    # get non consuma
+    kept = store.put("Imparare Python", plan)
+    assert store.get(kept) == {"goal_text": "Imparare Python", "plan": plan}
+    assert store.get(kept) is not None
+    store.delete(kept)
+    assert store.get(kept) is None
+
+    # conferma: anteprima scaduta -> errore, nessuna nuova pianificazione
+    planner = PlannerAgent.__new__(PlannerAgent)
+    planner.llm = None
+    planner.previews = PlanPreviewStore()
+    saved = []
+    planner._persist_plan = lambda goal_text, p: saved.append(goal_text) or len(saved)
+    planner.execute = lambda goal_text: (_ for _ in ()).throw(AssertionError("replanned"))
+
+    for missing in (None, "unknown"):
+        try:
+            planner.confirm(missing, "Imparare Python")
+            assert False, "expected PreviewExpiredError"
+        except PreviewExpiredError:
+            pass
+
+    confirmed = planner.previews.put("Imparare Python", plan)
+    assert planner.confirm(confirmed, "ignored") == 1
+    assert saved == ["Imparare Python"]
+    assert planner.previews.get(confirmed) is None
+
+    # scrittura fallita: l'anteprima resta disponibile per un nuovo tentativo
+    retry = planner.previews.put("Imparare Go", plan)
+
+    def failing(goal_text, p):
+        raise RuntimeError("db down")
+
+    planner._persist_plan = failing
+    try:
+        planner.confirm(retry, "Imparare Go")
+        assert False, "expected RuntimeError"
+    except RuntimeError:
+        pass
+    assert planner.previews.get(retry) is not None
+
+    # doppio click su "Conferma": un solo goal, l'altra conferma trova l'anteprima consumata
+    saved.clear()
+
+    def slow(goal_text, p):
+        time.sleep(0.05)
+        saved.append(goal_text)
+        return len(saved)
+
+    planner._persist_plan = slow
+    double = planner.previews.put("Imparare Rust", plan)
+
+    async def confirm_twice():
+        return await asyncio.gather(
+            planner.aconfirm(double, "ignored"),
+            planner.aconfirm(double, "ignored"),
+            return_exceptions=True
+        )
+
+    results = asyncio.run(confirm_twice())
+    assert 1 in results
+    assert sum(isinstance(r, PreviewExpiredError) for r in results) == 1
+    assert saved == ["Imparare Rust"]
+
+    # dimensione massima: l'anteprima più vecchia viene scartata
+    first = store.put("a", plan)
+    store.put("b", plan)
+    store.put("c", plan)
+    assert store.pop(first) is None
+    assert len(store) == 2
+
+    # scadenza
+    short = PlanPreviewStore(ttl_seconds=0.01)
+    expired = short.put("Imparare Python", plan)
+    time.sleep(0.05)
+    assert short.pop(expired) is None
+    assert len(short) == 0
+
+    # -------------------------
+    # BACKEND SQLITE: anteprime condivise tra worker
+    # -------------------------
+    with tempfile.TemporaryDirectory() as tmp:
+        db = SQLiteDB(os.path.join(tmp, "previews.db"))
+        db.run_migrations()
+
+        worker_a = SQLitePlanPreviewStore(ttl_seconds=60, max_size=2, db=db)
+        worker_b = SQLitePlanPreviewStore(ttl_seconds=60, max_size=2, db=db)
+
+        shared = worker_a.put("Imparare Python", plan)
+        assert worker_b.get(shared) == {"goal_text": "Imparare Python", "plan": plan}
+        worker_b.delete(shared)
+        assert worker_a.get(shared) is None
+
+        # pop atomico: tra worker concorrenti uno solo ottiene l'anteprima
+        contended = worker_a.put("Imparare Python", plan)
+        stores = [worker_a, worker_b] * 4
+        with ThreadPoolExecutor(max_workers=len(stores)) as pool:
+            popped = list(pool.map(lambda st: st.pop(contended), stores))
+        assert [p for p in popped if p is not None] == [
+            {"goal_text": "Imparare Python", "plan": plan}
+        ]
+
+        first = worker_a.put("a", plan)
+        time.sleep(0.01)
+        worker_a.put("b", plan)
+        time.sleep(0.01)
+        worker_b.put("c", plan)
+        assert worker_b.get(first) is None
+        assert len(worker_a) == 2
+
+        short = SQLitePlanPreviewStore(ttl_seconds=0.01, db=db)
+        expired = short.put("Imparare Python", plan)
+        time.sleep(0.05)
+        assert short.get(expired) is None
+
+        db.pool.close()
+
+    print("✅ plan_previews tests passed")
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,148 @@
+"""
+Test funzionale per gli aggregati dei progress.
+I log scritti prima dell'introduzione degli aggregati devono comparire
+nelle metriche: alla prima lettura il goal viene ricostruito da Qdrant una
+sola volta (checkpoint su SQLite). Ogni VectorStorage aggiorna gli
+aggregati in scrittura e una scrittura concorrente alla ricostruzione
+non viene contata due volte.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+# database dedicato: Config legge DB_PATH all'import
+TEST_DIR = tempfile.mkdtemp(prefix="progress_aggregates_")
+os.environ["DB_PATH"] = os.path.join(TEST_DIR, "test.db")
+
+from qdrant_client.models import PointStruct  # noqa: E402
+
+from storage.crud import is_progress_backfilled  # noqa: E402
+from storage.encoders import HashEncoder  # noqa: E402
+from storage.qdrant import VectorStorage  # noqa: E402
+from storage.sqlite import SQLiteDB  # noqa: E402
+
+
+TEST_QDRANT_PATH = Path(TEST_DIR) / "qdrant"
+
+
+def make_store() -> VectorStorage:
+    vector_store = VectorStorage(
+        path=str(TEST_QDRANT_PATH),
+        embedding_model="hash-384",
+        encoder=HashEncoder(384)
+    )
+    vector_store.init()
+    return vector_store
+
+
+def write_legacy_logs(vector_store: VectorStorage, goal_id: int, count: int) -> None:
+    """
+    Progress log scritti direttamente su Qdrant, senza aggregati
+    (come prima della loro introduzione).
+    """
+    now = datetime.utcnow()
+    vector_store.client.upsert(
+        collection_name="progress_logs",
+        points=[
+            PointStruct(
+                id=str(uuid.uuid4()),
+                vector=[0.1] * vector_store.vector_size,
+                payload={
+                    "goal_id": goal_id,
+                    "task_id": i,
+                    "done": i < 3,
+                    "difficulty": 2,
+                    "energy": 4,
+                    "note": None,
+                    "timestamp": now.isoformat(),
+                    "timestamp_ts": now.timestamp(),
+                }
+            )
+            for i in range(count)
+        ]
+    )
+
+
+def run_test():
+    SQLiteDB().run_migrations()
+    goal_id = 1
+
+    # -------------------------
+    # STORIA PRECEDENTE AGLI AGGREGATI: BACKFILL ALLA PRIMA LETTURA
+    # -------------------------
+    vector_store = make_store()
+    write_legacy_logs(vector_store, goal_id, 4)
+    expected = vector_store.compute_basic_metrics(goal_id, from_aggregates=False)
+    assert expected["total_logs"] == 4
+
+    assert not is_progress_backfilled(goal_id)
+    assert vector_store.compute_basic_metrics(goal_id) == expected
+    assert is_progress_backfilled(goal_id)
+
+    # i nuovi log si sommano ai bucket ricostruiti, senza nuovo backfill
+    vector_store.write_progress_batch([
+        {"goal_id": goal_id, "task_id": 9, "done": True, "difficulty": 5, "energy": 1}
+    ])
+    metrics = vector_store.compute_basic_metrics(goal_id)
+    assert metrics["total_logs"] == 5
+    assert metrics["completion_rate"] == 4 / 5
+    vector_store.close()
+
+    # -------------------------
+    # ALTRO VECTORSTORAGE (es. fallback dei tool): aggregati aggiornati comunque
+    # -------------------------
+    ad_hoc = make_store()
+    ad_hoc.write_progress(goal_id, task_id=10, done=False, difficulty=3, energy=3)
+    ad_hoc.close()
+
+    # dopo un riavvio il checkpoint evita di ricostruire di nuovo
+    restarted = make_store()
+    restarted.rebuild_progress_aggregates = lambda g: (_ for _ in ()).throw(
+        AssertionError("backfill repeated")
+    )
+    metrics = restarted.compute_basic_metrics(goal_id)
+    assert metrics == restarted.compute_basic_metrics(goal_id, from_aggregates=False)
+    assert metrics["total_logs"] == 6
+    restarted.close()
+
+    # -------------------------
+    # SCRITTURA DURANTE LA RICOSTRUZIONE: contata una sola volta
+    # -------------------------
+    vector_store = make_store()
+    other_goal = 2
+    write_legacy_logs(vector_store, other_goal, 4)
+
+    scan = vector_store.iter_progress
+    writer = threading.Thread(target=vector_store.write_progress_batch, args=([
+        {"goal_id": other_goal, "task_id": 9, "done": True, "difficulty": 1, "energy": 1}
+    ],))
+
+    def iter_progress_with_concurrent_write(goal, *args, **kwargs):
+        for i, log in enumerate(scan(goal, *args, **kwargs)):
+            if i == 0:
+                writer.start()
+                time.sleep(0.2)
+            yield log
+
+    vector_store.iter_progress = iter_progress_with_concurrent_write
+    vector_store.rebuild_progress_aggregates(other_goal)
+    writer.join()
+    vector_store.iter_progress = scan
+
+    metrics = vector_store.compute_basic_metrics(other_goal)
+    assert metrics["total_logs"] == 5
+    assert metrics == vector_store.compute_basic_metrics(other_goal, from_aggregates=False)
+    vector_store.close()
+
+    shutil.rmtree(TEST_DIR, ignore_errors=True)
+    print("✅ Progress aggregates tests passed")
+
+
+if __name__ == "__main__":
+    run_test()
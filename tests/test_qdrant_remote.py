@@ -0,0 +1,112 @@
+"""
+Test funzionale per VectorStorage su server Qdrant remoto.
+Richiede un server raggiungibile (es. container locale):
+
+    docker run -p 6333:6333 -p 6334:6334 qdrant/qdrant
+    QDRANT_URL=http://localhost:6333 python -m tests.test_qdrant_remote
+
+Senza QDRANT_URL il test viene saltato. Verifica scrittura/ricerca via
+gRPC con pool di client, la rotazione round-robin dei client,
+ricerche concorrenti e l'init ripetuto (come da più worker).
+"""
+
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+from qdrant_client.models import FieldCondition, Filter, FilterSelector, MatchValue
+
+from storage.encoders import HashEncoder
+from storage.qdrant import VectorStorage
+from storage.qdrant_clients import QdrantClientPool
+from storage.sqlite import SQLiteDB
+
+
+POOL_SIZE = 3
+
+
+def make_store() -> VectorStorage:
+    return VectorStorage(
+        embedding_model="hash-384",
+        encoder=HashEncoder(384),
+        url=os.environ["QDRANT_URL"],
+        api_key=os.getenv("QDRANT_API_KEY"),
+        prefer_grpc=os.getenv("QDRANT_PREFER_GRPC", "1") == "1",
+        timeout=10,
+        pool_size=POOL_SIZE
+    )
+
+
+def run_test():
+    if not os.getenv("QDRANT_URL"):
+        print("⏭ QDRANT_URL not set, remote Qdrant test skipped")
+        return
+
+    SQLiteDB().run_migrations()
+
+    vector_store = make_store()
+    vector_store.init()
+    # secondo init (altro worker): nessun errore su collection esistenti
+    other = make_store()
+    other.init()
+
+    pool = vector_store.client._target
+    assert isinstance(pool, QdrantClientPool)
+    assert len(pool.clients) == POOL_SIZE
+
+    # round-robin: ogni client a turno
+    turns = [pool._next() for _ in range(POOL_SIZE * 2)]
+    assert {id(c) for c in turns[:POOL_SIZE]} == {id(c) for c in pool.clients}
+    assert turns[POOL_SIZE:] == turns[:POOL_SIZE]
+
+    # goal casuale: il server può contenere dati di altre esecuzioni
+    goal_id = random.randint(10**8, 10**9)
+
+    # -------------------------
+    # SCRITTURA E RICERCA
+    # -------------------------
+    vector_store.write_memories([
+        {
+            "goal_id": goal_id,
+            "content": f"remote memory {i}",
+            "memory_type": "observation",
+            "source": "test",
+        }
+        for i in range(5)
+    ])
+
+    hits = vector_store.search_memories(goal_id, "remote memory", limit=10)
+    assert len(hits) == 5
+    assert {h["goal_id"] for h in hits} == {goal_id}
+
+    # i dati scritti da un worker sono visibili all'altro
+    assert len(list(other.iter_memories(goal_id))) == 5
+
+    # -------------------------
+    # RICERCHE CONCORRENTI SUL POOL
+    # -------------------------
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(
+            lambda _: len(vector_store.search_memories(goal_id, "memory", limit=3)),
+            range(32)
+        ))
+    assert results == [3] * 32
+
+    # -------------------------
+    # PULIZIA
+    # -------------------------
+    vector_store.client.delete(
+        collection_name="memories",
+        points_selector=FilterSelector(filter=Filter(must=[
+            FieldCondition(key="goal_id", match=MatchValue(value=goal_id))
+        ]))
+    )
+    assert list(vector_store.iter_memories(goal_id)) == []
+
+    other.close()
+    vector_store.close()
+    print("✅ Remote Qdrant tests passed")
+
+
+if __name__ == "__main__":
+    run_test()
@@ -0,0 +1,53 @@
+"""
+Test sui piani di esecuzione SQLite.
+Verifica tramite EXPLAIN QUERY PLAN che le query calde usino gli indici
+della migrazione 003 invece di uno scan completo della tabella.
+"""
+
+from storage.sqlite import SQLiteDB
+from tools.state_tools import ACTIVE_TASKS_QUERY
+
+
+def assert_uses_index(db: SQLiteDB, sql: str, params, index_name: str) -> None:
+    """
+    Fallisce se il piano della query non usa `index_name`.
+    """
+    plan = db.explain_query_plan(sql, params)
+    assert any(index_name in step for step in plan), (
+        f"{index_name} not used by query plan: {plan}"
+    )
+    assert not any(step.startswith("SCAN") and "INDEX" not in step for step in plan), (
+        f"full table scan in query plan: {plan}"
+    )
+
+
+def run_tests():
+    db = SQLiteDB()
+    db.run_migrations()
+
+    assert_uses_index(
+        db,
+        ACTIVE_TASKS_QUERY,
+        (1,),
+        "idx_tasks_goal_status_id"
+    )
+
+    assert_uses_index(
+        db,
+        "SELECT * FROM task_events WHERE task_id = ? ORDER BY timestamp",
+        (1,),
+        "idx_task_events_task_timestamp"
+    )
+
+    assert_uses_index(
+        db,
+        "SELECT * FROM progress_logs WHERE task_id = ? AND created_at >= ?",
+        (1, "2024-01-01"),
+        "idx_progress_logs_task_created"
+    )
+
+    print("✅ query plan tests passed")
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,116 @@
+"""
+Test funzionale per il fan-out dello scheduler.
+Verifica che DAILY venga eseguito per ogni goal attivo, con isolamento
+degli errori, timeout per goal, deadline sui goal in coda e report finale.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+# database dedicato: il report conta tutti i goal attivi del DB
+# (Config legge DB_PATH all'import)
+TEST_DIR = tempfile.mkdtemp(prefix="scheduler_fanout_")
+os.environ["DB_PATH"] = os.path.join(TEST_DIR, "test.db")
+
+from agents.scheduler_agent import AgentScheduler  # noqa: E402
+from storage.sqlite import SQLiteDB  # noqa: E402
+from storage.crud import create_goal  # noqa: E402
+from supervisor.events import EventType  # noqa: E402
+
+
+class RecordingSupervisor:
+    def __init__(self, failing=(), slow=(), work=0.0, all_slow=False):
+        self.failing = failing
+        self.slow = slow
+        self.work = work
+        self.all_slow = all_slow
+        self.seen = []
+        self._lock = threading.Lock()
+
+    def handle(self, state):
+        with self._lock:
+            self.seen.append(state.goal_id)
+        if state.goal_id in self.failing:
+            raise RuntimeError("boom")
+        if self.all_slow or state.goal_id in self.slow:
+            time.sleep(3)
+        time.sleep(self.work)
+        return {"goal_id": state.goal_id}
+
+
+def run_test():
+    db = SQLiteDB()
+    db.run_migrations()
+
+    active = [create_goal(f"Goal fan-out {i}", status="active") for i in range(12)]
+    create_goal("Goal non attivo", status="completed")
+
+    supervisor = RecordingSupervisor(failing={active[0]}, slow={active[1]})
+
+    scheduler = AgentScheduler(
+        supervisor,
+        max_workers=4,
+        goal_timeout=1.0,
+        jitter=0,
+        page_size=5
+    )
+
+    report = scheduler.fan_out(EventType.DAILY)
+
+    assert sorted(supervisor.seen) == sorted(active)
+    assert report["total"] == len(active)
+    assert report["failed"] == 1
+    assert report["timed_out"] == 1
+    assert report["ok"] == report["total"] - 2
+    assert report["skipped"] == 0
+    assert report["still_running"] == 1
+
+    # -------------------------
+    # DEADLINE: i goal in coda dietro un goal bloccato vengono annullati
+    # -------------------------
+    supervisor = RecordingSupervisor(all_slow=True)
+    scheduler = AgentScheduler(
+        supervisor,
+        max_workers=1,
+        goal_timeout=0.5,
+        jitter=0,
+        page_size=5,
+        deadline=0.8
+    )
+
+    stuck = scheduler.fan_out(EventType.DAILY)
+
+    assert len(supervisor.seen) == 1
+    assert stuck["timed_out"] == 1
+    assert stuck["still_running"] == 1
+    assert stuck["skipped"] == len(active) - 1
+    # senza annullare la coda il fan-out attenderebbe ogni goal (3s ciascuno)
+    assert stuck["duration_s"] < 2.0, stuck
+
+    # -------------------------
+    # JITTER: scaglionato in partenza, non sommato per goal
+    # -------------------------
+    supervisor = RecordingSupervisor(work=0.05)
+    scheduler = AgentScheduler(
+        supervisor,
+        max_workers=2,
+        goal_timeout=5.0,
+        jitter=0.5,
+        page_size=5
+    )
+
+    jittered = scheduler.fan_out(EventType.DAILY)
+
+    assert jittered["ok"] == len(active)
+    # con lo sleep nei worker sarebbero ~12 * (0.25 + 0.05) / 2 = 1.8s
+    assert jittered["duration_s"] < 1.2, jittered
+
+    shutil.rmtree(TEST_DIR, ignore_errors=True)
+    print("✅ scheduler fan-out test passed", report, jittered)
+
+
+if __name__ == "__main__":
+    run_test()
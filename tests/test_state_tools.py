@@ -6,7 +6,9 @@ Verifica la creazione, lettura, aggiornamento e filtro di goal e task tramite il
 from tools.state_tools import (
     write_goal_state,
     read_goal_state,
+    write_goal_with_tasks,
     create_task,
+    create_tasks_bulk,
     get_active_tasks,
     update_task_status
 )
@@ -35,6 +37,18 @@ def run_tests():
     tasks = get_active_tasks(goal_id)
     assert len(tasks) == 0
 
+    create_tasks_bulk(goal_id, ["Scrivere funzioni", "Usare liste"])
+    tasks = get_active_tasks(goal_id)
+    assert [t["description"] for t in tasks] == ["Scrivere funzioni", "Usare liste"]
+
+    goal_id = write_goal_with_tasks(
+        "Imparare SQL",
+        ["SELECT base", "JOIN", "Indici"],
+        status="active"
+    )
+    assert read_goal_state(goal_id)["status"] == "active"
+    assert len(get_active_tasks(goal_id)) == 3
+
     print("✅ state_tools tests passed")
 
 if __name__ == "__main__":
@@ -0,0 +1,173 @@
+"""
+Test funzionali per il tracing.
+Verifica annidamento degli span (anche nei passi del DAG), stato di
+errore, decoratore sync/async, proxy, token LLM, exporter JSON e
+istogrammi per stadio.
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+
+from agents.llm.fake_client import FakeLLMClient
+from app.tracing import (
+    InMemoryExporter,
+    JsonFileExporter,
+    TracedProxy,
+    span,
+    traced,
+    tracer,
+)
+from supervisor.dag import Step, run_dag
+
+
+class Store:
+    def search(self, collection_name, limit=10):
+        return ["hit"] * limit
+
+
+@traced("agent.sync")
+def sync_agent():
+    with span("inner", "sqlite"):
+        return 1
+
+
+@traced("agent.async")
+async def async_agent():
+    await asyncio.sleep(0)
+    with span("inner", "qdrant"):
+        return 2
+
+
+def run_tests():
+    memory = InMemoryExporter()
+    tracer.set_exporters([memory])
+    tracer.metrics.reset()
+
+    # -------------------------
+    # ANNIDAMENTO
+    # -------------------------
+    with span("root", "supervisor", goal_id=1) as root:
+        assert sync_agent() == 1
+
+    by_name = {s.name: s for s in memory.spans}
+    assert by_name["agent.sync"].parent_id == root.span_id
+    assert by_name["inner"].parent_id == by_name["agent.sync"].span_id
+    assert {s.trace_id for s in memory.spans} == {root.trace_id}
+    assert root.attributes == {"goal_id": 1}
+
+    memory.clear()
+    assert asyncio.run(async_agent()) == 2
+    assert memory.names() == ["inner", "agent.async"]
+    assert memory.spans[0].parent_id == memory.spans[1].span_id
+
+    # -------------------------
+    # ERRORI
+    # -------------------------
+    memory.clear()
+    try:
+        with span("failing", "llm"):
+            raise ValueError("boom")
+    except ValueError:
+        pass
+    assert memory.spans[0].status == "error"
+    assert "boom" in memory.spans[0].error
+
+    # client disconnesso (generatore chiuso) o richiesta annullata: non sono errori
+    memory.clear()
+
+    def stream():
+        with span("llm.stream", "llm"):
+            yield "token"
+            yield "token"
+
+    tokens = stream()
+    next(tokens)
+    tokens.close()
+
+    async def cancelled():
+        with span("llm.cancelled", "llm"):
+            await asyncio.sleep(10)
+
+    async def cancel():
+        task = asyncio.ensure_future(cancelled())
+        await asyncio.sleep(0)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(cancel())
+    assert [s.status for s in memory.spans] == ["cancelled", "cancelled"]
+    assert all(s.error is None for s in memory.spans)
+
+    # -------------------------
+    # DAG: i passi ereditano lo span del chiamante
+    # -------------------------
+    memory.clear()
+    with span("weekly", "supervisor") as weekly:
+        run_dag([
+            Step("a", lambda _: sync_agent()),
+            Step("b", lambda deps: deps["a"] + 1, deps=("a",)),
+        ])
+
+    steps = {s.name: s for s in memory.spans if s.stage == "step"}
+    assert set(steps) == {"step.a", "step.b"}
+    assert all(s.parent_id == weekly.span_id for s in steps.values())
+    agent = next(s for s in memory.spans if s.name == "agent.sync")
+    assert agent.parent_id == steps["step.a"].span_id
+
+    # -------------------------
+    # PROXY E LLM
+    # -------------------------
+    memory.clear()
+    store = TracedProxy(Store(), stage="qdrant", prefix="qdrant")
+    assert store.search(collection_name="memories", limit=2) == ["hit", "hit"]
+    assert memory.spans[0].name == "qdrant.search"
+    assert memory.spans[0].attributes == {"collection": "memories"}
+
+    memory.clear()
+    llm = FakeLLMClient()
+    llm.generate("You are a planning agent.", "Imparare Python")
+    list(llm.generate_stream("You are a daily coaching assistant.", "tasks"))
+    llm_spans = memory.by_stage("llm")
+    assert [s.name for s in llm_spans] == ["llm.generate", "llm.generate_stream"]
+    assert all(s.attributes["prompt_tokens"] > 0 for s in llm_spans)
+    assert all(s.attributes["completion_tokens"] > 0 for s in llm_spans)
+
+    # -------------------------
+    # EXPORTER JSON
+    # -------------------------
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "traces.jsonl")
+        tracer.set_exporters([JsonFileExporter(path)])
+        with span("exported", "encode", texts=3):
+            pass
+        tracer.set_exporters([])
+
+        with open(path, encoding="utf-8") as f:
+            record = json.loads(f.readline())
+        assert record["name"] == "exported"
+        assert record["attributes"] == {"texts": 3}
+
+    # -------------------------
+    # METRICHE
+    # -------------------------
+    snapshot = tracer.metrics.snapshot()
+    assert snapshot["stages"]["llm"]["count"] == 5
+    assert snapshot["stages"]["llm"]["errors"] == 1
+    assert snapshot["stages"]["sqlite"]["buckets"]["+Inf"] == snapshot["stages"]["sqlite"]["count"]
+    assert snapshot["llm_tokens"]["prompt"] > 0
+
+    text = tracer.metrics.render_prometheus()
+    assert 'goal_agent_stage_duration_seconds_count{stage="qdrant"}' in text
+    assert 'goal_agent_llm_tokens_total{kind="completion"}' in text
+
+    tracer.metrics.reset()
+    print("✅ Tracing tests passed")
+
+
+if __name__ == "__main__":
+    run_tests()
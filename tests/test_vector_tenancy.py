@@ -0,0 +1,245 @@
+"""
+Test funzionale per le modalità multi-tenant di VectorStorage.
+Per "shared", "payload" e "sharded" verifica che scrittura, ricerca,
+iterazione, metriche e compattazione restino isolate per goal e che,
+in modalità sharded, i punti finiscano solo nello shard del goal.
+Verifica anche la migrazione di un'installazione esistente agli shard
+e il cambio del numero di shard;
+la config HNSW di "payload" solo con QDRANT_URL (server Qdrant).
+"""
+
+import os
+import shutil
+from pathlib import Path
+
+from storage.encoders import HashEncoder
+from storage.qdrant import VectorStorage, shard_for
+from storage.sqlite import SQLiteDB
+
+
+TEST_QDRANT_PATH = Path("./qdrant_test_data_tenancy")
+GOALS = [101, 102, 103, 104, 105]
+
+
+def check_mode(tenancy: str):
+    path = TEST_QDRANT_PATH / tenancy
+    if path.exists():
+        shutil.rmtree(path, ignore_errors=True)
+
+    vector_store = VectorStorage(
+        path=str(path),
+        embedding_model="hash-384",
+        encoder=HashEncoder(384),
+        tenancy=tenancy,
+        shards=3
+    )
+    vector_store.init()
+
+    # -------------------------
+    # SCRITTURA BATCH SU PIÙ GOAL
+    # -------------------------
+    vector_store.write_memories([
+        {
+            "goal_id": goal_id,
+            "content": f"goal {goal_id} memory {i}",
+            "memory_type": "observation",
+            "source": "test",
+        }
+        for goal_id in GOALS
+        for i in range(4)
+    ])
+    vector_store.write_progress_batch([
+        {
+            "goal_id": goal_id,
+            "task_id": i,
+            "done": i % 2 == 0,
+            "difficulty": 3,
+            "energy": 4,
+        }
+        for goal_id in GOALS
+        for i in range(6)
+    ])
+
+    # -------------------------
+    # LETTURE ISOLATE PER GOAL
+    # -------------------------
+    for goal_id in GOALS:
+        hits = vector_store.search_memories(goal_id, "memory", limit=10)
+        assert len(hits) == 4, (tenancy, goal_id)
+        assert {h["goal_id"] for h in hits} == {goal_id}
+
+        assert len(list(vector_store.iter_memories(goal_id, page_size=3))) == 4
+        assert len(vector_store.retrieve_recent_progress(goal_id)) == 6
+        # scansione su Qdrant: gli aggregati SQLite sono condivisi tra le modalità del test
+        metrics = vector_store.compute_basic_metrics(goal_id, from_aggregates=False)
+        assert metrics["total_logs"] == 6
+
+    # -------------------------
+    # COMPATTAZIONE
+    # -------------------------
+    goal_id = GOALS[0]
+    result = vector_store.archive_old_memories(
+        goal_id=goal_id,
+        older_than_days=-1,
+        summarize=lambda batch: f"{len(batch)} memories",
+        batch_size=10
+    )
+    assert result["archived"] == 4
+
+    remaining = list(vector_store.iter_memories(goal_id))
+    assert [m["type"] for m in remaining] == ["compressed"]
+    # gli altri goal non sono toccati
+    assert len(list(vector_store.iter_memories(GOALS[1]))) == 4
+
+    # -------------------------
+    # LAYOUT FISICO
+    # -------------------------
+    names = {c.name for c in vector_store.client.get_collections().collections}
+
+    if tenancy == "sharded":
+        assert {f"memories_{i}" for i in range(3)} <= names
+        assert "memories" not in names
+        for goal_id in GOALS:
+            own = f"progress_logs_{shard_for(goal_id, 3)}"
+            for i in range(3):
+                points, _ = vector_store.client.scroll(
+                    collection_name=f"progress_logs_{i}", limit=100
+                )
+                count = sum(1 for p in points if p.payload["goal_id"] == goal_id)
+                assert count == (6 if f"progress_logs_{i}" == own else 0)
+    else:
+        assert {"memories", "memories_archive", "progress_logs"} <= names
+
+    vector_store.close()
+
+
+def check_payload_server():
+    """
+    HNSW per goal: solo su server (Qdrant embedded ignora hnsw_config).
+    """
+    vector_store = VectorStorage(
+        embedding_model="hash-384",
+        encoder=HashEncoder(384),
+        tenancy="payload",
+        url=os.environ["QDRANT_URL"],
+        api_key=os.getenv("QDRANT_API_KEY")
+    )
+    vector_store.init()
+
+    hnsw = vector_store.client.get_collection("memories").config.hnsw_config
+    assert (hnsw.m, hnsw.payload_m) == (0, 16)
+    # grafo per goal anche sull'archivio: serve l'indice su goal_id
+    schema = vector_store.client.get_collection("memories_archive").payload_schema
+    assert "goal_id" in schema
+    vector_store.close()
+
+
+def check_reshard():
+    """
+    Passaggio di un'installazione esistente da "shared" a "sharded".
+    """
+    path = TEST_QDRANT_PATH / "reshard"
+    if path.exists():
+        shutil.rmtree(path, ignore_errors=True)
+
+    def store(tenancy, shards=3):
+        return VectorStorage(
+            path=str(path),
+            embedding_model="hash-384",
+            encoder=HashEncoder(384),
+            tenancy=tenancy,
+            shards=shards
+        )
+
+    shared = store("shared")
+    shared.init()
+    shared.write_memories([
+        {
+            "goal_id": goal_id,
+            "content": f"old memory {goal_id}",
+            "memory_type": "observation",
+            "source": "test",
+        }
+        for goal_id in GOALS
+    ])
+    shared.write_progress_batch([
+        {"goal_id": goal_id, "task_id": 1, "done": True, "difficulty": 2, "energy": 3}
+        for goal_id in GOALS
+    ])
+    shared.close()
+
+    sharded = store("sharded")
+    # i punti esistenti non devono diventare irraggiungibili in silenzio
+    try:
+        sharded.init()
+        assert False, "expected RuntimeError"
+    except RuntimeError as e:
+        assert "reshard" in str(e)
+
+    moved = sharded.reshard(batch_size=2)
+    assert moved == {"memories": len(GOALS), "memories_archive": 0, "progress_logs": len(GOALS)}
+
+    sharded.init()
+    names = {c.name for c in sharded.client.get_collections().collections}
+    assert not {"memories", "memories_archive", "progress_logs"} & names
+
+    for goal_id in GOALS:
+        hits = sharded.search_memories(goal_id, "old memory", limit=5)
+        assert [h["content"] for h in hits] == [f"old memory {goal_id}"]
+        assert len(sharded.retrieve_recent_progress(goal_id)) == 1
+
+    # rilanciare la migrazione non fa nulla
+    assert sharded.reshard() == {}
+    sharded.close()
+
+    # -------------------------
+    # CAMBIO DEL NUMERO DI SHARD
+    # -------------------------
+    for shards in (5, 2):
+        resized = store("sharded", shards=shards)
+        try:
+            resized.init()
+            assert False, "expected RuntimeError"
+        except RuntimeError as e:
+            assert "reshard" in str(e)
+
+        moved = resized.reshard(batch_size=2)
+        assert moved["memories"] == len(GOALS)
+        resized.init()
+
+        names = {c.name for c in resized.client.get_collections().collections}
+        assert {n for n in names if n.startswith("progress_logs")} == {
+            f"progress_logs_{i}" for i in range(shards)
+        }
+        for goal_id in GOALS:
+            hits = resized.search_memories(goal_id, "old memory", limit=5)
+            assert [h["content"] for h in hits] == [f"old memory {goal_id}"]
+            assert len(resized.retrieve_recent_progress(goal_id)) == 1
+        resized.close()
+
+
+def run_test():
+    SQLiteDB().run_migrations()
+
+    for tenancy in ("shared", "payload", "sharded"):
+        check_mode(tenancy)
+
+    check_reshard()
+
+    if os.getenv("QDRANT_URL"):
+        check_payload_server()
+    else:
+        print("⏭ QDRANT_URL not set, payload HNSW check skipped")
+
+    try:
+        VectorStorage(path=str(TEST_QDRANT_PATH / "bad"), tenancy="nope")
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+    shutil.rmtree(TEST_QDRANT_PATH, ignore_errors=True)
+    print("✅ Vector tenancy tests passed")
+
+
+if __name__ == "__main__":
+    run_test()
@@ -1,8 +1,50 @@
+from typing import List, Optional
+
+from app.config import Config
 from tools.schemas import FeedbackInput
 from storage.qdrant import VectorStorage
+from storage.crud import (
+    invalidate_daily_message,
+    invalidate_daily_messages_for_tasks,
+)
+
+# Storage condiviso: iniettato dal bootstrap tramite set_vector_store().
+_vector_store: Optional[VectorStorage] = None
+
+
+def set_vector_store(vector_store: VectorStorage) -> None:
+    """
+    Registra il VectorStorage del processo (quello creato da bootstrap),
+    così i tool non aprono un secondo Qdrant né un secondo encoder.
+    """
+    global _vector_store
+    _vector_store = vector_store
 
-vector_store = VectorStorage()
-vector_store.init()
+
+def _get_vector_store(vector_store: Optional[VectorStorage] = None) -> VectorStorage:
+    global _vector_store
+
+    if vector_store is not None:
+        return vector_store
+
+    # fallback per script/test senza bootstrap
+    if _vector_store is None:
+        # stessa modalità di tenancy del bootstrap, altrimenti i punti finirebbero
+        # in collection diverse da quelle lette dagli agenti
+        _vector_store = VectorStorage(
+            path=Config.QDRANT_PATH,
+            tenancy=Config.QDRANT_TENANCY,
+            shards=Config.QDRANT_SHARDS,
+            url=Config.QDRANT_URL,
+            api_key=Config.QDRANT_API_KEY,
+            prefer_grpc=Config.QDRANT_PREFER_GRPC,
+            grpc_port=Config.QDRANT_GRPC_PORT,
+            timeout=Config.QDRANT_TIMEOUT_S,
+            pool_size=Config.QDRANT_POOL_SIZE
+        )
+        _vector_store.init()
+
+    return _vector_store
 
 
 def validate_feedback(feedback: FeedbackInput) -> None:
@@ -14,7 +56,8 @@ def validate_feedback(feedback: FeedbackInput) -> None:
 def save_user_feedback(
     task_id: int,
     feedback: FeedbackInput,
-    goal_id: int = None
+    goal_id: int = None,
+    vector_store: Optional[VectorStorage] = None
 ) -> None:
     """
     TOOL deterministico.
@@ -22,7 +65,7 @@ def save_user_feedback(
     """
     validate_feedback(feedback)
 
-    vector_store.write_progress(
+    _get_vector_store(vector_store).write_progress(
         goal_id=goal_id,
         task_id=task_id,
         done=feedback["done"],
@@ -30,3 +73,41 @@ def save_user_feedback(
         energy=feedback["energy"],
         note=feedback.get("note")
     )
+
+    _invalidate_daily(goal_id, [task_id])
+
+
+def save_user_feedback_batch(
+    task_ids: List[int],
+    feedback: FeedbackInput,
+    goal_id: int = None,
+    vector_store: Optional[VectorStorage] = None
+) -> None:
+    """
+    TOOL deterministico.
+    Salva lo stesso feedback di fine giornata per più task
+    con una sola scrittura batch nel Vector DB.
+    """
+    validate_feedback(feedback)
+
+    _get_vector_store(vector_store).write_progress_batch([
+        {
+            "goal_id": goal_id,
+            "task_id": task_id,
+            "done": feedback["done"],
+            "difficulty": feedback["difficulty"],
+            "energy": feedback["energy"],
+            "note": feedback.get("note")
+        }
+        for task_id in task_ids
+    ])
+
+    _invalidate_daily(goal_id, task_ids)
+
+
+def _invalidate_daily(goal_id: Optional[int], task_ids: List[int]) -> None:
+    # il feedback cambia lo stato della giornata: niente messaggio in cache
+    if goal_id is not None:
+        invalidate_daily_message(goal_id)
+    else:
+        invalidate_daily_messages_for_tasks(task_ids)
@@ -3,7 +3,7 @@ Strumenti per la gestione delle memorie semantiche degli agenti.
 Livello tool: nessuna logica Qdrant diretta, nessuno stato globale.
 """
 
-from typing import List, Dict
+from typing import Callable, Iterator, List, Dict, Optional
 from storage.qdrant import VectorStorage
 
 
@@ -71,6 +71,38 @@ def retrieve_recent_progress(
     )
 
 
+def iter_memories(
+    vector_store: VectorStorage,
+    goal_id: int,
+    days: Optional[int] = None,
+    page_size: int = 256
+) -> Iterator[Dict]:
+    """
+    Scorre tutte le memorie del goal a pagine, senza troncamenti.
+    """
+    return vector_store.iter_memories(
+        goal_id=goal_id,
+        days=days,
+        page_size=page_size
+    )
+
+
+def iter_progress(
+    vector_store: VectorStorage,
+    goal_id: int,
+    days: Optional[int] = None,
+    page_size: int = 256
+) -> Iterator[Dict]:
+    """
+    Scorre tutti i progress log del goal a pagine, senza troncamenti.
+    """
+    return vector_store.iter_progress(
+        goal_id=goal_id,
+        days=days,
+        page_size=page_size
+    )
+
+
 def retrieve_memories_by_type(
     vector_store: VectorStorage,
     goal_id: int,
@@ -105,11 +137,19 @@ def retrieve_memories_by_type(
 def archive_old_memories(
     vector_store: VectorStorage,
     goal_id: int,
-    older_than_days: int = 30
-) -> None:
-    vector_store.archive_old_memories(
+    older_than_days: int = 30,
+    summarize: Optional[Callable[[List[Dict]], str]] = None,
+    batch_size: int = 50
+) -> Dict:
+    """
+    Compatta le memorie vecchie del goal in memorie riassuntive
+    e archivia gli originali. Restituisce batch e memorie archiviate.
+    """
+    return vector_store.archive_old_memories(
         goal_id=goal_id,
-        older_than_days=older_than_days
+        older_than_days=older_than_days,
+        summarize=summarize,
+        batch_size=batch_size
     )
 
 # -------------------------
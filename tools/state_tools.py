@@ -1,8 +1,10 @@
 from typing import List, Optional
 from storage.crud import (
     create_goal,
+    create_goal_with_tasks as db_create_goal_with_tasks,
     get_goal,
     create_task as db_create_task,
+    create_tasks_bulk as db_create_tasks_bulk,
     update_task_status as db_update_task_status
 )
 from storage.sqlite import SQLiteDB
@@ -11,6 +13,13 @@ from tools.schemas import GoalState, TaskState
 # Istanza del database SQLite
 db = SQLiteDB()
 
+# coperta da idx_tasks_goal_status_id (goal_id, status, id): niente full scan
+ACTIVE_TASKS_QUERY = """
+    SELECT * FROM tasks
+    WHERE goal_id = ? AND status = 'pending'
+    ORDER BY id
+"""
+
 def read_goal_state(goal_id: int) -> Optional[GoalState]:
     """
     Recupera lo stato di un goal dato il suo ID.
@@ -53,6 +62,43 @@ def create_task(goal_id: int, description: str) -> int:
     return db_create_task(goal_id=goal_id, description=description)
 
 
+def create_tasks_bulk(goal_id: int, tasks: List[str]) -> None:
+    """
+    Crea più task associati a un goal in un'unica transazione.
+
+    Args:
+        goal_id (int): Identificativo del goal.
+        tasks (List[str]): Descrizioni dei task.
+
+    Returns:
+        None
+    """
+    db_create_tasks_bulk(goal_id=goal_id, tasks=tasks)
+
+
+def write_goal_with_tasks(
+    description: str,
+    tasks: List[str],
+    status: str = "pending"
+) -> int:
+    """
+    Crea un goal e i suoi task atomicamente (stessa transazione).
+
+    Args:
+        description (str): Descrizione del goal.
+        tasks (List[str]): Descrizioni dei task.
+        status (str, optional): Stato iniziale del goal. Default 'pending'.
+
+    Returns:
+        int: ID del goal creato.
+    """
+    return db_create_goal_with_tasks(
+        description=description,
+        tasks=tasks,
+        status=status
+    )
+
+
 def update_task_status(task_id: int, status: str) -> None:
     """
     Aggiorna lo stato di un task esistente.
@@ -77,13 +123,7 @@ def get_active_tasks(goal_id: int) -> List[TaskState]:
     Returns:
         List[TaskState]: Lista di task attivi come dizionari.
     """
-    with db.connect() as conn:
-        cur = conn.execute(
-            """
-            SELECT * FROM tasks
-            WHERE goal_id = ? AND status = 'pending'
-            """,
-            (goal_id,)
-        )
+    with db.connection() as conn:
+        cur = conn.execute(ACTIVE_TASKS_QUERY, (goal_id,))
         rows = cur.fetchall()
         return [dict(r) for r in rows]